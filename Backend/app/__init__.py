@@ -1,10 +1,15 @@
 import asyncio
-import os
 import json
 from typing import Dict, List, Any, Optional
 
 from pydantic import BaseModel, Field
 import autogen
+from app.log import get_logger
+from app.llm_clients import llm_clients
+
+log = get_logger(__name__)
+
+AUTOGEN_MODEL = "gpt-4o-2024-05-13"
 
 
 # Shared queue for frontend inputs
@@ -15,7 +20,7 @@ class FrontendUserProxy(autogen.UserProxyAgent):
         super().__init__(**kwargs)
 
     def get_human_input(self, prompt: str) -> str:
-        print(f"[UserProxy] Waiting for frontend input. Prompt: {prompt}")
+        log.debug("UserProxy waiting for frontend input", prompt=prompt)
         # Block until frontend puts an answer
         return asyncio.run(frontend_input_queue.get())
 
@@ -47,7 +52,8 @@ def is_termination_message(message: Dict) -> bool:
     return isinstance(content, str) and content.rstrip().endswith("TERMINATE")
 
 def execute_mock_api_tool(endpoint: str, **kwargs) -> str:
-    print(f"--- [AutoGen Runner] MOCK API CALL to: {endpoint} with params: {kwargs} ---")
+    log.info("Mock API call", endpoint=endpoint)
+    log.debug("Mock API call params", endpoint=endpoint, params=kwargs)
     return json.dumps({"status": "success", "data": f"Mock response for {endpoint}"})
 
 def build_agents_and_manager(config: SuperAgentConfigRequest) -> Dict[str, Any]:
@@ -64,11 +70,11 @@ def build_agents_and_manager(config: SuperAgentConfigRequest) -> Dict[str, Any]:
             tools_list.append({"type": "function", "function": { "name": task.name, "description": task.description, "parameters": task.params_schema }})
         tools_by_assistant[spec.name] = tools_list
 
-    assistant_agents = [autogen.AssistantAgent(name=spec.name, system_message=spec.system_message, llm_config={"config_list": [{"model": "gpt-4o-2024-05-13", "api_key": os.getenv("OPENAI_API_KEY")}], "tools": tools_by_assistant.get(spec.name)}) for spec in config.assistants]
-    supervisor = autogen.AssistantAgent(name="Supervisor", system_message=config.supervisor_system_message or "You are the supervisor.", llm_config={"config_list": [{"model": "gpt-4o-2024-05-13", "api_key": os.getenv("OPENAI_API_KEY")}]})
+    assistant_agents = [autogen.AssistantAgent(name=spec.name, system_message=spec.system_message, llm_config=llm_clients.autogen_llm_config(AUTOGEN_MODEL, tools=tools_by_assistant.get(spec.name))) for spec in config.assistants]
+    supervisor = autogen.AssistantAgent(name="Supervisor", system_message=config.supervisor_system_message or "You are the supervisor.", llm_config=llm_clients.autogen_llm_config(AUTOGEN_MODEL))
     user_proxy = FrontendUserProxyAgent(name="UserProxy", human_input_mode="ALWAYS", code_execution_config=False, function_map=function_map, is_termination_msg=is_termination_message)
     groupchat = autogen.GroupChat(agents=[user_proxy, supervisor, *assistant_agents], messages=[], max_round=config.max_turns)
-    manager = autogen.GroupChatManager(groupchat=groupchat, llm_config={"config_list": [{"model": "gpt-4o-2024-05-13", "api_key": os.getenv("OPENAI_API_KEY")}]})
+    manager = autogen.GroupChatManager(groupchat=groupchat, llm_config=llm_clients.autogen_llm_config(AUTOGEN_MODEL))
     
     return {"user_proxy": user_proxy, "manager": manager, "groupchat": groupchat}
 
@@ -80,7 +86,7 @@ def run_conversation_from_config(config: SuperAgentConfigRequest) -> str:
     Takes a full agent configuration, runs the conversation, and returns the
     final plain text result from the supervisor.
     """
-    print("--- [AutoGen Runner] Starting conversational session ---")
+    log.info("Starting conversational session")
     
     agent_components = build_agents_and_manager(config)
     user_proxy = agent_components["user_proxy"]
@@ -98,7 +104,7 @@ def run_conversation_from_config(config: SuperAgentConfigRequest) -> str:
     
     # Check if the conversation produced any messages
     if not groupchat.messages:
-        print("--- [AutoGen Runner] Session finished. No messages were generated. ---")
+        log.info("Session finished, no messages were generated")
         return "The conversation ended without a result."
 
     # Get the very last message in the chat
@@ -127,6 +133,7 @@ def run_conversation_from_config(config: SuperAgentConfigRequest) -> str:
         if isinstance(final_message_content, str):
             final_message = final_message_content.strip()
 
-    print(f"--- [AutoGen Runner] Session finished. Final message: {final_message} ---")
+    log.info("Session finished")
+    log.debug("Session final message", message=final_message)
     
     return final_message
\ No newline at end of file
@@ -0,0 +1,191 @@
+# --- START OF FILE app/agents/schema_compiler.py ---
+
+import hashlib
+import json
+import re
+from typing import Any, Dict, List, Literal, Optional, Tuple, Type, Union
+
+from pydantic import BaseModel, Field, create_model
+
+from app.cache import LRUCache
+from app.config import settings
+from app.log import get_logger
+from app.metrics import counter
+
+log = get_logger(__name__)
+
+TOOL_SCHEMA_CACHE_LOOKUPS = counter(
+    "tool_schema_cache_lookups_total",
+    "Compiled tool args_schema cache lookups, by result (hit, miss).",
+    labelnames=("result",),
+)
+
+# JSON Schema types plus the short names of the legacy "simple" params format.
+_SCALARS = {
+    "str": str, "string": str,
+    "int": int, "integer": int,
+    "float": float, "number": float,
+    "bool": bool, "boolean": bool,
+    "null": type(None),
+}
+_MAX_REF_DEPTH = 16
+
+
+class SchemaCompileError(ValueError):
+    """The params schema cannot be turned into a pydantic model."""
+
+
+def schema_hash(schema: Dict[str, Any]) -> str:
+    """Stable hash of a JSON schema (key order does not matter)."""
+    canonical = json.dumps(schema, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _model_name(*parts: str) -> str:
+    name = "".join(re.sub(r"[^0-9a-zA-Z]+", " ", part).title().replace(" ", "") for part in parts)
+    return name if name and not name[0].isdigit() else f"M{name}"
+
+
+class _Compiler:
+    """Translates one JSON schema (and its local $defs) into pydantic types."""
+
+    def __init__(self, root: Dict[str, Any]):
+        self.definitions = {**root.get("definitions", {}), **root.get("$defs", {})}
+
+    def _resolve(self, node: Dict[str, Any], depth: int) -> Dict[str, Any]:
+        while "$ref" in node:
+            if depth > _MAX_REF_DEPTH:
+                raise SchemaCompileError("$ref chain too deep (recursive schemas are not supported).")
+            ref = node["$ref"]
+            name = ref.rsplit("/", 1)[-1]
+            if not ref.startswith("#/") or name not in self.definitions:
+                raise SchemaCompileError(f"Unresolvable $ref '{ref}'.")
+            node = {**self.definitions[name], **{k: v for k, v in node.items() if k != "$ref"}}
+            depth += 1
+        return node
+
+    def type_for(self, node: Any, name: str, depth: int = 0) -> Any:
+        if not isinstance(node, dict):
+            return Any
+        if depth > _MAX_REF_DEPTH:
+            raise SchemaCompileError("Schema nesting too deep.")
+        node = self._resolve(node, depth)
+
+        if "const" in node:
+            return Literal[node["const"]]
+        if isinstance(node.get("enum"), list) and node["enum"]:
+            return Literal[tuple(node["enum"])]
+        for combinator in ("anyOf", "oneOf"):
+            if isinstance(node.get(combinator), list) and node[combinator]:
+                options = tuple(
+                    self.type_for(option, f"{name} option {i}", depth + 1)
+                    for i, option in enumerate(node[combinator])
+                )
+                return Union[options] if len(options) > 1 else options[0]
+
+        json_type = node.get("type")
+        if isinstance(json_type, list):
+            options = tuple(self.type_for({**node, "type": t}, name, depth) for t in json_type)
+            return Union[options] if len(options) > 1 else options[0]
+        if json_type is None:
+            json_type = "object" if "properties" in node else "array" if "items" in node else None
+        if json_type is None:
+            return Any
+
+        if json_type in _SCALARS:
+            return _SCALARS[json_type]
+        if json_type in ("array", "list"):
+            return List[self.type_for(node.get("items"), f"{name} item", depth + 1)]
+        if json_type in ("object", "dict"):
+            if isinstance(node.get("properties"), dict) and node["properties"]:
+                return self.model_for(node, name, depth + 1)
+            extra = node.get("additionalProperties")
+            value_type = self.type_for(extra, f"{name} value", depth + 1) if isinstance(extra, dict) else Any
+            return Dict[str, value_type]
+        return Any
+
+    def model_for(self, node: Dict[str, Any], name: str, depth: int = 0, model_name: Optional[str] = None) -> Type[BaseModel]:
+        properties = node["properties"]
+        required = set(node.get("required", []))
+        fields: Dict[str, Tuple[Any, Any]] = {}
+        for field_name, details in properties.items():
+            details = details if isinstance(details, dict) else {}
+            py_type = self.type_for(details, f"{name} {field_name}", depth)
+            description = details.get("description", "")
+            if field_name in required:
+                fields[field_name] = (py_type, Field(..., description=description))
+            else:
+                fields[field_name] = (Optional[py_type], Field(default=details.get("default"), description=description))
+        return create_model(model_name or _model_name(name), **fields)
+
+
+def _normalize(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Accepts a JSON Schema object or the legacy simple format
+    ({"city": {"type": "str"}}, every parameter required).
+    """
+    if isinstance(schema.get("properties"), dict):
+        return schema
+    if schema.get("type") == "object":
+        return {**schema, "properties": {}}
+    return {"type": "object", "properties": schema, "required": list(schema.keys())}
+
+
+def to_plain(value: Any) -> Any:
+    """Turns validated nested models back into plain JSON-compatible values."""
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, list):
+        return [to_plain(item) for item in value]
+    if isinstance(value, dict):
+        return {key: to_plain(item) for key, item in value.items()}
+    return value
+
+
+class ArgsSchemaCache:
+    """
+    LRU cache of compiled args_schema models keyed by (tool name, canonical
+    schema hash). Models are immutable, so tools with the same name and
+    schema share one model across users and agent runs.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._models = LRUCache(max_size)
+
+    def compile(self, tool_name: str, params_schema: Union[str, Dict[str, Any]]) -> Type[BaseModel]:
+        """Returns the args model for a params schema, compiling it at most once. Raises SchemaCompileError."""
+        if isinstance(params_schema, str):
+            try:
+                params_schema = json.loads(params_schema)
+            except ValueError as e:
+                raise SchemaCompileError(f"params_schema is not valid JSON: {e}")
+        if not isinstance(params_schema, dict):
+            raise SchemaCompileError("params_schema must be a JSON object.")
+
+        key = (tool_name, schema_hash(params_schema))
+        model = self._models.get(key)
+        if model is not None:
+            TOOL_SCHEMA_CACHE_LOOKUPS.labels(result="hit").inc()
+            return model
+        TOOL_SCHEMA_CACHE_LOOKUPS.labels(result="miss").inc()
+
+        schema = _normalize(params_schema)
+        try:
+            model = _Compiler(schema).model_for(schema, tool_name, model_name=f"{tool_name}Args")
+        except SchemaCompileError:
+            raise
+        except Exception as e:
+            raise SchemaCompileError(str(e)) from e
+        log.debug("Compiled tool args schema", tool=tool_name, schema_hash=key[1][:12])
+
+        return self._models.setdefault(key, model)
+
+    def clear(self):
+        self._models.clear()
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+
+args_schema_cache = ArgsSchemaCache(max_size=settings.TOOL_SCHEMA_CACHE_SIZE)
@@ -1,14 +1,43 @@
 import asyncio
 import json
+import time
 from typing import List, Optional, Dict, Any
 
 import httpx
 from langchain_core.tools import StructuredTool, tool
-from pydantic import create_model, Field
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from app.db import crud
 from app.auth.models import ToolInDB
+from app.metrics import TOOL_CALL_SECONDS
+from app.tracing import span, inject_headers
+from app.agents.schema_compiler import args_schema_cache, to_plain, SchemaCompileError
+from app.log import get_logger
+
+log = get_logger(__name__)
+
+
+async def call_api_tool(tool_name: str, endpoint: str, params: Dict[str, Any]) -> Any:
+    """
+    Calls an API tool endpoint and returns the decoded JSON body. Raises on
+    HTTP and transport errors; latency is recorded per tool and status.
+    """
+    started_at, status = time.perf_counter(), "ok"
+    try:
+        # Use GET for Open-Meteo, passing params. The trace context travels in the headers.
+        with span("tool.call", **{"tool.name": tool_name, "http.url": endpoint}):
+            async with httpx.AsyncClient() as client:
+                response = await client.get(endpoint, params=params, headers=inject_headers(), timeout=30.0)
+                response.raise_for_status()
+                return response.json()
+    except httpx.HTTPStatusError as e:
+        status = f"http_{e.response.status_code}"
+        raise
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        TOOL_CALL_SECONDS.labels(tool=tool_name, status=status).observe(time.perf_counter() - started_at)
 
 
 class ToolRegistry:
@@ -25,7 +54,7 @@ class ToolRegistry:
     async def _fetch_tools_from_db(self):
         """Fetch and cache tool definitions from the database."""
         if self._tools_cache is None:
-            print(f"--- [ToolRegistry] Fetching tools from DB for user {self.user_id} ---")
+            log.debug("Fetching tools from DB", user_id=self.user_id)
             self._tools_cache = await crud.get_tools_for_user(self.db, self.user_id)
 
     def _create_api_tool(self, tool_def: ToolInDB) -> StructuredTool:
@@ -37,17 +66,14 @@ class ToolRegistry:
 
         async def api_call_func_async(**kwargs):
             # ... this function does not need to change ...
-            print(f"--- [Tool Executed] Calling API tool '{tool_def.name}' with args: {kwargs} ---")
+            log.info("Calling API tool", tool=tool_def.name)
+            log.debug("API tool arguments", tool=tool_def.name, args=kwargs)
             endpoint = tool_def.endpoint
             if not endpoint:
                 return f"Error: Tool '{tool_def.name}' has no API endpoint."
 
             try:
-                # Use GET for Open-Meteo, passing params
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(endpoint, params=kwargs, timeout=30.0)
-                    response.raise_for_status()
-                    return json.dumps(response.json())
+                return json.dumps(await call_api_tool(tool_def.name, endpoint, to_plain(kwargs)))
             except httpx.HTTPStatusError as e:
                 return f"Error calling API for '{tool_def.name}': {e.response.status_code} - {e.response.text}"
             except Exception as e:
@@ -56,50 +82,13 @@ class ToolRegistry:
         def api_call_func(**kwargs):
             return asyncio.run(api_call_func_async(**kwargs))
 
-        # ====================================================================
-        # <<< UPGRADED SCHEMA PARSING LOGIC >>>
-        # ====================================================================
+        # Compiled once per (tool name, schema hash) and shared across agent runs.
         args_schema = None
         if getattr(tool_def, "params_schema", None):
             try:
-                schema_dict = tool_def.params_schema
-                if isinstance(schema_dict, str):
-                    schema_dict = json.loads(schema_dict)
-
-                # Check if it's a standard JSON Schema with a 'properties' key
-                if "properties" in schema_dict and isinstance(schema_dict["properties"], dict):
-                    properties = schema_dict["properties"]
-                    required_fields = schema_dict.get("required", [])
-                else:
-                    # Fallback to the simple format for backward compatibility
-                    properties = schema_dict
-                    required_fields = list(properties.keys())
-
-                fields = {}
-                # Expanded type map to handle JSON schema types
-                type_map = {
-                    "str": str, "string": str,
-                    "int": int, "integer": int,
-                    "float": float, "number": float,
-                    "bool": bool, "boolean": bool,
-                    "dict": dict, "object": dict,
-                    "list": list, "array": list
-                }
-
-                for param_name, param_details in properties.items():
-                    py_type = type_map.get(param_details.get("type", "string"), str)
-                    description = param_details.get("description", "")
-                    
-                    if param_name in required_fields:
-                        # For required fields, Pydantic needs `...`
-                        fields[param_name] = (py_type, Field(..., description=description))
-                    else:
-                        # For optional fields, provide a default value (e.g., None)
-                        fields[param_name] = (Optional[py_type], Field(default=None, description=description))
-
-                args_schema = create_model(f"{tool_def.name}Args", **fields)
-            except Exception as e:
-                print(f"--- [ToolRegistry] Failed to parse params_schema for {tool_def.name}: {e} ---")
+                args_schema = args_schema_cache.compile(tool_def.name, tool_def.params_schema)
+            except SchemaCompileError as e:
+                log.warning("Failed to parse params_schema", tool=tool_def.name, error=str(e))
 
         return StructuredTool.from_function(
             func=api_call_func,
@@ -117,7 +106,7 @@ class ToolRegistry:
             if tool_def.name in tool_names:
                 langchain_tools.append(self._create_api_tool(tool_def))
 
-        print(f"--- [ToolRegistry] Loaded {len(langchain_tools)} tools: {[t.name for t in langchain_tools]} ---")
+        log.info("Loaded tools", count=len(langchain_tools), tools=lambda: [t.name for t in langchain_tools])
         return langchain_tools
 
 
@@ -29,6 +29,7 @@ async def create_new_agent(
         system_message=agent_spec.system_message,
         tasks=[task.model_dump() for task in agent_spec.tasks],
         knowledge_base_files=agent_spec.knowledge_base_files,
+        knowledge_base_urls=agent_spec.knowledge_base_urls,
         # public_api_key is generated in crud.create_agent
     )
     created_agent = await crud.create_agent(db, agent_config)
@@ -0,0 +1,33 @@
+# --- START OF FILE app/api/metrics_routes.py ---
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from typing import Dict, Any
+
+from app.metrics import REGISTRY
+from app.db.monitoring import MONGO_COMMAND_SECONDS, MONGO_POOL_CHECKOUT_SECONDS, get_pool_stats
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get("", response_class=PlainTextResponse, summary="Prometheus metrics")
+async def get_prometheus_metrics():
+    """
+    Exposes every registered metric (request latency per route, RAG stage
+    timings, orchestrator node timings, LLM tokens/cost, tool latency,
+    WebSocket/session gauges, MongoDB latency) in Prometheus text format.
+    """
+    return PlainTextResponse(REGISTRY.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/mongo", response_model=Dict[str, Any], summary="MongoDB latency and pool metrics")
+async def get_mongo_metrics():
+    """
+    Returns per-collection / per-command latency histograms, connection pool
+    checkout waits and current pool occupancy for the Motor client.
+    """
+    return {
+        "commands": MONGO_COMMAND_SECONDS.snapshot(),
+        "pool_checkout_wait": MONGO_POOL_CHECKOUT_SECONDS.snapshot(),
+        "pool": get_pool_stats(),
+    }
@@ -4,6 +4,7 @@ import os
 import json
 import shutil
 import asyncio
+import functools
 import uuid # <<< NEW IMPORT
 from typing import List, Dict, Any, Optional
 
@@ -28,13 +29,19 @@ from app.autogen_runner3 import SuperAgentConfigRequest
 from app.data.data_ingestion_pipeline import run_ingestion_pipeline
 from app.data.usage import load_from_source
 from app.data.chunker import chunk_documents
+from app.data.dedupe import chunk_deduplicator
 from app.data.embedder import embed_and_store_chunks
 from app.rag.pipeline import get_rag_answer
+from app.rag.retriever import list_namespaces, search_scored_documents
+from app.rag.scope import knowledge_base_filter, search_namespaces, tenant_namespace
 
 # --- Database and Authentication Imports ---
 from app.db.database import get_database
 from app.db import crud
-from app.auth.dependencies import get_current_user
+from app.db.logger import log_query, get_query_logs, get_query_stats
+from app.tracing import span, run_in_executor_with_context
+from app.log import get_logger
+from app.auth.dependencies import get_admin_user, get_current_user
 from app.auth.models import ChatLog, AgentConfiguration
 from app.auth.schemas import (
     UserPublic,
@@ -55,6 +62,8 @@ from langchain.memory import ConversationBufferWindowMemory
 from langchain.agents import AgentExecutor, create_openai_tools_agent
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
+log = get_logger(__name__)
+
 
 
 # --- Pydantic Models for this router ---
@@ -73,6 +82,16 @@ class RAGQueryRequest(BaseModel):
 class URLIngestRequest(BaseModel):
     url: HttpUrl
 
+class TenantSearchRequest(BaseModel):
+    query: str
+    k: int = Field(10, ge=1, le=100)
+    namespaces: Optional[List[str]] = None # Defaults to every namespace in the index
+
+class DedupeResetRequest(BaseModel):
+    namespace: Optional[str] = None # Defaults to the shared knowledge base
+    origin: Optional[str] = None # Only this file name / URL; defaults to the whole namespace
+    all_namespaces: bool = False # Forget everything, e.g. after recreating the index
+
 class SupervisorProfileRequest(BaseModel):
     name: str
     model: str
@@ -88,6 +107,12 @@ router = APIRouter()
 KNOWLEDGE_BASE_DIR = "Knowledge_Base"
 os.makedirs(KNOWLEDGE_BASE_DIR, exist_ok=True)
 
+
+def _answer_text(response: Dict) -> str:
+    """Returns the plain-text answer for the query log, or the full JSON for structured responses."""
+    text = response.get("text")
+    return text if isinstance(text, str) else json.dumps(response)
+
 # ====================================================================
 # AI Agent Execution Endpoint (REWRITTEN FOR SYNCHRONOUS RESPONSE)
 # ====================================================================
@@ -102,7 +127,7 @@ async def run_ai_agent(
     This endpoint is for single-turn interactions. If the agent needs more
     information, its response will be a question for the user.
     """
-    print("--- [API] /run_agent called for synchronous execution ---")
+    log.info("/run_agent called for synchronous execution")
 
     try:
         # Directly await the agent service execution. No background task.
@@ -118,7 +143,7 @@ async def run_ai_agent(
     except Exception as e:
         # This is a safeguard. The service is designed to return error strings,
         # but this handles unexpected exceptions during the call.
-        print(f"--- [API] /run_agent UNEXPECTED ERROR: {str(e)} ---")
+        log.exception("/run_agent failed")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"An unexpected error occurred: {str(e)}"
@@ -145,33 +170,40 @@ async def smart_ask(
         await crud.create_chat_log(db, user_log)
 
         final_assistant_configs = []
+        retrieval_filter = None
 
         if payload.agent_id:
-            print(f"--- [API /ask] Using dynamic agent with ID: {payload.agent_id} ---")
+            log.info("/ask using dynamic agent", agent_id=payload.agent_id)
             agent_config_model = await crud.get_agent_by_id(db, agent_id=payload.agent_id, user_id=current_user.id)
             if not agent_config_model:
                 raise HTTPException(status_code=404, detail="Agent not found or you don't have permission.")
             # .model_dump() returns a dictionary, which is correct.
             final_assistant_configs = [agent_config_model.model_dump()]
+            # Only search the agent's own knowledge base
+            retrieval_filter = knowledge_base_filter(agent_config_model.knowledge_base_files, agent_config_model.knowledge_base_urls)
         else:
-            print(f"--- [API /ask] Using default globally-loaded assistants ---")
+            log.info("/ask using default assistants")
             # ASSISTANT_CONFIGS is loaded from JSON and should be a list of dictionaries.
             final_assistant_configs = ASSISTANT_CONFIGS
 
         if not final_assistant_configs:
             # This is a valid state if no agents are configured.
             # The orchestrator will handle this by defaulting to RAG.
-            print("--- [API /ask] No agents configured for this run. Proceeding with orchestrator for RAG fallback. ---")
+            log.info("/ask has no agents configured, falling back to RAG")
 
-        print(f"--- [API /ask] Invoking orchestrator with {len(final_assistant_configs)} assistant(s). ---")
+        log.info("/ask invoking orchestrator", assistants=len(final_assistant_configs))
         
         inputs = {
             "question": payload.query, "lang": payload.lang,
             "supervisor_profile": SUPERVISOR_PROFILE, 
-            "assistant_configs": final_assistant_configs
+            "assistant_configs": final_assistant_configs,
+            "retrieval_filter": retrieval_filter,
+            "retrieval_namespaces": search_namespaces(current_user.id),
         }
         
-        final_state = app_graph.invoke(inputs)
+        with span("orchestrator.invoke", **{"agent.count": len(final_assistant_configs), "agent.id": payload.agent_id}):
+            # Off the event loop, so concurrent requests overlap (and share embedding batches)
+            final_state = await run_in_executor_with_context(asyncio.get_running_loop(), app_graph.invoke, inputs)
         response = final_state.get("final_response") or {}
         response["session_id"] = session_id
 
@@ -187,7 +219,7 @@ async def smart_ask(
                     valid_specs.append(spec)
                 else:
                     # Log a warning if we find invalid data, then skip it.
-                    print(f"--- [API /ask] WARNING: Found an invalid entry in assistant configs, skipping. Entry was: {spec} ---")
+                    log.warning("Skipping invalid assistant config entry", entry=spec)
 
             if not valid_specs:
                 # If after filtering there are no valid agents, we cannot start an interactive session.
@@ -216,14 +248,12 @@ async def smart_ask(
         else:
             rag_log = ChatLog(session_id=session_id, user_id=current_user.id, sender="rag", content=json.dumps(response))
             await crud.create_chat_log(db, rag_log)
+            log_query(payload.query, _answer_text(response), payload.lang)
 
         return response
         
     except Exception as e:
-        print(f"ERROR in smart_ask: {type(e).__name__}: {e}")
-        # Add more detail to the exception for easier debugging
-        import traceback
-        traceback.print_exc()
+        log.exception("smart_ask failed")
         raise HTTPException(status_code=500, detail=f"An internal server error occurred: {str(e)}")
 
 @router.post("/ask/public/{agent_id}", tags=["Core"], summary="Ask a question to a public agent (requires API Key)")
@@ -270,17 +300,22 @@ async def public_smart_ask(
         # Use the dynamically loaded agent's configuration
         final_assistant_configs = [agent_config_model.model_dump()]
 
-        print(f"--- [API /ask/public] Invoking orchestrator for agent: {agent_config_model.name} ---")
+        log.info("/ask/public invoking orchestrator", agent=agent_config_model.name)
         
         inputs = {
             "question": payload.query,
             "lang": payload.lang,
             "supervisor_profile": SUPERVISOR_PROFILE, # Using the global supervisor profile
-            "assistant_configs": final_assistant_configs
+            "assistant_configs": final_assistant_configs,
+            # Only search the agent's own knowledge base
+            "retrieval_filter": knowledge_base_filter(agent_config_model.knowledge_base_files, agent_config_model.knowledge_base_urls),
+            "retrieval_namespaces": search_namespaces(owner_user_id),
         }
         
         # 3. Invoke the central orchestrator (LangGraph)
-        final_state = app_graph.invoke(inputs)
+        with span("orchestrator.invoke", **{"agent.count": 1, "agent.id": agent_id}):
+            # Off the event loop, so concurrent requests overlap (and share embedding batches)
+            final_state = await run_in_executor_with_context(asyncio.get_running_loop(), app_graph.invoke, inputs)
         response = final_state.get("final_response") or {}
         response["session_id"] = session_id
 
@@ -311,11 +346,12 @@ async def public_smart_ask(
             # The 'response' variable already contains the full structured JSON from the RAG pipeline
             rag_log = ChatLog(session_id=session_id, user_id=owner_user_id, sender="rag", content=json.dumps(response))
             await crud.create_chat_log(db, rag_log)
+            log_query(payload.query, _answer_text(response), payload.lang)
 
         return response
         
     except Exception as e:
-        print(f"ERROR in public_smart_ask: {type(e).__name__}: {e}")
+        log.exception("public_smart_ask failed")
         raise HTTPException(status_code=500, detail="An internal server error occurred.")
 
 
@@ -333,15 +369,19 @@ async def direct_rag_query(
         user_log = ChatLog(session_id=session_id, user_id=current_user.id, sender="user", content=payload.query)
         await crud.create_chat_log(db, user_log)
 
-        rag_response = get_rag_answer(query=payload.query, lang=payload.lang)
+        rag_response = await run_in_executor_with_context(
+            asyncio.get_running_loop(),
+            functools.partial(get_rag_answer, query=payload.query, lang=payload.lang, namespaces=search_namespaces(current_user.id)),
+        )
         rag_response["session_id"] = session_id
 
         rag_log = ChatLog(session_id=session_id, user_id=current_user.id, sender="rag", content=json.dumps(rag_response))
         await crud.create_chat_log(db, rag_log)
+        log_query(payload.query, _answer_text(rag_response), payload.lang)
 
         return rag_response
     except Exception as e:
-        print(f"ERROR in direct_rag_query: {type(e).__name__}: {e}")
+        log.exception("direct_rag_query failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -367,8 +407,8 @@ async def upload_file(file: UploadFile = File(...), current_user: UserPublic = D
         if not docs:
             raise HTTPException(status_code=400, detail="Could not process file.")
         chunks = chunk_documents(docs)
-        embed_and_store_chunks(chunks)
-        return {"message": f"Successfully ingested '{file.filename}'. {len(chunks)} chunks added."}
+        added = embed_and_store_chunks(chunks, namespace=tenant_namespace(current_user.id))
+        return {"message": f"Successfully ingested '{file.filename}'. {added} chunks added ({len(chunks) - added} near-duplicates skipped)."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to process file: {e}")
 
@@ -376,12 +416,13 @@ async def upload_file(file: UploadFile = File(...), current_user: UserPublic = D
 async def ingest_from_url(payload: URLIngestRequest, current_user: UserPublic = Depends(get_current_user)):
     url_to_ingest = str(payload.url)
     try:
-        docs = load_from_source(url_to_ingest)
+        loop = asyncio.get_running_loop()
+        docs = await run_in_executor_with_context(loop, load_from_source, url_to_ingest)
         if not docs:
             raise HTTPException(status_code=400, detail=f"Could not load content from URL: {url_to_ingest}.")
         chunks = chunk_documents(docs)
-        embed_and_store_chunks(chunks)
-        return {"message": f"Successfully ingested content from '{url_to_ingest}'. {len(chunks)} chunks added."}
+        added = await run_in_executor_with_context(loop, embed_and_store_chunks, chunks, tenant_namespace(current_user.id))
+        return {"message": f"Successfully ingested content from '{url_to_ingest}'. {added} chunks added ({len(chunks) - added} near-duplicates skipped)."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to process URL: {str(e)}")
 
@@ -390,6 +431,65 @@ async def ingest_knowledge_base(background_tasks: BackgroundTasks, current_user:
     background_tasks.add_task(run_ingestion_pipeline)
     return {"message": "Knowledge base ingestion started in the background. Check server logs for progress."}
 
+@router.post("/search-all", tags=["Admin & Data"])
+async def search_all_tenants(payload: TenantSearchRequest, current_user: UserPublic = Depends(get_admin_user)) -> Dict:
+    """
+    Searches several (by default all) tenant namespaces in parallel and
+    returns the merged top-k. Restricted to RAG_ADMIN_EMAILS.
+    """
+    loop = asyncio.get_running_loop()
+    namespaces = payload.namespaces or await run_in_executor_with_context(loop, list_namespaces)
+    matches = await run_in_executor_with_context(loop, search_scored_documents, payload.query, payload.k, None, namespaces)
+    return {
+        "namespaces": len(namespaces),
+        "results": [
+            {
+                "namespace": doc.metadata.get("namespace", ""),
+                "source": doc.metadata.get("source"),
+                "score": score,
+                "content": doc.page_content,
+            }
+            for doc, score in matches
+        ],
+    }
+
+@router.post("/dedupe/reset", tags=["Admin & Data"])
+async def reset_dedupe_signatures(payload: DedupeResetRequest, current_user: UserPublic = Depends(get_admin_user)) -> Dict:
+    """
+    Clears the near-duplicate filter's memory of stored chunks, so sources
+    whose vectors were deleted (or whose index was recreated) can be
+    ingested again. Restricted to RAG_ADMIN_EMAILS.
+    """
+    if payload.all_namespaces:
+        removed = await asyncio.to_thread(chunk_deduplicator.reset)
+    else:
+        removed = await asyncio.to_thread(chunk_deduplicator.forget, payload.namespace, payload.origin)
+    return {"signatures_removed": removed}
+
+@router.get("/query-logs", tags=["Admin & Data"])
+async def list_query_logs(
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    lang: Optional[str] = None,
+    limit: int = 100,
+    offset: int = 0,
+    current_user: UserPublic = Depends(get_admin_user)
+) -> List[Dict]:
+    """
+    Lists logged questions and answers of all users, newest first.
+    `since`/`until` are ISO timestamps. Restricted to RAG_ADMIN_EMAILS.
+    """
+    return await asyncio.to_thread(get_query_logs, since, until, lang, min(limit, 1000), offset)
+
+@router.get("/query-logs/stats", tags=["Admin & Data"])
+async def query_log_stats(
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    current_user: UserPublic = Depends(get_admin_user)
+) -> Dict:
+    """Returns query volume per language and per day. Restricted to RAG_ADMIN_EMAILS."""
+    return await asyncio.to_thread(get_query_stats, since, until)
+
 
 # --- Studio & Default Config Endpoints ---
 
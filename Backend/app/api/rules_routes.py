@@ -1,25 +1,32 @@
 # --- START OF FILE app/api/rules_routes.py ---
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Dict, Any
-import json # Added this import for debugging prints
-
-# CORRECTED IMPORT: Use 'import zen' instead of 'from zen_engine import ZenEngine'
-import zen # <<< FIX: Changed import to 'import zen'
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, Optional
+import json
+import time
 
+from app.config import settings
 from app.db.database import get_database
 from app.db import crud
 from app.auth.dependencies import get_current_user
+from app.log import get_logger
+from app.rules.decision_cache import decision_cache, evaluate_decision
+from app.rules.batch import buffered_chunks, evaluate_many, summarize, stream_evaluations
 from app.auth.schemas import (
     UserPublic,
     DecisionTableCreate,
     DecisionTableResponse,
     EvaluateRuleRequest,
-    EvaluateRuleResponse
+    EvaluateRuleResponse,
+    EvaluateBatchRequest,
+    EvaluateBatchResponse
 )
 from app.auth.models import DecisionTableInDB
 from bson.objectid import ObjectId
 
+log = get_logger(__name__)
+
 router = APIRouter(prefix="/rules", tags=["Rule Management & Evaluation"])
 
 # ====================================================================
@@ -112,6 +119,7 @@ async def update_decision_table_endpoint(
     Updates an existing decision table definition.
     """
     updated_table = await crud.update_decision_table(db, table_id, current_user.id, table_update)
+    decision_cache.invalidate(table_id)
     if not updated_table:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -138,6 +146,7 @@ async def delete_decision_table_endpoint(
     Deletes a decision table definition.
     """
     success = await crud.delete_decision_table(db, table_id, current_user.id)
+    decision_cache.invalidate(table_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -148,6 +157,38 @@ async def delete_decision_table_endpoint(
 # ====================================================================
 # Decision Table Evaluation Endpoint
 # ====================================================================
+async def _load_compiled_decision(db, table_id: str, user_id: str):
+    """Fetches a decision table the user owns and returns its compiled decision."""
+    decision_table = await crud.get_decision_table_by_id(db, table_id=table_id, user_id=user_id)
+    if not decision_table:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Decision table not found or you do not have permission to access it."
+        )
+
+    # The definition is only serialized when DEBUG is enabled
+    log.debug(
+        "Compiling decision table",
+        sample=settings.LOG_PAYLOAD_SAMPLE_RATE,
+        table_id=table_id,
+        definition=lambda: json.dumps(decision_table.definition),
+    )
+    try:
+        return decision_cache.get_or_compile(table_id, user_id, decision_table.definition)
+    except Exception as e:
+        log.exception("Decision table compilation failed", table_id=table_id)
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Decision table definition is invalid: {str(e)}"
+        )
+
+async def _get_compiled_decision(db, table_id: str, user_id: str):
+    """Returns the cached compiled decision, loading it from Mongo on a miss."""
+    decision = decision_cache.get_current(table_id, user_id)
+    if decision is None:
+        decision = await _load_compiled_decision(db, table_id, user_id)
+    return decision
+
 @router.post(
     "/evaluate_rule",
     response_model=EvaluateRuleResponse,
@@ -161,75 +202,18 @@ async def evaluate_rule_endpoint(
     """
     Accepts an input JSON payload, retrieves a decision table by ID,
     and uses zen-engine to evaluate it, returning the decision results.
+    Compiled decisions are cached, so hot tables skip both the Mongo read
+    and the zen compile step.
     """
-    # 1. Fetch the decision table
-    decision_table = await crud.get_decision_table_by_id(
-        db, table_id=payload.table_id, user_id=current_user.id
-    )
-    if not decision_table:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Decision table not found or you do not have permission to access it."
-        )
-
-    # 2. Debug prints
-    print("\n--- DEBUGGING ZEN-ENGINE INITIALIZATION ---")
-    print(f"Table ID: {payload.table_id}")
-    print(f"Type of definition from DB: {type(decision_table.definition)}")
-    print(f"Content of definition from DB:\n{json.dumps(decision_table.definition, indent=2)}")
-    print("-------------------------------------------\n")
+    # 1. Use the cached compiled decision, or fetch and compile the table
+    decision = await _get_compiled_decision(db, payload.table_id, current_user.id)
 
     try:
-        # 3. Initialize engine
-        engine = zen.ZenEngine()
-
-        # 4. Wrap plain decision table into a graph if needed
-        if "nodes" in decision_table.definition:
-            wrapped_definition = decision_table.definition
-        else:
-            node_type = (
-                "decisionTableNode"
-                if decision_table.definition.get("kind") == "DecisionTable"
-                else "customNode"
-            )
-
-            # Ensure decision table content has an ID
-            table_content = dict(decision_table.definition)
-            if "id" not in table_content:
-                table_content["id"] = f"table_{payload.table_id}"
-
-            # Ensure node also has an ID
-            wrapped_definition = {
-                "nodes": [
-                    {
-                        "id": "node_main",  # ✅ outer node ID
-                        "name": table_content.get("name", "Main Decision Table"),
-                        "type": node_type,
-                        "content": table_content  # ✅ inner content with ID
-                    }
-                ],
-                "edges": []
-            }
-
-        print("\n--- DEBUG: Wrapped Definition ---")
-        print(json.dumps(wrapped_definition, indent=2))
-        print("---------------------------------\n")
-
-        # 5. Create decision and evaluate
-        decision = engine.create_decision(wrapped_definition)
-        result = await decision.evaluate(payload.context)
-
-        # 6. Extract results safely
-        errors, output = [], None
-        if isinstance(result, dict):
-            errors = result.get("errors", [])
-            output = result.get("result")
-        else:
-            errors = getattr(result, "errors", [])
-            output = getattr(result, "result", None)
+        # 2. Evaluate
+        errors, output = await evaluate_decision(decision, payload.context)
 
         if errors:
-            print(f"DEBUG: ZenEngine evaluation errors: {errors}")
+            log.warning("ZenEngine evaluation errors", table_id=payload.table_id, errors=errors)
             raise HTTPException(
                 status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
                 detail=f"Decision evaluation failed: {errors}"
@@ -241,15 +225,99 @@ async def evaluate_rule_endpoint(
                 detail="ZenEngine returned no result."
             )
 
-        # 7. Return response
+        # 3. Return response
         return EvaluateRuleResponse(
             table_id=payload.table_id,
             result=output
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"DEBUG: Error during evaluation: {e}")
+        log.exception("Decision table evaluation failed", table_id=payload.table_id)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Unexpected error during evaluation: {str(e)}"
         )
+
+# ====================================================================
+# Batch Evaluation Endpoints
+# ====================================================================
+@router.post(
+    "/evaluate_batch",
+    response_model=EvaluateBatchResponse,
+    summary="Evaluate a decision table against many contexts"
+)
+async def evaluate_batch_endpoint(
+    payload: EvaluateBatchRequest,
+    current_user: UserPublic = Depends(get_current_user),
+    db=Depends(get_database)
+):
+    """
+    Compiles the table once and evaluates every context concurrently.
+    A failing context does not fail the batch; its error is reported in
+    its own result entry.
+    """
+    if len(payload.contexts) > settings.DECISION_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"A batch may contain at most {settings.DECISION_BATCH_MAX_ITEMS} contexts. Use the NDJSON stream endpoint for larger jobs."
+        )
+
+    decision = await _get_compiled_decision(db, payload.table_id, current_user.id)
+
+    started_at = time.perf_counter()
+    results = await evaluate_many(decision, payload.contexts, payload.concurrency or settings.DECISION_BATCH_CONCURRENCY)
+    summary = summarize(results, started_at)
+    log.info("Evaluated decision batch", table_id=payload.table_id, items=len(results), **summary)
+
+    return EvaluateBatchResponse(table_id=payload.table_id, results=results, **summary)
+
+def _stream_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"An NDJSON stream may be at most {settings.DECISION_STREAM_MAX_BYTES} bytes. Split the job into several requests."
+    )
+
+async def _read_limited_body(request: Request, max_bytes: int) -> bytes:
+    """Reads the request body, giving up with a 413 as soon as it passes `max_bytes`."""
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise _stream_too_large()
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+@router.post(
+    "/evaluate_batch/{table_id}/stream",
+    summary="Evaluate a decision table against an NDJSON stream of contexts"
+)
+async def evaluate_batch_stream_endpoint(
+    table_id: str,
+    request: Request,
+    concurrency: Optional[int] = Query(None, ge=1, le=1024),
+    current_user: UserPublic = Depends(get_current_user),
+    db=Depends(get_database)
+):
+    """
+    Reads one JSON context per line from the request body and streams back
+    one JSON result per line (same order), followed by a summary line with
+    counts and throughput. Suited to jobs too large for a single JSON array.
+
+    The body is buffered before evaluation starts, so it is limited to
+    DECISION_STREAM_MAX_BYTES; larger uploads are rejected with a 413.
+    """
+    declared_length = request.headers.get("content-length")
+    if declared_length and declared_length.isdigit() and int(declared_length) > settings.DECISION_STREAM_MAX_BYTES:
+        raise _stream_too_large()
+    decision = await _get_compiled_decision(db, table_id, current_user.id)
+    # The body is read here, while the request is still ours: once the
+    # StreamingResponse starts, the response owns the connection.
+    body = await _read_limited_body(request, settings.DECISION_STREAM_MAX_BYTES)
+    lines = stream_evaluations(
+        decision,
+        buffered_chunks(body),
+        concurrency or settings.DECISION_BATCH_CONCURRENCY,
+    )
+    return StreamingResponse(lines, media_type="application/x-ndjson")
@@ -1,6 +1,6 @@
 # --- START OF FILE app/api/tool_routes.py ---
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 from typing import List
 
 from app.db.database import get_database
@@ -14,11 +14,16 @@ router = APIRouter(prefix="/tools", tags=["Tool Management"])
 
 @router.get("", response_model=List[ToolResponse])
 async def get_my_tools(
+    response: Response,
     current_user: UserPublic = Depends(get_current_user),
     db=Depends(get_database),
 ):
-    """Lists all reusable tools created by the currently authenticated user."""
+    """
+    Lists all reusable tools created by the currently authenticated user.
+    The X-Tools-Version header changes whenever a save changes the tools.
+    """
     tools_from_db: List[ToolInDB] = await crud.get_tools_for_user(db, user_id=current_user.id)
+    response.headers["X-Tools-Version"] = str(await crud.get_tools_version(db, current_user.id))
 
     # Explicitly cast ObjectId -> str for id
     return [
@@ -36,14 +41,17 @@ async def get_my_tools(
 @router.post("", response_model=List[ToolResponse], summary="Save all tools")
 async def save_all_tools(
     tools: List[ToolCreate],
+    response: Response,
     current_user: UserPublic = Depends(get_current_user),
     db=Depends(get_database),
 ):
     """
-    Replaces the user's entire tool collection with the provided list.
-    This corresponds to the 'Save All Tools' button.
+    Makes the user's tool collection match the provided list.
+    This corresponds to the 'Save All Tools' button. Only changed tools are
+    written, and existing tools keep their IDs.
     """
-    updated_tools_from_db: List[ToolInDB] = await crud.update_tools_for_user(db, tools, current_user.id)
+    updated_tools_from_db, version = await crud.update_tools_for_user(db, tools, current_user.id)
+    response.headers["X-Tools-Version"] = str(version)
 
     # Explicitly cast ObjectId -> str for id
     return [
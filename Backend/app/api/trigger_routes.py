@@ -5,60 +5,74 @@ from typing import Dict, Any, Optional
 
 # --- Database and Authentication Imports ---
 from app.db.database import get_database
-from app.auth.schemas import ChatMessageTrigger, FormSubmissionTrigger
+from app.auth.schemas import ChatMessageTrigger, FormSubmissionTrigger, TriggerAccepted
+from app.workflows.triggers import trigger_dispatcher, trigger_keys, TriggerQueueFull, WORKFLOW_TRIGGERS
+from app.log import get_logger
+
+log = get_logger(__name__)
 
 router = APIRouter(prefix="/trigger", tags=["Workflow Triggers"])
 
-@router.post("/chat_message", status_code=status.HTTP_200_OK)
+
+async def _dispatch(
+    db,
+    trigger: str,
+    flow_id: str,
+    api_key: Optional[str],
+    idempotency_key: Optional[str],
+    input_data: Dict[str, Any],
+) -> TriggerAccepted:
+    """Authenticates the trigger against the workflow's key and stores a queued run."""
+    if not api_key:
+        WORKFLOW_TRIGGERS.labels(trigger=trigger, result="unauthorized").inc()
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="X-Workflow-API-Key header is missing. This trigger requires authentication."
+        )
+    owner_id = await trigger_keys.owner_of(db, flow_id, api_key)
+    if owner_id is None:
+        WORKFLOW_TRIGGERS.labels(trigger=trigger, result="unauthorized").inc()
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid workflow ID or API key.")
+
+    try:
+        run_id, duplicate = await trigger_dispatcher.dispatch(db, flow_id, owner_id, trigger, input_data, idempotency_key)
+    except TriggerQueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many trigger events in flight, retry later.",
+            headers={"Retry-After": "1"},
+        )
+    log.info("Trigger queued", trigger=trigger, flow_id=flow_id, run_id=run_id, duplicate=duplicate)
+    return TriggerAccepted(run_id=run_id, status="duplicate" if duplicate else "queued")
+
+
+@router.post("/chat_message", status_code=status.HTTP_202_ACCEPTED, response_model=TriggerAccepted)
 async def handle_chat_message_trigger(
     payload: ChatMessageTrigger,
-    # In a real app, you'd authenticate this with a specific API key
-    # associated with the workflow, not a user token.
     x_workflow_api_key: Optional[str] = Header(None), # For securing the trigger
+    idempotency_key: Optional[str] = Header(None), # Retries with the same key start the workflow once
     db=Depends(get_database) # Access to DB for workflow lookup
 ):
     """
     Endpoint to receive a chat message and trigger a workflow.
     Requires a workflow-specific API key for security (X-Workflow-API-Key header).
+    The workflow runs in the background; the response carries its run ID.
     """
-    if not x_workflow_api_key:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="X-Workflow-API-Key header is missing. This trigger requires authentication."
-        )
-
-    # TODO: In a real implementation, you would:
-    # 1. Validate x_workflow_api_key against a key stored with the workflow.
-    #    e.g., workflow = await crud.get_workflow_by_api_key(db, payload.flow_id, x_workflow_api_key)
-    # 2. Retrieve the full workflow definition using payload.flow_id.
-    # 3. Queue/Start the workflow execution with the payload data.
-    
-    print(f"--- [TRIGGER] Chat Message Received for Flow ID: {payload.flow_id} ---")
-    print(f"Message: {payload.message}")
-    print(f"Session ID: {payload.session_id}")
-    print(f"User ID: {payload.user_id}")
-    
-    return {"message": "Chat message received, workflow triggered (mock)."}
+    log.debug("Chat message trigger payload", message=payload.message)
+    input_data = {"message": payload.message, "session_id": payload.session_id, "user_id": payload.user_id}
+    return await _dispatch(db, "chat_message", payload.flow_id, x_workflow_api_key, idempotency_key, input_data)
 
-@router.post("/form_submission", status_code=status.HTTP_200_OK)
+@router.post("/form_submission", status_code=status.HTTP_202_ACCEPTED, response_model=TriggerAccepted)
 async def handle_form_submission_trigger(
     payload: FormSubmissionTrigger,
     x_workflow_api_key: Optional[str] = Header(None), # For securing the trigger
+    idempotency_key: Optional[str] = Header(None),
     db=Depends(get_database)
 ):
     """
     Endpoint to receive a form submission and trigger a workflow.
     Requires a workflow-specific API key for security (X-Workflow-API-Key header).
+    The form fields become the workflow's input data.
     """
-    if not x_workflow_api_key:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="X-Workflow-API-Key header is missing. This trigger requires authentication."
-        )
-
-    # TODO: Real implementation would validate the key and queue the workflow.
-    
-    print(f"--- [TRIGGER] Form Submission Received for Flow ID: {payload.flow_id} ---")
-    print(f"Form Data: {payload.form_data}")
-
-    return {"message": "Form submission received, workflow triggered (mock)."}
\ No newline at end of file
+    log.debug("Form submission trigger payload", form_data=payload.form_data)
+    return await _dispatch(db, "form_submission", payload.flow_id, x_workflow_api_key, idempotency_key, dict(payload.form_data))
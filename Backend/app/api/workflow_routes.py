@@ -1,7 +1,9 @@
 # --- START OF FILE app/api/workflow_routes.py (REFACTORED) ---
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from typing import List, Dict, Any
+import json
 import uuid
 
 # --- Core Application Imports ---
@@ -12,11 +14,20 @@ from app.auth.schemas import (
     UserPublic, 
     WorkflowCreate, 
     WorkflowResponse,
-    WorkflowExecutionRequest, 
-    RunAgentRequest
+    WorkflowExecutionRequest,
+    WorkflowRunCreated,
+    WorkflowRunResponse,
+    WorkflowApiKeyResponse
 )
 from app.auth.models import WorkflowInDB
-from app.services import agent_service
+from app.workflows.engine import WorkflowContext, WorkflowDefinitionError, execute, final_result
+from app.workflows.plan_cache import workflow_plan_cache, load_plan
+from app.workflows.runs import workflow_runs, run_view, WorkflowQueueFull, TERMINAL_STATUSES
+from app.workflows.triggers import trigger_keys
+from app.config import settings
+from app.log import get_logger
+
+log = get_logger(__name__)
 
 router = APIRouter(prefix="/workflows", tags=["Workflow Management"])
 
@@ -136,6 +147,8 @@ async def update_existing_workflow(
     Updates an existing workflow definition for the authenticated user.
     """
     updated_workflow = await crud.update_workflow(db, workflow_id, current_user.id, workflow_update)
+    workflow_plan_cache.invalidate(workflow_id)
+    trigger_keys.invalidate(workflow_id)
     if not updated_workflow:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -162,6 +175,8 @@ async def delete_existing_workflow(
     Deletes a workflow definition for the authenticated user.
     """
     success = await crud.delete_workflow(db, workflow_id, current_user.id)
+    workflow_plan_cache.invalidate(workflow_id)
+    trigger_keys.invalidate(workflow_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -169,6 +184,56 @@ async def delete_existing_workflow(
         )
     return
 
+@router.get(
+    "/{workflow_id}/api_key",
+    response_model=WorkflowApiKeyResponse,
+    summary="Get the trigger API key of a workflow"
+)
+async def get_workflow_api_key(
+    workflow_id: str,
+    current_user: UserPublic = Depends(get_current_user),
+    db=Depends(get_database)
+):
+    """
+    Returns the key external triggers must send in X-Workflow-API-Key.
+    Workflows created before trigger keys existed get one on first request.
+    """
+    workflow = await crud.get_workflow_by_id(db, workflow_id=workflow_id, user_id=current_user.id)
+    if not workflow:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workflow not found.")
+    api_key = workflow.api_key
+    if not api_key:
+        api_key = str(uuid.uuid4())
+        await crud.set_workflow_api_key(db, workflow_id, current_user.id, api_key)
+    return WorkflowApiKeyResponse(workflow_id=workflow_id, api_key=api_key)
+
+@router.post(
+    "/{workflow_id}/api_key/rotate",
+    response_model=WorkflowApiKeyResponse,
+    summary="Replace the trigger API key of a workflow"
+)
+async def rotate_workflow_api_key(
+    workflow_id: str,
+    current_user: UserPublic = Depends(get_current_user),
+    db=Depends(get_database)
+):
+    """Issues a new trigger key; the old one stops working immediately in this process."""
+    api_key = str(uuid.uuid4())
+    if not await crud.set_workflow_api_key(db, workflow_id, current_user.id, api_key):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workflow not found.")
+    trigger_keys.invalidate(workflow_id)
+    return WorkflowApiKeyResponse(workflow_id=workflow_id, api_key=api_key)
+
+async def _load_plan_or_raise(db, workflow_id: str, user_id: str):
+    """Returns the compiled plan or raises 404 (missing) / 400 (invalid definition)."""
+    try:
+        plan = await load_plan(db, workflow_id, user_id)
+    except WorkflowDefinitionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if plan is None:
+        raise HTTPException(status_code=404, detail="Workflow not found or has no definition.")
+    return plan
+
 # ====================================================================
 # Workflow Execution Endpoint (REWRITTEN FOR SYNCHRONOUS AGENT STEPS)
 # ====================================================================
@@ -186,77 +251,126 @@ async def execute_workflow(
     db=Depends(get_database)
 ):
     """
-    Executes a saved workflow. If an AI Agent node is reached, it will
-    run the agent synchronously and return its final answer as the result
-    of this workflow step.
+    Executes a saved workflow. The definition is compiled into an execution
+    graph (cached per definition hash) and every node reachable from the triggers runs once its inputs are
+    ready; independent branches run concurrently. The result of the last
+    sink node is returned along with every node's output and timing.
     """
-    print(f"--- [ORCHESTRATOR] Executing workflow {workflow_id} ---")
-    
-    # ... (Workflow fetching and trigger node finding logic is unchanged) ...
-    workflow = await crud.get_workflow_by_id(db, workflow_id=workflow_id, user_id=current_user.id)
-    if not workflow or not workflow.definition:
-        raise HTTPException(status_code=404, detail="Workflow not found or has no definition.")
+    log.info("Executing workflow", workflow_id=workflow_id)
+
+    plan = await _load_plan_or_raise(db, workflow_id, current_user.id)
+
+    ctx = WorkflowContext(
+        db=db,
+        user_id=current_user.id,
+        input_data=payload.input_data,
+        chat_history=payload.chat_history or [],
+    )
+    run = await execute(plan, ctx)
+    log.info(
+        "Workflow finished",
+        workflow_id=workflow_id,
+        status=run.status,
+        nodes=len(run.node_timings_ms),
+        failed=len(run.errors),
+    )
 
-    nodes = workflow.definition.get("nodes", [])
-    edges = workflow.definition.get("edges", [])
-    target_node_ids = {edge['target'] for edge in edges}
-    trigger_nodes = [node for node in nodes if node['id'] not in target_node_ids]
+    result, final_node_type = final_result(plan, run.final_node_id, run.outputs)
 
-    if not trigger_nodes:
-        raise HTTPException(status_code=400, detail="Workflow has no trigger node.")
-    
-    current_node = trigger_nodes[0]
-    current_data = payload.input_data
-    
-    print(f"--- [ORCHESTRATOR] Starting with Trigger: {current_node.get('data', {}).get('label')} ---")
+    return {
+        "result": result,
+        "workflow_status": run.status,
+        "final_node_type": final_node_type,
+        "outputs": run.outputs,
+        "errors": run.errors,
+        "skipped": run.skipped,
+        "node_timings_ms": run.node_timings_ms,
+    }
 
-    next_step_edge = next((edge for edge in edges if edge['source'] == current_node['id']), None)
-    if not next_step_edge:
-        return {"result": "Workflow started but has no connected steps."}
+# ====================================================================
+# Asynchronous Workflow Runs
+# ====================================================================
 
-    next_node_id = next_step_edge['target']
-    current_node = next((node for node in nodes if node['id'] == next_node_id), None)
-    
-    if not current_node:
-        raise HTTPException(status_code=400, detail=f"Graph is broken. Edge points to non-existent node ID {next_node_id}.")
-        
-    node_type = current_node.get("type")
+@router.post(
+    "/{workflow_id}/runs",
+    response_model=WorkflowRunCreated,
+    status_code=status.HTTP_202_ACCEPTED,
+    tags=["Workflow Execution"],
+    summary="Start a workflow run in the background"
+)
+async def start_workflow_run(
+    workflow_id: str,
+    payload: WorkflowExecutionRequest,
+    current_user: UserPublic = Depends(get_current_user),
+    db=Depends(get_database)
+):
+    """
+    Queues a workflow run and returns its ID immediately. Progress is
+    checkpointed per node, so the run survives restarts; poll
+    GET /workflows/runs/{run_id} or subscribe to /workflows/runs/{run_id}/events.
+    """
+    # Validate up front so a broken definition fails here, not in the background.
+    await _load_plan_or_raise(db, workflow_id, current_user.id)
+    try:
+        run = await workflow_runs.submit(workflow_id, current_user.id, payload.input_data, payload.chat_history)
+    except WorkflowQueueFull:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Workflow run queue is full, retry later.")
+    log.info("Workflow run queued", workflow_id=workflow_id, run_id=str(run.id))
+    return WorkflowRunCreated(run_id=str(run.id), status=run.status)
 
-    # <<< THIS IS THE CORE LOGIC CHANGE >>>
-    if node_type == "aiAgentNode":
-        print(f"--- [ORCHESTRATOR] AI Agent Node found. Executing synchronously. ---")
-        try:
-            agent_data = current_node.get("data", {})
-            agent_input_data = {"message": current_data.get("message")}
-            if not agent_input_data["message"]:
-                raise ValueError("Input data for AI Agent node must contain a 'message' field.")
+@router.get(
+    "/runs/{run_id}",
+    response_model=WorkflowRunResponse,
+    tags=["Workflow Execution"],
+    summary="Get the status of a workflow run"
+)
+async def get_workflow_run(
+    run_id: str,
+    current_user: UserPublic = Depends(get_current_user),
+    db=Depends(get_database)
+):
+    run = await crud.get_workflow_run(db, run_id, current_user.id)
+    if not run:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workflow run not found.")
+    return WorkflowRunResponse(**run_view(run))
+
+@router.get(
+    "/runs/{run_id}/events",
+    tags=["Workflow Execution"],
+    summary="Subscribe to a workflow run (Server-Sent Events)"
+)
+async def stream_workflow_run(
+    run_id: str,
+    current_user: UserPublic = Depends(get_current_user),
+    db=Depends(get_database)
+):
+    """
+    Streams a `node` event for every finished node and a final `run` event
+    with the complete run once it reaches a terminal status.
+    """
+    run = await crud.get_workflow_run(db, run_id, current_user.id)
+    if not run:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workflow run not found.")
 
-            run_agent_payload = RunAgentRequest(
-                input_data=agent_input_data,
-                chat_model_config=agent_data.get("chatModel") or {},
-                memory_config=agent_data.get("memory"),
-                tools_config=agent_data.get("tools", []),
-                chat_history=payload.chat_history or []
-            )
-            
-            # Directly await the agent service. No background task or WebSocket.
-            final_answer = await agent_service.execute_dynamic_agent(
-                payload=run_agent_payload,
-                db=db,
-                user_id=current_user.id
-            )
-            
-            # Return the agent's answer as the result of the workflow execution.
-            return {
-                "result": final_answer,
-                "workflow_status": "completed",
-                "final_node_type": "aiAgentNode"
-            }
+    def sse(event: str, data: Dict[str, Any]) -> str:
+        return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
 
-        except Exception as e:
-            print(f"--- [ORCHESTRATOR] UNEXPECTED ERROR during agent node execution: {str(e)} ---")
-            raise HTTPException(status_code=500, detail=f"An unexpected error occurred in the agent node: {str(e)}")
+    async def events():
+        nonlocal run
+        sent, last_status = 0, None
+        while True:
+            for checkpoint in run.checkpoints[sent:]:
+                yield sse("node", checkpoint.model_dump())
+            sent = len(run.checkpoints)
+            if run.status in TERMINAL_STATUSES:
+                yield sse("run", run_view(run))
+                return
+            if run.status != last_status:
+                last_status = run.status
+                yield sse("status", {"status": run.status})
+            await workflow_runs.wait_for_change(run_id, settings.WORKFLOW_RUN_POLL_SECONDS)
+            run = await crud.get_workflow_run(db, run_id, current_user.id)
+            if run is None:
+                return
 
-    else:
-        # This part remains for other, non-interactive node types
-        return {"result": f"Reached node '{current_node.get('data', {}).get('label')}' but execution logic is not yet implemented for type '{node_type}'."}
\ No newline at end of file
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
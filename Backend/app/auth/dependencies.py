@@ -45,8 +45,20 @@ async def get_current_user(
     )
 
 
+# --- Function 2: For Admin-Only HTTP Endpoints ---
+async def get_admin_user(
+    current_user: schemas.UserPublic = Depends(get_current_user)
+) -> schemas.UserPublic:
+    """Like get_current_user, but only lets through the users listed in RAG_ADMIN_EMAILS."""
+    if current_user.email.lower() not in settings.RAG_ADMIN_EMAILS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="This endpoint is restricted to administrators.",
+        )
+    return current_user
+
 
-# --- Function 2: For WebSocket Connections (Corrected) ---
+# --- Function 3: For WebSocket Connections (Corrected) ---
 async def get_current_user_for_websocket(token: str) -> schemas.UserPublic:
     """A self-contained authenticator for WebSocket connections."""
     db = get_database()
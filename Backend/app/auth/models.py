@@ -70,6 +70,7 @@ class AgentConfiguration(BaseModel):
     system_message: str = Field(..., min_length=1, description="System message / persona for the agent")
     tasks: List[Dict[str, Any]] = Field(default_factory=list, description="List of tasks/tools the agent can perform, defined as dictionaries")
     knowledge_base_files: List[str] = Field(default_factory=list, description="List of filenames in the knowledge base associated with this agent")
+    knowledge_base_urls: List[str] = Field(default_factory=list, description="List of URLs in the knowledge base associated with this agent")
     public_api_key: Optional[str] = Field(default=None, description="Unique API key for public access to this agent, auto-generated on creation") # Added public_api_key
     
     class Config:
@@ -104,6 +105,41 @@ class WorkflowInDB(BaseModel):
     description: Optional[str] = Field(None, max_length=500, description="Optional description of the workflow's purpose")
     # This could be a complex JSON structure for your workflow engine (e.g., LangGraph, custom format)
     definition: Dict[str, Any] = Field(..., description="The JSON definition of the workflow structure.")
+    api_key: Optional[str] = Field(default=None, description="Key external triggers must send in X-Workflow-API-Key, auto-generated on creation")
+
+    class Config:
+        json_encoders = {ObjectId: str}
+        populate_by_name = True
+        arbitrary_types_allowed = True
+
+class WorkflowRunCheckpoint(BaseModel):
+    """The outcome of one node within a workflow run."""
+    node_id: str = Field(..., description="ID of the node that finished")
+    output: Any = Field(None, description="The node's output (None if it failed)")
+    error: Optional[str] = Field(None, description="Error message if the node failed")
+    duration_ms: float = Field(..., description="How long the node took to execute")
+    finished_at: datetime = Field(default_factory=datetime.utcnow)
+
+class WorkflowRunInDB(BaseModel):
+    id: PyObjectId = Field(default_factory=PyObjectId, alias="_id", description="Unique identifier for the run")
+    workflow_id: PyObjectId = Field(..., description="ID of the workflow being run")
+    user_id: PyObjectId = Field(..., description="ID of the user who owns the workflow")
+    status: str = Field("queued", description="queued, running, completed or failed")
+    input_data: Dict[str, Any] = Field(default_factory=dict)
+    chat_history: List[Dict[str, Any]] = Field(default_factory=list)
+    checkpoints: List[WorkflowRunCheckpoint] = Field(default_factory=list, description="Per-node outputs, in completion order")
+    result: Any = Field(None, description="Output of the final node once the run has finished")
+    final_node_type: Optional[str] = None
+    errors: Dict[str, str] = Field(default_factory=dict)
+    skipped: List[str] = Field(default_factory=list)
+    trigger: Optional[str] = Field(None, description="Trigger that started the run (e.g. chat_message), None for API runs")
+    idempotency_key: Optional[str] = Field(None, description="Caller-supplied key; at most one run per workflow and key")
+    owner: Optional[str] = Field(None, description="Worker currently holding the run's lease")
+    heartbeat_at: Optional[datetime] = None
+    attempts: int = 0
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
 
     class Config:
         json_encoders = {ObjectId: str}
@@ -2,6 +2,7 @@
 
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List, Dict, Any
+from datetime import datetime
 
 # ====================================================================
 # User Schemas
@@ -133,6 +134,38 @@ class EvaluateRuleResponse(BaseModel):
             }
         }
 
+class EvaluateBatchRequest(BaseModel):
+    """Schema for evaluating one decision table against many contexts."""
+    table_id: str = Field(..., description="The ID of the decision table to evaluate.")
+    contexts: List[Dict[str, Any]] = Field(..., description="The input contexts, evaluated independently.")
+    concurrency: Optional[int] = Field(None, ge=1, le=1024, description="Maximum number of evaluations in flight. Defaults to the server setting.")
+
+    class Config:
+        json_schema_extra = { # Example for OpenAPI documentation
+            "example": {
+                "table_id": "60c72b2f9b1d4c001f8e4a1b",
+                "contexts": [
+                    {"Urgency": "High", "Department": "Technical"},
+                    {"Urgency": "Low", "Department": "General"}
+                ]
+            }
+        }
+
+class BatchItemResult(BaseModel):
+    """The outcome of one context in a batch evaluation."""
+    index: int = Field(..., description="Position of the context in the request.")
+    result: Optional[Any] = Field(None, description="The decision output, if the evaluation succeeded.")
+    error: Optional[str] = Field(None, description="Why the evaluation of this context failed.")
+
+class EvaluateBatchResponse(BaseModel):
+    """Schema for the response of a batch decision table evaluation."""
+    table_id: str = Field(..., description="The ID of the decision table that was evaluated.")
+    results: List[BatchItemResult] = Field(..., description="One entry per input context, in request order.")
+    succeeded: int = Field(..., description="Number of contexts evaluated without errors.")
+    failed: int = Field(..., description="Number of contexts whose evaluation failed.")
+    duration_ms: float = Field(..., description="Wall-clock evaluation time for the whole batch.")
+    throughput_per_second: float = Field(..., description="Contexts evaluated per second.")
+
 # ====================================================================
 # Workflow Schemas (NEW SECTION)
 # ====================================================================
@@ -219,6 +252,37 @@ class WorkflowExecutionRequest(BaseModel):
             }
         }
 
+class WorkflowApiKeyResponse(BaseModel):
+    """The key external triggers must send for a workflow."""
+    workflow_id: str
+    api_key: str
+
+class TriggerAccepted(BaseModel):
+    """Returned by the trigger endpoints once an event has been queued."""
+    run_id: str = Field(..., description="ID the workflow run will be stored under.")
+    status: str = Field(..., description="'queued', or 'duplicate' if this idempotency key was already seen.")
+
+class WorkflowRunCreated(BaseModel):
+    """Returned when a workflow run has been queued."""
+    run_id: str
+    status: str
+
+class WorkflowRunResponse(BaseModel):
+    """Current state of an asynchronous workflow run."""
+    id: str
+    workflow_id: str
+    status: str = Field(..., description="queued, running, completed or failed")
+    result: Any = None
+    final_node_type: Optional[str] = None
+    outputs: Dict[str, Any] = Field(default_factory=dict, description="Outputs of the nodes finished so far")
+    errors: Dict[str, str] = Field(default_factory=dict)
+    skipped: List[str] = Field(default_factory=list)
+    node_timings_ms: Dict[str, float] = Field(default_factory=dict)
+    attempts: int = 0
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
 # Model for the /run_agent endpoint
 class RunAgentRequest(BaseModel):
     input_data: Dict[str, Any] = Field(..., description="Data from the trigger (e.g., form submission).")
@@ -251,6 +315,7 @@ class RunAgentRequest(BaseModel):
 
 class ToolCreate(BaseModel):
     """Schema for creating or updating a tool. Matches the Task schema."""
+    id: Optional[str] = Field(None, description="ID of an existing tool to update; omit for new tools.")
     name: str = Field(..., description="The programmatic name of the tool.")
     description: str = Field(..., description="A natural language description of what the tool does.")
     endpoint: Optional[str] = Field(None, description="The API endpoint to call for this tool.")
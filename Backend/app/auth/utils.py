@@ -6,6 +6,9 @@ from jose import jwt
 from passlib.context import CryptContext
 
 from app.config import settings # Assuming your config.py is in app/
+from app.log import get_logger
+
+log = get_logger(__name__)
 
 # --- Password Hashing ---
 # We use bcrypt as the hashing algorithm
@@ -31,8 +34,7 @@ def create_access_token(
     :return: The encoded JWT token as a string.
     """
 
-    print(f"[AUTH DEBUG] Creating token for subject (user_id): '{str(subject)}'")
-    # --- END OF DEBUG PRINT ---
+    log.debug("Creating access token", subject=str(subject))
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
     else:
@@ -1,6 +1,5 @@
 # --- START OF FILE app/autogen_runner.py ---
 
-import os
 import json
 import asyncio
 from typing import Dict, List, Any, Optional
@@ -9,6 +8,15 @@ from pydantic import BaseModel, Field
 import autogen
 
 from app.state import frontend_input_queue, backend_output_queue
+from app.metrics import ACTIVE_AGENT_SESSIONS
+from app.tracing import span, run_in_executor_with_context
+from app.log import get_logger
+from app.llm_clients import llm_clients
+
+log = get_logger(__name__)
+
+AUTOGEN_MODEL = "gpt-4o-2024-05-13"
+
 class FrontendUserProxy(autogen.UserProxyAgent):
     """
     UserProxy that broadcasts Supervisor/Agent messages to the frontend via backend_output_queue.
@@ -45,7 +53,7 @@ class FrontendUserProxy(autogen.UserProxyAgent):
                 "sender": sender.name,
                 "text": str(content_to_send)
             }
-            print(f"[UserProxy] Broadcasting: {payload}")
+            log.debug("UserProxy broadcasting", sender=sender.name, text=payload["text"])
 
             asyncio.run_coroutine_threadsafe(
                 backend_output_queue.put(json.dumps(payload)),
@@ -53,12 +61,12 @@ class FrontendUserProxy(autogen.UserProxyAgent):
             )
 
     def get_human_input(self, prompt: str) -> str:
-        print("[UserProxy] Waiting for user input from frontend...")
+        log.debug("UserProxy waiting for user input from frontend")
         future = asyncio.run_coroutine_threadsafe(
             frontend_input_queue.get(), self.loop
         )
         user_reply = future.result()
-        print(f"[UserProxy] Received user input: {user_reply}")
+        log.debug("UserProxy received user input", reply=user_reply)
         return user_reply
 
 
@@ -75,7 +83,8 @@ def is_termination_message(message: Dict) -> bool:
     return isinstance(content, str) and content.rstrip().endswith("TERMINATE")
 
 def execute_mock_api_tool(endpoint: str, **kwargs) -> str:
-    print(f"--- [AutoGen Runner] MOCK API CALL to: {endpoint} with params: {kwargs} ---")
+    log.info("Mock API call", endpoint=endpoint)
+    log.debug("Mock API call params", endpoint=endpoint, params=kwargs)
     return json.dumps({"status": "success", "data": f"Mock response for {endpoint}"})
 
 def build_agents_and_manager(config: SuperAgentConfigRequest, loop: asyncio.AbstractEventLoop) -> Dict[str, Any]:
@@ -90,26 +99,26 @@ def build_agents_and_manager(config: SuperAgentConfigRequest, loop: asyncio.Abst
             tools_list.append({"type": "function", "function": { "name": task.name, "description": task.description, "parameters": task.params_schema }})
         tools_by_assistant[spec.name] = tools_list
 
-    assistant_agents = [autogen.AssistantAgent(name=spec.name, system_message=spec.system_message, llm_config={"config_list": [{"model": "gpt-4o-2024-05-13", "api_key": os.getenv("OPENAI_API_KEY")}], "tools": tools_by_assistant.get(spec.name)}) for spec in config.assistants]
-    supervisor = autogen.AssistantAgent(name="Supervisor", system_message=config.supervisor_system_message or "You are the supervisor.", llm_config={"config_list": [{"model": "gpt-4o-2024-05-13", "api_key": os.getenv("OPENAI_API_KEY")}]})
+    assistant_agents = [autogen.AssistantAgent(name=spec.name, system_message=spec.system_message, llm_config=llm_clients.autogen_llm_config(AUTOGEN_MODEL, tools=tools_by_assistant.get(spec.name))) for spec in config.assistants]
+    supervisor = autogen.AssistantAgent(name="Supervisor", system_message=config.supervisor_system_message or "You are the supervisor.", llm_config=llm_clients.autogen_llm_config(AUTOGEN_MODEL))
     
     user_proxy = FrontendUserProxy(name="UserProxy", human_input_mode="ALWAYS", code_execution_config=False, function_map=function_map, is_termination_msg=is_termination_message, loop=loop)
     
     groupchat = autogen.GroupChat(agents=[user_proxy, supervisor, *assistant_agents], messages=[], max_round=config.max_turns)
-    manager = autogen.GroupChatManager(groupchat=groupchat, llm_config={"config_list": [{"model": "gpt-4o-2024-05-13", "api_key": os.getenv("OPENAI_API_KEY")}]})
-    print(f"--- [AutoGen Runner] Built agents and manager with assistants: {[a.name for a in config.assistants]} ---")
+    manager = autogen.GroupChatManager(groupchat=groupchat, llm_config=llm_clients.autogen_llm_config(AUTOGEN_MODEL))
+    log.debug("Built agents and manager", assistants=lambda: [a.name for a in config.assistants])
     return {"user_proxy": user_proxy, "manager": manager, "groupchat": groupchat}
 
     
 def run_conversation_from_config(config: SuperAgentConfigRequest, loop: asyncio.AbstractEventLoop) -> str:
-    print("--- [AutoGen Runner] Starting conversational session ---")
+    log.info("Starting conversational session")
 
     agent_components = build_agents_and_manager(config, loop)
     user_proxy = agent_components["user_proxy"]
     supervisor = next(agent for agent in agent_components["groupchat"].agents if agent.name == "Supervisor")
     manager = agent_components["manager"]
     groupchat = agent_components["groupchat"]
-    print(f"--- [AutoGen Runner] Agents in group chat: {[agent.name for agent in groupchat.agents]} ---")
+    log.debug("Agents in group chat", agents=lambda: [agent.name for agent in groupchat.agents])
 
     # --- Hook Supervisor to broadcast messages ---
     original_send = supervisor.send
@@ -137,20 +146,24 @@ def run_conversation_from_config(config: SuperAgentConfigRequest, loop: asyncio.
 
 
     supervisor.send = send_with_broadcast
-    print("--- [AutoGen Runner] Supervisor hooked to broadcast messages ---")
+    log.debug("Supervisor hooked to broadcast messages")
 
     # Run the conversation in a background thread so it doesn’t block the event loop
-    future = loop.run_in_executor(
-        None,  # default thread pool
-        lambda: user_proxy.initiate_chat(manager, message=config.prompt)
-    )
-    print("--- [AutoGen Runner] Conversation thread started ---")
+    def run_chat():
+        with span("autogen.conversation", **{"autogen.assistants": len(config.assistants)}):
+            return user_proxy.initiate_chat(manager, message=config.prompt)
+
+    ACTIVE_AGENT_SESSIONS.inc()
+    # Default thread pool; the caller's trace context is copied into the thread.
+    future = run_in_executor_with_context(loop, run_chat)
+    log.debug("Conversation thread started")
 
     def on_done(fut):
+        ACTIVE_AGENT_SESSIONS.dec()
         try:
             fut.result()
         except Exception as e:
-            print(f"--- [AutoGen Runner] Error in chat thread: {e} ---")
+            log.exception("Error in chat thread")
             asyncio.run_coroutine_threadsafe(
                 backend_output_queue.put(json.dumps({"type": "final_answer", "text": f"Conversation crashed: {e}"})),
                 loop
@@ -169,7 +182,7 @@ def run_conversation_from_config(config: SuperAgentConfigRequest, loop: asyncio.
 
         # Signal conversation end
         asyncio.run_coroutine_threadsafe(backend_output_queue.put("END_OF_CONVERSATION"), loop)
-        print("--- [AutoGen Runner] Session finished. Messages sent to frontend. ---")
+        log.info("Session finished, messages sent to frontend", messages=len(groupchat.messages))
 
     # Attach callback so final summary is sent after chat ends
     future.add_done_callback(on_done)
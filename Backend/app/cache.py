@@ -0,0 +1,154 @@
+# --- START OF FILE app/cache.py ---
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from app.metrics import Counter
+
+_MISSING = object()
+
+
+def definition_hash(definition: Dict[str, Any]) -> str:
+    """Stable hash of a JSON definition (key order does not matter)."""
+    canonical = json.dumps(definition, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache holding at most `max_size` entries. With a
+    `ttl_seconds` (or a per-entry ttl passed to `set`), entries also expire;
+    expired entries are dropped when they are next looked up.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._items: "OrderedDict[Hashable, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expires_at(self, ttl_seconds: Optional[float]) -> Optional[float]:
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        return None if ttl_seconds is None else time.monotonic() + ttl_seconds
+
+    def _live(self, key) -> Any:
+        """The live value for `key`, or _MISSING. Call with the lock held."""
+        item = self._items.get(key)
+        if item is None:
+            return _MISSING
+        value, expires_at = item
+        if expires_at is not None and time.monotonic() > expires_at:
+            del self._items[key]
+            return _MISSING
+        self._items.move_to_end(key)
+        return value
+
+    def _store(self, key, value, ttl_seconds: Optional[float]):
+        self._items[key] = (value, self._expires_at(ttl_seconds))
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._live(key)
+        return default if value is _MISSING else value
+
+    def set(self, key, value, ttl_seconds: Optional[float] = None):
+        with self._lock:
+            self._store(key, value, ttl_seconds)
+
+    def setdefault(self, key, value):
+        """Stores `value` unless a live entry exists; returns whichever is current."""
+        with self._lock:
+            current = self._live(key)
+            if current is not _MISSING:
+                return current
+            self._store(key, value, None)
+            return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._items.pop(key, None)
+        return default if item is None else item[0]
+
+    def discard_where(self, predicate: Callable[[Any], bool]):
+        """Drops every entry whose key matches `predicate`."""
+        with self._lock:
+            for key in [key for key in self._items if predicate(key)]:
+                del self._items[key]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class CompiledCache:
+    """
+    Cache of artifacts compiled from stored definitions (decision tables,
+    workflow plans), keyed by (object id, definition hash).
+
+    A second index records, per object, the hash last loaded and the user
+    who owns it, so a hot path can find the compiled artifact without
+    re-reading the definition. That index expires after `ttl_seconds`, which
+    bounds how long another worker process can keep serving an object that
+    was edited elsewhere; edits made through this process call `invalidate`.
+
+    `compile(object_id, definition)` may raise; failures are not cached.
+    """
+
+    def __init__(
+        self,
+        compile: Callable[[str, Dict[str, Any]], Any],
+        max_size: int = 256,
+        ttl_seconds: float = 60.0,
+        lookups: Optional[Counter] = None,
+    ):
+        self.compile = compile
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.lookups = lookups
+        self._compiled = LRUCache(max_size)
+        self._current = LRUCache(max_size, ttl_seconds)  # object_id -> (user_id, hash)
+
+    def _count(self, result: str):
+        if self.lookups is not None:
+            self.lookups.labels(result=result).inc()
+
+    def get_current(self, object_id: str, user_id: str):
+        """Returns the compiled artifact of a recently loaded object owned by `user_id`, or None."""
+        current = self._current.get(object_id)
+        compiled = None
+        if current is not None and current[0] == str(user_id):
+            compiled = self._compiled.get((object_id, current[1]))
+        self._count("miss" if compiled is None else "hit")
+        return compiled
+
+    def get_or_compile(self, object_id: str, user_id: str, definition: Dict[str, Any]):
+        """Returns the artifact for this exact definition, compiling it once."""
+        digest = definition_hash(definition)
+        compiled = self._compiled.get((object_id, digest))
+        if compiled is None:
+            # Compiled without holding a lock; a concurrent duplicate compile is harmless.
+            compiled = self._compiled.setdefault((object_id, digest), self.compile(object_id, definition))
+        self._current.set(object_id, (str(user_id), digest))
+        return compiled
+
+    def invalidate(self, object_id: str):
+        """Drops every compiled version of an object. Called on update and delete."""
+        self._current.pop(object_id)
+        self._compiled.discard_where(lambda key: key[0] == object_id)
+
+    def clear(self):
+        self._compiled.clear()
+        self._current.clear()
+
+    def __len__(self) -> int:
+        return len(self._compiled)
@@ -1,5 +1,6 @@
 
 import os
+from typing import List, Optional
 from dotenv import load_dotenv
 
 load_dotenv()  # Load from .env file if present
@@ -13,21 +14,111 @@ class Settings:
     # Embedding model
     EMBEDDING_MODEL_NAME: str = os.getenv("EMBEDDING_MODEL_NAME", "text-embedding-3-small")
     EMBEDDING_DIMENSION: int = int(os.getenv("EMBEDDING_DIMENSION", "1536")) # 1536 for small, 3072 for large
+    RAG_CONTEXT_TOKEN_BUDGET: int = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "3000")) # Max tokens of retrieved context per prompt
+    RAG_DUPLICATE_THRESHOLD: float = float(os.getenv("RAG_DUPLICATE_THRESHOLD", "0.9")) # Chunk similarity above which a chunk is dropped
+    RAG_FETCH_K: int = int(os.getenv("RAG_FETCH_K", "30")) # Candidates fetched from the vector store before reranking
+    RAG_TOP_N: int = int(os.getenv("RAG_TOP_N", "4")) # Candidates kept for the prompt after reranking
+    RAG_RERANK_LEXICAL_WEIGHT: float = float(os.getenv("RAG_RERANK_LEXICAL_WEIGHT", "0.3")) # BM25 share of the fused rerank score
+    RAG_RERANK_MODEL: str = os.getenv("RAG_RERANK_MODEL", "") # Optional CPU cross-encoder, e.g. "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RAG_EMBED_BATCH_WINDOW_MS: float = float(os.getenv("RAG_EMBED_BATCH_WINDOW_MS", "5")) # Wait for concurrent queries to embed together (0 disables)
+    RAG_EMBED_BATCH_MAX_SIZE: int = int(os.getenv("RAG_EMBED_BATCH_MAX_SIZE", "64"))
+    RAG_EMBED_BATCH_CONCURRENCY: int = int(os.getenv("RAG_EMBED_BATCH_CONCURRENCY", "4")) # Batched embedding requests in flight
+
+    # Ingestion chunking: "tokens" (embedding-model tokenizer), "structure" (pages/headings/tables, in tokens) or "characters"
+    CHUNK_MODE: str = os.getenv("CHUNK_MODE", "tokens")
+    CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "400"))
+    CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP", "40"))
+    CHUNK_WORKERS: int = int(os.getenv("CHUNK_WORKERS", "0")) # Chunking processes (0 = one per CPU)
+    CHUNK_PARALLEL_MIN_DOCS: int = int(os.getenv("CHUNK_PARALLEL_MIN_DOCS", "64")) # Smaller batches are chunked in-process (0 = never parallel)
+
+    # Near-duplicate chunk filter (MinHash LSH, remembered across runs in sqlite)
+    INGEST_DEDUPE_ENABLED: bool = os.getenv("INGEST_DEDUPE_ENABLED", "true").lower() == "true"
+    INGEST_DEDUPE_THRESHOLD: float = float(os.getenv("INGEST_DEDUPE_THRESHOLD", "0.85")) # Estimated Jaccard similarity treated as a duplicate
+    INGEST_DEDUPE_DB_PATH: str = os.getenv("INGEST_DEDUPE_DB_PATH", "logs/minhash.db")
+
+    # Web crawler ("crawl:" sources and plain URLs): politeness, scope and the conditional-request cache
+    CRAWL_USER_AGENT: str = os.getenv("CRAWL_USER_AGENT", "HappyPlaceBot/1.0")
+    CRAWL_CONCURRENCY: int = int(os.getenv("CRAWL_CONCURRENCY", "8"))
+    CRAWL_HOST_DELAY_SECONDS: float = float(os.getenv("CRAWL_HOST_DELAY_SECONDS", "1.0")) # Minimum gap between requests to one host (robots.txt Crawl-delay wins if larger)
+    CRAWL_MAX_DEPTH: int = int(os.getenv("CRAWL_MAX_DEPTH", "2"))
+    CRAWL_MAX_PAGES: int = int(os.getenv("CRAWL_MAX_PAGES", "200"))
+    CRAWL_TIMEOUT_SECONDS: float = float(os.getenv("CRAWL_TIMEOUT_SECONDS", "20"))
+    CRAWL_CACHE_DIR: str = os.getenv("CRAWL_CACHE_DIR", "cache/http")
+    CRAWL_EXTRACT_WORKERS: int = int(os.getenv("CRAWL_EXTRACT_WORKERS", "0")) # Text extraction processes (0 = one per CPU)
+
+    # API connector ("api:" sources): pagination and streaming ingestion
+    API_PAGE_SIZE: int = int(os.getenv("API_PAGE_SIZE", "100")) # Items requested per page for offset pagination
+    API_MAX_PAGES: int = int(os.getenv("API_MAX_PAGES", "1000"))
+    API_CONCURRENCY: int = int(os.getenv("API_CONCURRENCY", "4")) # Offset pages fetched at once
+    API_TIMEOUT_SECONDS: float = float(os.getenv("API_TIMEOUT_SECONDS", "30"))
+    API_BATCH_SIZE: int = int(os.getenv("API_BATCH_SIZE", "500")) # Documents handed to chunking/embedding at a time
+
+    # Shared LLM clients: one instance per (provider, model, params), one pooled HTTP transport
+    LLM_CLIENT_CACHE_SIZE: int = int(os.getenv("LLM_CLIENT_CACHE_SIZE", "64"))
+    LLM_HTTP_MAX_CONNECTIONS: int = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100"))
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS: float = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS", "60"))
 
     # Vector DB config (Pinecone)
     PINECONE_API_KEY: str = os.getenv("PINECONE_API_KEY", "")
     PINECONE_ENV: str = os.getenv("PINECONE_ENV", "")
     PINECONE_INDEX_NAME: str = os.getenv("PINECONE_INDEX_NAME", "ispg-rag-index")
+    RAG_TENANT_NAMESPACES: bool = os.getenv("RAG_TENANT_NAMESPACES", "true").lower() == "true" # One namespace per user for uploads
+    RAG_SEARCH_FANOUT_WORKERS: int = int(os.getenv("RAG_SEARCH_FANOUT_WORKERS", "8")) # Threads for parallel multi-namespace queries
+    RAG_ADMIN_EMAILS: List[str] = [e.strip().lower() for e in os.getenv("RAG_ADMIN_EMAILS", "").split(",") if e.strip()] # May search across tenants and read the query logs
     
     # Multilingual support
     ENABLE_TRANSLATION: bool = os.getenv("ENABLE_TRANSLATION", "true").lower() == "true"
     
     # Logging config
     LOG_DB_PATH: str = os.getenv("LOG_DB_PATH", "logs/queries.db")
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text") # "text" or "json"
+    LOG_MAX_FIELD_CHARS: int = int(os.getenv("LOG_MAX_FIELD_CHARS", "2000"))
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    LOG_PAYLOAD_SAMPLE_RATE: float = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "1.0")) # Share of full-payload debug records kept
+
+    # Tracing: "none", "otlp" (uses the OTEL_EXPORTER_OTLP_* env vars), "console", "file" or "memory"
+    TRACING_EXPORTER: str = os.getenv("TRACING_EXPORTER", "none")
+    TRACING_SERVICE_NAME: str = os.getenv("TRACING_SERVICE_NAME", "happyplace-backend")
+    TRACING_FILE_PATH: str = os.getenv("TRACING_FILE_PATH", "logs/traces.jsonl")
+
+    # Compiled decision-table cache (the TTL bounds staleness across worker processes)
+    DECISION_CACHE_SIZE: int = int(os.getenv("DECISION_CACHE_SIZE", "256"))
+    DECISION_CACHE_TTL_SECONDS: float = float(os.getenv("DECISION_CACHE_TTL_SECONDS", "60"))
+    DECISION_BATCH_MAX_ITEMS: int = int(os.getenv("DECISION_BATCH_MAX_ITEMS", "10000"))
+    DECISION_BATCH_CONCURRENCY: int = int(os.getenv("DECISION_BATCH_CONCURRENCY", "64"))
+    DECISION_STREAM_MAX_BYTES: int = int(os.getenv("DECISION_STREAM_MAX_BYTES", str(64 * 1024 * 1024))) # NDJSON stream bodies are buffered; larger uploads get a 413
+    DECISION_NATIVE_ENGINE: bool = os.getenv("DECISION_NATIVE_ENGINE", "true").lower() == "true" # Evaluate flat tables without zen
+
+    # Compiled workflow plan cache (same staleness bound as the decision cache)
+    WORKFLOW_PLAN_CACHE_SIZE: int = int(os.getenv("WORKFLOW_PLAN_CACHE_SIZE", "256"))
+    WORKFLOW_PLAN_CACHE_TTL_SECONDS: float = float(os.getenv("WORKFLOW_PLAN_CACHE_TTL_SECONDS", "60"))
+
+    # Asynchronous workflow runs (a run whose owner misses heartbeats for the lease is resumed elsewhere)
+    WORKFLOW_RUN_WORKERS: int = int(os.getenv("WORKFLOW_RUN_WORKERS", "8"))
+    WORKFLOW_RUN_QUEUE_SIZE: int = int(os.getenv("WORKFLOW_RUN_QUEUE_SIZE", "1000"))
+    WORKFLOW_RUN_LEASE_SECONDS: float = float(os.getenv("WORKFLOW_RUN_LEASE_SECONDS", "60"))
+    WORKFLOW_RUN_POLL_SECONDS: float = float(os.getenv("WORKFLOW_RUN_POLL_SECONDS", "2"))
+
+    # Trigger ingestion (webhooks): concurrent run writes, key lookup cache, idempotency window
+    WORKFLOW_TRIGGER_MAX_IN_FLIGHT: int = int(os.getenv("WORKFLOW_TRIGGER_MAX_IN_FLIGHT", "1000"))
+    WORKFLOW_TRIGGER_KEY_CACHE_TTL_SECONDS: float = float(os.getenv("WORKFLOW_TRIGGER_KEY_CACHE_TTL_SECONDS", "60"))
+    WORKFLOW_TRIGGER_IDEMPOTENCY_TTL_SECONDS: float = float(os.getenv("WORKFLOW_TRIGGER_IDEMPOTENCY_TTL_SECONDS", "86400"))
+
+    # Compiled tool args_schema models, keyed by tool name + schema hash
+    TOOL_SCHEMA_CACHE_SIZE: int = int(os.getenv("TOOL_SCHEMA_CACHE_SIZE", "1024"))
 
     # --- Primary Database (MongoDB) ---
     MONGO_URI: str = os.getenv("MONGO_URI")
     MONGO_DB_NAME: str = os.getenv("MONGO_DB_NAME", "aimodeagents")
+    MONGO_TLS_ALLOW_INVALID_CERTIFICATES: bool = os.getenv("MONGO_TLS_ALLOW_INVALID_CERTIFICATES", "true").lower() == "true"
+
+    # Connection pool sizing (timeouts are left to the driver default when unset)
+    MONGO_MAX_POOL_SIZE: int = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+    MONGO_MIN_POOL_SIZE: int = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+    MONGO_MAX_IDLE_TIME_MS: Optional[int] = int(os.getenv("MONGO_MAX_IDLE_TIME_MS")) if os.getenv("MONGO_MAX_IDLE_TIME_MS") else None
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS")) if os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS") else None
 
     # --- Authentication (JWT) ---
     SECRET_KEY: str = os.getenv("SECRET_KEY") # A long, random string for signing JWTs
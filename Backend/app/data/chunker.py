@@ -1,35 +1,138 @@
 # --- START OF FILE app/data/chunker.py (Corrected) ---
 
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Iterator, List, NamedTuple, Optional, Tuple, Union
+
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
-def chunk_text(text: str, chunk_size: int = 500, chunk_overlap: int = 50) -> list[str]:
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap
+from app.config import settings
+from app.data.records import Chunk
+from app.log import get_logger
+from app.rag.context_builder import get_token_counter
+
+log = get_logger(__name__)
+
+CHUNK_MODES = ("characters", "tokens", "structure")
+
+# Structure-aware separators, coarsest first: page breaks, markdown headings
+# (which start a new chunk), paragraphs, single newlines except between table
+# rows, sentences, then words.
+_STRUCTURE_SEPARATORS = [r"\f", r"\n(?=#{1,6} )", r"\n\n", r"\n(?!\|)", r"(?<=[.!?]) ", " ", ""]
+
+
+class ChunkingConfig(NamedTuple):
+    mode: str = "characters"
+    chunk_size: int = 500  # characters in "characters" mode, embedding-model tokens otherwise
+    chunk_overlap: int = 50
+    model: str = "text-embedding-3-small"
+
+
+def default_config() -> ChunkingConfig:
+    return ChunkingConfig(
+        mode=settings.CHUNK_MODE,
+        chunk_size=settings.CHUNK_SIZE,
+        chunk_overlap=settings.CHUNK_OVERLAP,
+        model=settings.EMBEDDING_MODEL_NAME,
+    )
+
+
+@lru_cache(maxsize=32)
+def get_splitter(config: ChunkingConfig) -> RecursiveCharacterTextSplitter:
+    """Returns the (shared, stateless) splitter for a configuration, building it once per process."""
+    if config.mode not in CHUNK_MODES:
+        raise ValueError(f"Unknown chunking mode '{config.mode}'. Expected one of {CHUNK_MODES}.")
+    if config.mode == "characters":
+        return RecursiveCharacterTextSplitter(chunk_size=config.chunk_size, chunk_overlap=config.chunk_overlap)
+    count_tokens = get_token_counter(config.model)
+    if config.mode == "tokens":
+        return RecursiveCharacterTextSplitter(
+            chunk_size=config.chunk_size,
+            chunk_overlap=config.chunk_overlap,
+            length_function=count_tokens,
+        )
+    return RecursiveCharacterTextSplitter(
+        chunk_size=config.chunk_size,
+        chunk_overlap=config.chunk_overlap,
+        length_function=count_tokens,
+        separators=_STRUCTURE_SEPARATORS,
+        is_separator_regex=True,
     )
+
+def chunk_text(text: str, chunk_size: int = 500, chunk_overlap: int = 50) -> list[str]:
     # Handle cases where the text might be None or not a string
     if not isinstance(text, str):
         return []
-    return splitter.split_text(text)
+    return get_splitter(ChunkingConfig("characters", chunk_size, chunk_overlap)).split_text(text)
 
-def chunk_documents(docs: list[dict]) -> list[dict]:
-    """Split each document into chunks with metadata."""
-    chunks = []
-    for doc in docs:
-        # Ensure 'content' exists and is not None before chunking
-        content = doc.get("content")
-        if not content:
+def chunk_spans(text: str, pieces: List[str]) -> Iterator[Tuple[int, int]]:
+    """
+    Locates each split piece in the original text, in order, and yields its
+    (start, end) offsets; (-1, -1) for a piece that is not a verbatim substring.
+    """
+    position = 0
+    for piece in pieces:
+        # Pieces come out in document order, so each one starts after the previous start.
+        start = text.find(piece, position)
+        if start < 0:
+            yield -1, -1
             continue
+        position = start + 1
+        yield start, start + len(piece)
+
+# A split piece is either its (start, end) span in the document or, if it is
+# not a verbatim substring, its own text.
+_Piece = Union[Tuple[int, int], str]
+
+def _split_document(content: str, config: ChunkingConfig) -> List[_Piece]:
+    pieces = get_splitter(config).split_text(content)
+    return [span if span[0] >= 0 else piece for piece, span in zip(pieces, chunk_spans(content, pieces))]
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
 
-        text_chunks = chunk_text(content)
-        for i, chunk in enumerate(text_chunks):
-            chunks.append({
-                "text": chunk,
-                "metadata": {
-                    # --- THIS IS THE FIX ---
-                    # Use doc["source"] instead of doc["url"]
-                    "source": doc["source"],
-                    "chunk_id": i
-                }
-            })
-    return chunks
\ No newline at end of file
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned, not forked: the server process already runs threads.
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.CHUNK_WORKERS or os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+def chunk_documents(docs: list[dict], config: Optional[ChunkingConfig] = None) -> list[Chunk]:
+    """
+    Split each document into chunk records that reference the document's text.
+
+    Batches of at least CHUNK_PARALLEL_MIN_DOCS documents are split in a
+    process pool; workers send back offsets only, so the text is not copied
+    back into this process.
+    """
+    config = config or default_config()
+    docs = [doc for doc in docs if doc.get("content")]
+    contents = [doc["content"] for doc in docs]
+
+    if settings.CHUNK_PARALLEL_MIN_DOCS and len(docs) >= settings.CHUNK_PARALLEL_MIN_DOCS:
+        workers = settings.CHUNK_WORKERS or os.cpu_count() or 1
+        per_document = list(_get_pool().map(
+            _split_document, contents, [config] * len(contents), chunksize=max(1, len(contents) // (workers * 4)),
+        ))
+        log.debug("Chunked documents in parallel", documents=len(docs), workers=workers)
+    else:
+        per_document = [_split_document(content, config) for content in contents]
+
+    chunks = []
+    for doc, content, pieces in zip(docs, contents, per_document):
+        for i, piece in enumerate(pieces):
+            # --- THIS IS THE FIX ---
+            # Use doc["source"] instead of doc["url"]
+            if isinstance(piece, str):
+                chunks.append(Chunk.standalone(piece, doc["source"], i, doc.get("origin"), doc.get("metadata")))
+            else:
+                chunks.append(Chunk(content, piece[0], piece[1], doc["source"], i, doc.get("origin"), doc.get("metadata")))
+    return chunks
@@ -1,27 +1,441 @@
-import requests
+import asyncio
+import concurrent.futures
+import json
+import queue
+import re
+import threading
+from dataclasses import dataclass, replace
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urldefrag, urlencode, urljoin, urlsplit, urlunsplit
 
-class APIConnector:
-    """Connector for fetching data from APIs."""
-    
-    def load_data(self, source: str) -> list[dict]:
+import httpx
+
+from .base_connector import BaseConnector
+from app.config import settings
+from app.log import get_logger
+from app.metrics import counter
+
+log = get_logger(__name__)
+
+API_PAGES = counter(
+    "api_connector_pages_total",
+    "Pages fetched by the API connector, by how they were reached (first, link, cursor, offset).",
+    labelnames=("pagination",),
+)
+
+_WHITESPACE = re.compile(r"\s*")
+_DECODER = json.JSONDecoder()
+
+
+class JSONStream:
+    """
+    Incremental parser for a JSON response body arriving as text chunks.
+
+    `items` yields the elements of the item array one at a time, so only the
+    current element (plus one network chunk) is held in memory, however long
+    the array is. The array is either the whole body, the value at `path`
+    (e.g. ("data",) or ("result", "items")) of a wrapping object, or, with
+    no path, the first array-valued field of that object. Other fields of the
+    wrapper (cursors, totals) are collected into `envelope`. A body that
+    holds no array is yielded as a single item.
+    """
+
+    def __init__(self, chunks: AsyncIterator[str]):
+        self._chunks = chunks
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._found = False
+        self.envelope: Dict[str, Any] = {}
+
+    async def _fill(self) -> bool:
+        if self._eof:
+            return False
         try:
-            response = requests.get(source, timeout=15)
-            response.raise_for_status()
+            chunk = await self._chunks.__anext__()
+        except StopAsyncIteration:
+            self._eof = True
+            return False
+        # Drop what has been consumed, so the buffer never outgrows one element.
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    async def _peek(self) -> str:
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not await self._fill():
+                return ""
 
-            data = response.json()  # assume API returns JSON
-            documents = []
+    async def _expect(self, *chars: str) -> str:
+        char = await self._peek()
+        if char not in chars:
+            raise ValueError(f"Malformed JSON: expected one of {chars!r}, got {char!r}.")
+        self._pos += 1
+        return char
 
-            # Convert API response into a list of documents
-            if isinstance(data, dict):
-                documents.append({"text": str(data), "metadata": {"source": source}})
-            elif isinstance(data, list):
-                for idx, item in enumerate(data):
-                    documents.append({"text": str(item), "metadata": {"source": source, "item_id": idx}})
+    async def _value(self) -> Any:
+        await self._peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buffer, self._pos)
+                # A value ending exactly at the end of the buffer may be cut short (e.g. the number 12|3).
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            await self._fill()
+
+    async def _array(self) -> AsyncIterator[Any]:
+        await self._expect("[")
+        if await self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield await self._value()
+            if await self._expect(",", "]") == "]":
+                return
+
+    async def _object(self, path: Optional[Sequence[str]], into: Dict[str, Any]) -> AsyncIterator[Any]:
+        await self._expect("{")
+        if await self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = await self._value()
+            await self._expect(":")
+            char = await self._peek()
+            wanted = not self._found and (key == path[0] if path else path is None)
+            if wanted and char == "[" and (path is None or len(path) == 1):
+                self._found = True
+                async for item in self._array():
+                    yield item
+            elif wanted and char == "{" and path and len(path) > 1:
+                into[key] = {}
+                async for item in self._object(path[1:], into[key]):
+                    yield item
             else:
-                documents.append({"text": str(data), "metadata": {"source": source}})
+                into[key] = await self._value()
+            if await self._expect(",", "}") == "}":
+                return
+
+    async def items(self, path: Optional[Sequence[str]] = None) -> AsyncIterator[Any]:
+        char = await self._peek()
+        if char == "[":
+            async for item in self._array():
+                yield item
+        elif char == "{":
+            async for item in self._object(path, self.envelope):
+                yield item
+            if not self._found and path is None:
+                yield self.envelope
+        elif char:
+            yield await self._value()
+
+
+def lookup(data: Any, path: Optional[str]) -> Any:
+    """The value at a dotted path ("meta.next_cursor") of nested dicts, or None."""
+    if not path:
+        return None
+    for key in path.split("."):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _flatten(item: Dict[str, Any], prefix: str = "") -> List[str]:
+    """ "key: value" lines for a record, nested keys dotted; readable text to embed instead of a repr."""
+    lines = []
+    for key, value in item.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            lines.extend(_flatten(value, f"{name}."))
+        elif isinstance(value, list) and all(not isinstance(v, (dict, list)) for v in value):
+            lines.append(f"{name}: {', '.join(str(v) for v in value)}")
+        elif value is not None and value != "":
+            lines.append(f"{name}: {_text(value)}")
+    return lines
+
+
+def _metadata_value(value: Any) -> Any:
+    """Vector store metadata holds strings, numbers, booleans and lists of strings."""
+    if isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, list) and all(isinstance(v, str) for v in value):
+        return value
+    return _text(value)
+
+
+def _with_params(url: str, params: Dict[str, Any]) -> str:
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query, keep_blank_values=True))
+    query.update({key: str(value) for key, value in params.items()})
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def _fields(value: str) -> Tuple[str, ...]:
+    return tuple(field.strip() for field in value.split(",") if field.strip())
+
+
+@dataclass(frozen=True)
+class APIOptions:
+    """How one API source is paged and how its items become documents."""
+    content_fields: Tuple[str, ...] = ()  # Dotted paths joined into the text; empty = all fields as "key: value" lines
+    metadata_fields: Tuple[str, ...] = ()  # Dotted paths copied into chunk metadata
+    id_field: Optional[str] = "id"  # Makes each item's source "<url>#<id>"
+    items_path: Optional[str] = None  # Dotted path of the item array in a wrapped response
+    cursor_field: Optional[str] = None  # Dotted path of the next cursor in a wrapped response
+    cursor_param: str = "cursor"
+    offset_param: Optional[str] = None  # Enables offset pagination
+    limit_param: str = "limit"
+    page_size: int = 100
+
+    # URL fragment keys (never sent to the server) for per-source options.
+    _FRAGMENT_KEYS = {
+        "content": "content_fields",
+        "metadata": "metadata_fields",
+        "id": "id_field",
+        "items": "items_path",
+        "cursor": "cursor_field",
+        "cursor_param": "cursor_param",
+        "offset": "offset_param",
+        "limit": "limit_param",
+        "page_size": "page_size",
+    }
 
-            return documents
-        
+    def with_fragment(self, fragment: str) -> "APIOptions":
+        changes: Dict[str, Any] = {}
+        for key, value in parse_qsl(fragment, keep_blank_values=True):
+            if key not in self._FRAGMENT_KEYS:
+                raise ValueError(f"Unknown API source option '{key}'. Expected one of {sorted(self._FRAGMENT_KEYS)}.")
+            name = self._FRAGMENT_KEYS[key]
+            if name in ("content_fields", "metadata_fields"):
+                changes[name] = _fields(value)
+            elif name == "page_size":
+                changes[name] = int(value)
+            else:
+                changes[name] = value or None
+        return replace(self, **changes)
+
+
+class _Page:
+    """What a fetched page says about the next one."""
+
+    def __init__(self):
+        self.count = 0
+        self.next_link: Optional[str] = None
+        self.envelope: Dict[str, Any] = {}
+
+
+class APIConnector(BaseConnector):
+    """
+    Connector for JSON APIs.
+
+    Responses are stream-parsed (see JSONStream), so a large item array is
+    never held in memory whole, and pages are followed until the API runs
+    out: through `Link: <...>; rel="next"` headers, a cursor field in the
+    response body, or offset/limit query parameters. Link and cursor pages
+    can only be discovered one after another; offset pages are fetched
+    `concurrency` at a time.
+
+    Per-source options go in the URL fragment of the source, e.g.
+    "api:https://example.com/products#items=data&content=name,description&metadata=category,price&offset=offset".
+    Each item becomes a document {"source", "content", "metadata"}.
+    """
+
+    def __init__(
+        self,
+        options: Optional[APIOptions] = None,
+        concurrency: Optional[int] = None,
+        max_pages: Optional[int] = None,
+        headers: Optional[Dict[str, str]] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.options = options or APIOptions(page_size=settings.API_PAGE_SIZE)
+        self.concurrency = concurrency or settings.API_CONCURRENCY
+        self.max_pages = max_pages or settings.API_MAX_PAGES
+        self.headers = {"User-Agent": settings.CRAWL_USER_AGENT, "Accept": "application/json", **(headers or {})}
+        self.transport = transport
+
+    def load_data(self, source: str) -> list[dict]:
+        async def collect():
+            return [doc async for doc in self.stream(source)]
+
+        try:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return asyncio.run(collect())
+            # Called from async code (e.g. a route handler): run on its own loop.
+            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as runner:
+                return runner.submit(asyncio.run, collect()).result()
         except Exception as e:
-            print(f"❌ Failed to fetch API source {source}: {e}")
+            log.error("Failed to fetch API source", source=source, error=str(e))
             return []
+
+    def iter_batches(self, source: str, batch_size: Optional[int] = None) -> Iterator[List[dict]]:
+        """
+        Yields documents `batch_size` at a time while later pages are still
+        being fetched. At most two batches wait to be consumed; beyond that
+        fetching pauses, so memory stays bounded for any API size.
+        """
+        batch_size = batch_size or settings.API_BATCH_SIZE
+        batches: queue.Queue = queue.Queue(maxsize=2)
+        cancelled = threading.Event()
+        finished = object()
+
+        def put(item) -> bool:
+            while not cancelled.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        async def produce():
+            batch = []
+            async for doc in self.stream(source):
+                batch.append(doc)
+                if len(batch) >= batch_size:
+                    if not await asyncio.to_thread(put, batch):
+                        return
+                    batch = []
+            if batch:
+                await asyncio.to_thread(put, batch)
+
+        def run():
+            try:
+                asyncio.run(produce())
+                put(finished)
+            except BaseException as e:
+                put(e)
+
+        producer = threading.Thread(target=run, name="api-connector", daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = batches.get()
+                if item is finished:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            cancelled.set()
+            producer.join()
+
+    async def stream(self, source: str) -> AsyncIterator[dict]:
+        url, fragment = urldefrag(source.strip())
+        options = self.options.with_fragment(fragment)
+        items_path = tuple(options.items_path.split(".")) if options.items_path else None
+        index = 0
+
+        def document(item: Any) -> dict:
+            nonlocal index
+            index += 1
+            return self._to_document(item, url, index, options)
+
+        async with httpx.AsyncClient(
+            headers=self.headers,
+            timeout=settings.API_TIMEOUT_SECONDS,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.concurrency),
+            transport=self.transport,
+        ) as client:
+            first_url = url
+            if options.offset_param:
+                first_url = _with_params(url, {options.offset_param: 0, options.limit_param: options.page_size})
+            page = _Page()
+            async for item in self._stream_page(client, first_url, items_path, page, "first"):
+                yield document(item)
+            pages, seen = 1, {first_url}
+
+            # Link and cursor pages: each page names the next one.
+            while pages < self.max_pages:
+                cursor = lookup(page.envelope, options.cursor_field)
+                if page.next_link:
+                    next_url, pagination = page.next_link, "link"
+                elif cursor not in (None, "") and page.count:
+                    next_url, pagination = _with_params(url, {options.cursor_param: cursor}), "cursor"
+                else:
+                    break
+                if next_url in seen:
+                    log.warning("API pagination repeats a page, stopping", source=url, url=next_url)
+                    break
+                seen.add(next_url)
+                page = _Page()
+                async for item in self._stream_page(client, next_url, items_path, page, pagination):
+                    yield document(item)
+                pages += 1
+
+            # Offset pages: known in advance, so fetched concurrently until one comes back short.
+            if options.offset_param and pages == 1 and page.count >= options.page_size:
+                offset = options.page_size
+                while pages < self.max_pages:
+                    wave = min(self.concurrency, self.max_pages - pages)
+                    urls = [
+                        _with_params(url, {options.offset_param: offset + i * options.page_size, options.limit_param: options.page_size})
+                        for i in range(wave)
+                    ]
+                    results = await asyncio.gather(*(self._collect_page(client, page_url, items_path) for page_url in urls))
+                    for items in results:
+                        for item in items:
+                            yield document(item)
+                    pages += wave
+                    offset += wave * options.page_size
+                    if any(len(items) < options.page_size for items in results):
+                        break
+
+        log.info("Fetched API source", source=url, pages=pages, items=index)
+
+    async def _stream_page(
+        self, client: httpx.AsyncClient, url: str, items_path: Optional[Sequence[str]], page: _Page, pagination: str,
+    ) -> AsyncIterator[Any]:
+        async with client.stream("GET", url) as response:
+            response.raise_for_status()
+            API_PAGES.labels(pagination=pagination).inc()
+            next_link = response.links.get("next", {}).get("url")
+            if next_link:
+                page.next_link = urljoin(str(response.url), next_link)
+            parser = JSONStream(response.aiter_text())
+            async for item in parser.items(items_path):
+                page.count += 1
+                yield item
+            page.envelope = parser.envelope
+
+    async def _collect_page(self, client: httpx.AsyncClient, url: str, items_path: Optional[Sequence[str]]) -> List[Any]:
+        # Concurrent pages are bounded by page_size, so each is gathered whole.
+        return [item async for item in self._stream_page(client, url, items_path, _Page(), "offset")]
+
+    @staticmethod
+    def _to_document(item: Any, url: str, index: int, options: APIOptions) -> dict:
+        if not isinstance(item, dict):
+            return {"source": f"{url}#{index}", "content": _text(item), "metadata": {}}
+        if options.content_fields:
+            values = (lookup(item, field) for field in options.content_fields)
+            content = "\n\n".join(_text(value) for value in values if value not in (None, ""))
+        else:
+            content = "\n".join(_flatten(item))
+        metadata = {}
+        for field in options.metadata_fields:
+            value = lookup(item, field)
+            if value is not None:
+                metadata[field] = _metadata_value(value)
+        item_id = lookup(item, options.id_field)
+        return {
+            "source": f"{url}#{item_id if item_id is not None else index}",
+            "content": content,
+            "metadata": metadata,
+        }
@@ -0,0 +1,289 @@
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urldefrag, urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+
+import httpx
+import trafilatura
+
+from .base_connector import BaseConnector
+from app.config import settings
+from app.log import get_logger
+from app.metrics import counter
+from app.rag.scope import origin_of
+
+log = get_logger(__name__)
+
+CRAWL_PAGES = counter(
+    "crawl_pages_total",
+    "Pages requested by the web crawler, by result (fetched, not_modified, blocked, failed, skipped).",
+    labelnames=("result",),
+)
+
+_HREF = re.compile(r"""<a\s[^>]*?href\s*=\s*["']([^"'#]+)""", re.IGNORECASE)
+_HTML_TYPES = ("text/html", "application/xhtml+xml")
+
+
+@dataclass
+class CrawlScope:
+    """Which discovered links are followed: same hosts and path prefixes as the seeds, up to a depth and page budget."""
+    allowed_hosts: frozenset
+    path_prefixes: Tuple[str, ...]
+    max_depth: int = 1
+    max_pages: int = 100
+    exclude: Tuple[str, ...] = ()  # Regexes; matching URLs are never fetched
+    _exclude: List[re.Pattern] = field(default_factory=list, init=False, repr=False)
+
+    def __post_init__(self):
+        self._exclude = [re.compile(pattern) for pattern in self.exclude]
+
+    @classmethod
+    def for_seeds(cls, seeds: Sequence[str], max_depth: int = 1, max_pages: int = 100, exclude: Tuple[str, ...] = ()) -> "CrawlScope":
+        parts = [urlsplit(seed) for seed in seeds]
+        # A seed like /en/about-us scopes the crawl to /en/.
+        prefixes = tuple(sorted({part.path.rsplit("/", 1)[0] + "/" for part in parts}))
+        return cls(frozenset(part.netloc.lower() for part in parts), prefixes, max_depth, max_pages, exclude)
+
+    def allows(self, url: str) -> bool:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or parts.netloc.lower() not in self.allowed_hosts:
+            return False
+        path = parts.path or "/"
+        if not any(path.startswith(prefix) for prefix in self.path_prefixes):
+            return False
+        return not any(pattern.search(url) for pattern in self._exclude)
+
+
+class HttpCache:
+    """On-disk cache of fetched pages with their validators (ETag / Last-Modified) for conditional re-fetches."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, url: str) -> Optional[Dict[str, str]]:
+        try:
+            with open(self._path(url), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url: str, response: httpx.Response):
+        validators = {key: response.headers[key] for key in ("etag", "last-modified") if key in response.headers}
+        if not validators:
+            return  # Nothing to revalidate with, so nothing to gain from storing it.
+        os.makedirs(self.directory, exist_ok=True)
+        entry = {"url": url, "body": response.text, **validators}
+        tmp_path = self._path(url) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self._path(url))
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict[str, str]]) -> Dict[str, str]:
+        if not entry:
+            return {}
+        headers = {}
+        if "etag" in entry:
+            headers["If-None-Match"] = entry["etag"]
+        if "last-modified" in entry:
+            headers["If-Modified-Since"] = entry["last-modified"]
+        return headers
+
+
+def _extract_page(html: str, url: str) -> Tuple[Optional[str], List[str]]:
+    """Main text and outgoing links of a page. Runs in the extraction process pool for crawls."""
+    text = trafilatura.extract(html, url=url)
+    links = [urldefrag(urljoin(url, href.strip()))[0] for href in _HREF.findall(html)]
+    return text, links
+
+
+_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> concurrent.futures.ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned, not forked: the server process already runs threads.
+            _pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=settings.CRAWL_EXTRACT_WORKERS or os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+class _HostPolicy:
+    """robots.txt rules and request pacing for one host."""
+
+    def __init__(self, robots: Optional[RobotFileParser], delay: float):
+        self.robots = robots
+        self.delay = delay
+        self.lock = asyncio.Lock()
+        self.next_request_at = 0.0
+
+    async def wait_turn(self):
+        async with self.lock:
+            now = time.monotonic()
+            if self.next_request_at > now:
+                await asyncio.sleep(self.next_request_at - now)
+            self.next_request_at = time.monotonic() + self.delay
+
+
+class CrawlerConnector(BaseConnector):
+    """
+    Polite concurrent crawler. Starting from seed URLs it fetches pages with
+    an async HTTP client, follows in-scope links breadth-first, honours
+    robots.txt (including Crawl-delay), spaces requests to each host by at
+    least `host_delay` seconds, and revalidates cached pages with
+    ETag / If-Modified-Since so unchanged pages cost a 304. Text extraction
+    runs in a process pool.
+
+    `load_data` accepts "seed" or "seed1,seed2" (the "crawl:" prefix is
+    stripped by load_from_source).
+    """
+
+    def __init__(
+        self,
+        max_depth: Optional[int] = None,
+        max_pages: Optional[int] = None,
+        exclude: Tuple[str, ...] = (),
+        concurrency: Optional[int] = None,
+        host_delay: Optional[float] = None,
+        cache_dir: Optional[str] = None,
+        user_agent: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.max_depth = settings.CRAWL_MAX_DEPTH if max_depth is None else max_depth
+        self.max_pages = settings.CRAWL_MAX_PAGES if max_pages is None else max_pages
+        self.exclude = exclude
+        self.concurrency = concurrency or settings.CRAWL_CONCURRENCY
+        self.host_delay = settings.CRAWL_HOST_DELAY_SECONDS if host_delay is None else host_delay
+        self.cache = HttpCache(cache_dir or settings.CRAWL_CACHE_DIR)
+        self.user_agent = user_agent or settings.CRAWL_USER_AGENT
+        self.transport = transport
+
+    def load_data(self, source: str) -> list[dict]:
+        seeds = [seed.strip() for seed in source.split(",") if seed.strip()]
+        coroutine = self.crawl(seeds)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coroutine)
+        # Called from async code (e.g. a route handler): run the crawl on its own loop.
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as runner:
+            return runner.submit(asyncio.run, coroutine).result()
+
+    async def crawl(self, seeds: Sequence[str]) -> List[dict]:
+        scope = CrawlScope.for_seeds(seeds, self.max_depth, self.max_pages, self.exclude)
+        queue: asyncio.Queue = asyncio.Queue()
+        seen = set()
+        for seed in seeds:
+            url = urldefrag(seed)[0]
+            if url not in seen:
+                seen.add(url)
+                queue.put_nowait((url, 0, origin_of(seed)))
+        documents: List[dict] = []
+        hosts: Dict[str, _HostPolicy] = {}
+        host_locks: Dict[str, asyncio.Lock] = {}
+
+        async with httpx.AsyncClient(
+            headers={"User-Agent": self.user_agent},
+            timeout=settings.CRAWL_TIMEOUT_SECONDS,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.concurrency),
+            transport=self.transport,
+        ) as client:
+
+            async def policy_for(url: str) -> _HostPolicy:
+                parts = urlsplit(url)
+                host = parts.netloc.lower()
+                async with host_locks.setdefault(host, asyncio.Lock()):
+                    if host not in hosts:
+                        robots = await self._fetch_robots(client, f"{parts.scheme}://{parts.netloc}/robots.txt")
+                        delay = self.host_delay
+                        if robots is not None:
+                            delay = max(delay, float(robots.crawl_delay(self.user_agent) or 0))
+                        hosts[host] = _HostPolicy(robots, delay)
+                return hosts[host]
+
+            async def worker():
+                while True:
+                    url, depth, origin = await queue.get()
+                    try:
+                        links = await self._visit(client, await policy_for(url), url, origin, documents)
+                        if depth < scope.max_depth:
+                            for link in links:
+                                if link not in seen and scope.allows(link) and len(seen) < scope.max_pages:
+                                    seen.add(link)
+                                    queue.put_nowait((link, depth + 1, origin))
+                    except Exception as e:
+                        CRAWL_PAGES.labels(result="failed").inc()
+                        log.warning("Crawl failed for page", url=url, error=str(e))
+                    finally:
+                        queue.task_done()
+
+            workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+            await queue.join()
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        log.info("Crawl finished", seeds=len(seeds), pages=len(seen), documents=len(documents))
+        return documents
+
+    async def _fetch_robots(self, client: httpx.AsyncClient, robots_url: str) -> Optional[RobotFileParser]:
+        parser = RobotFileParser(robots_url)
+        try:
+            response = await client.get(robots_url)
+        except httpx.HTTPError as e:
+            log.debug("robots.txt unavailable, allowing all", url=robots_url, error=str(e))
+            return None
+        if response.status_code in (401, 403):
+            parser.disallow_all = True
+        elif response.status_code >= 400:
+            return None
+        else:
+            parser.parse(response.text.splitlines())
+        return parser
+
+    async def _visit(self, client: httpx.AsyncClient, policy: _HostPolicy, url: str, origin: str, documents: List[dict]) -> List[str]:
+        if policy.robots is not None and not policy.robots.can_fetch(self.user_agent, url):
+            CRAWL_PAGES.labels(result="blocked").inc()
+            return []
+
+        cached = self.cache.get(url)
+        await policy.wait_turn()
+        response = await client.get(url, headers=HttpCache.conditional_headers(cached))
+        if response.status_code == 304 and cached is not None:
+            CRAWL_PAGES.labels(result="not_modified").inc()
+            html = cached["body"]
+        else:
+            response.raise_for_status()
+            if not response.headers.get("content-type", "").startswith(_HTML_TYPES):
+                CRAWL_PAGES.labels(result="skipped").inc()
+                return []
+            CRAWL_PAGES.labels(result="fetched").inc()
+            html = response.text
+            self.cache.put(url, response)
+
+        if self.max_pages == 1:
+            # A single page is not worth spawning the extraction pool for.
+            text, links = await asyncio.to_thread(_extract_page, html, url)
+        else:
+            text, links = await asyncio.get_running_loop().run_in_executor(_get_pool(), _extract_page, html, url)
+        if text:
+            documents.append({"source": url, "content": text, "origin": origin})
+        return links
@@ -1,9 +1,12 @@
 from langchain_community.document_loaders import Docx2txtLoader
 from .base_connector import BaseConnector
+from app.log import get_logger
+
+log = get_logger(__name__)
 
 class DOCXConnector(BaseConnector):
     def load_data(self, file_path: str) -> list[dict]:
-        print(f"-> Loading from DOCX: {file_path}")
+        log.info("Loading from DOCX", source=file_path)
         loader = Docx2txtLoader(file_path)
         docs = loader.load()
         return [{"source": file_path, "content": doc.page_content} for doc in docs]
\ No newline at end of file
@@ -1,5 +1,8 @@
 from unstructured.partition.image import partition_image
 from .base_connector import BaseConnector
+from app.log import get_logger
+
+log = get_logger(__name__)
 
 class ImageConnector(BaseConnector):
     def load_data(self, file_path: str) -> list[dict]:
@@ -8,11 +11,11 @@ class ImageConnector(BaseConnector):
         A more advanced approach would use a multimodal model to generate a
         rich description.
         """
-        print(f"-> Loading from Image (OCR): {file_path}")
+        log.info("Loading from image (OCR)", source=file_path)
         try:
             elements = partition_image(filename=file_path)
             content = "\n\n".join([str(el) for el in elements])
             return [{"source": file_path, "content": f"Image content: {content}"}]
         except Exception as e:
-            print(f"Could not process image {file_path} with unstructured. Error: {e}")
+            log.error("Could not process image with unstructured", source=file_path, error=str(e))
             return []
\ No newline at end of file
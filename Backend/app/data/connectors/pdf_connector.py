@@ -1,9 +1,12 @@
 from langchain_community.document_loaders import PyPDFLoader
 from .base_connector import BaseConnector
+from app.log import get_logger
+
+log = get_logger(__name__)
 
 class PDFConnector(BaseConnector):
     def load_data(self, file_path: str) -> list[dict]:
-        print(f"-> Loading from PDF: {file_path}")
+        log.info("Loading from PDF", source=file_path)
         loader = PyPDFLoader(file_path)
         pages = loader.load() # loads pages as LangChain Documents
         
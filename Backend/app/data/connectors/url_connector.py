@@ -1,13 +1,12 @@
-import trafilatura
 from .base_connector import BaseConnector
+from .crawler_connector import CrawlerConnector
+from app.log import get_logger
+
+log = get_logger(__name__)
 
 class URLConnector(BaseConnector):
+    """Fetches a single page through the crawler (robots.txt, rate limits, conditional-request cache), without following links."""
+
     def load_data(self, url: str) -> list[dict]:
-        print(f"-> Loading from URL: {url}")
-        downloaded = trafilatura.fetch_url(url)
-        if not downloaded:
-            return []
-        text = trafilatura.extract(downloaded)
-        if text:
-            return [{"source": url, "content": text}]
-        return []
\ No newline at end of file
+        log.info("Loading from URL", source=url)
+        return CrawlerConnector(max_depth=0, max_pages=1).load_data(url)
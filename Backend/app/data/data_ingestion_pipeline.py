@@ -3,24 +3,27 @@
 # This module orchestrates the entire data ingestion process.
 
 # 1. Import the sources and loaders
-from app.data.usage import SOURCES, load_from_source
+from app.data.usage import SOURCES, iter_source_batches
 
 # 2. Import the processing components
 from app.data.chunker import chunk_documents
 from app.data.embedder import embed_and_store_chunks
+from app.log import get_logger
+
+log = get_logger(__name__)
 
 def run_ingestion_pipeline():
     """
     Executes the full data ingestion pipeline.
     
     1. Iterates through all predefined SOURCES.
-    2. Loads data using the appropriate connector via load_from_source.
-    3. Chunks the loaded documents.
+    2. Loads data using the appropriate connector via iter_source_batches.
+    3. Chunks the loaded documents, batch by batch.
     4. Generates embeddings and stores them in the vector database.
     
     This function is designed to be run as a background task.
     """
-    print("--- [Background Task] Starting knowledge base ingestion pipeline ---")
+    log.info("Starting knowledge base ingestion pipeline")
     total_sources = len(SOURCES)
     successful_sources = 0
     failed_sources = 0
@@ -29,38 +32,40 @@ def run_ingestion_pipeline():
     # Loop through each defined source
     for i, source in enumerate(SOURCES):
         try:
-            print(f"--- [Pipeline {i+1}/{total_sources}] Processing source: {source} ---")
+            log.info("Processing source", position=f"{i+1}/{total_sources}", source=source)
             
-            # Load documents from the source
-            docs = load_from_source(source)
-            if not docs:
-                print(f"--- [Pipeline Warning] No documents returned from source: {source} ---")
+            # Load, chunk, embed and store the documents, one batch at a time
+            # (large API sources stream in several batches)
+            num_docs = num_created = num_chunks = 0
+            for docs in iter_source_batches(source):
+                chunks = chunk_documents(docs)
+                num_docs += len(docs)
+                num_created += len(chunks)
+                if chunks:
+                    num_chunks += embed_and_store_chunks(chunks)
+
+            if not num_docs:
+                log.warning("No documents returned from source", source=source)
                 failed_sources += 1
                 continue
-            
-            # Chunk the documents
-            chunks = chunk_documents(docs)
-            if not chunks:
-                print(f"--- [Pipeline Warning] No chunks were created from source: {source} ---")
+            if not num_created:
+                log.warning("No chunks were created from source", source=source)
                 failed_sources += 1
                 continue
-
-            # Embed and store the chunks
-            embed_and_store_chunks(chunks)
             
             successful_sources += 1
-            num_chunks = len(chunks)
             total_chunks_added += num_chunks
-            print(f"--- [Pipeline Success] Processed '{source}'. Added {num_chunks} chunks. ---")
+            log.info("Processed source", source=source, documents=num_docs, chunks=num_chunks, near_duplicates=num_created - num_chunks)
 
         except Exception as e:
             # Log any errors and continue to the next source
-            print(f"--- [Pipeline ERROR] Failed to process source '{source}': {e} ---")
+            log.exception("Failed to process source", source=source)
             failed_sources += 1
 
-    print("--- [Background Task] Knowledge base ingestion pipeline finished ---")
-    print("--- ================= INGESTION SUMMARY ================= ---")
-    print(f"    - Successfully processed sources: {successful_sources}/{total_sources}")
-    print(f"    - Failed sources:                 {failed_sources}")
-    print(f"    - Total chunks added to DB:       {total_chunks_added}")
-    print("--- ===================================================== ---")
\ No newline at end of file
+    log.info(
+        "Knowledge base ingestion pipeline finished",
+        successful_sources=successful_sources,
+        failed_sources=failed_sources,
+        total_sources=total_sources,
+        chunks_added=total_chunks_added,
+    )
\ No newline at end of file
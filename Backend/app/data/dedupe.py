@@ -0,0 +1,228 @@
+# --- START OF FILE app/data/dedupe.py ---
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.data.records import Chunk
+from app.log import get_logger
+from app.metrics import counter
+
+log = get_logger(__name__)
+
+INGEST_DEDUPE_CHUNKS = counter(
+    "ingest_dedupe_chunks_total",
+    "Chunks seen by the ingestion near-duplicate filter, by result (kept, dropped).",
+    labelnames=("result",),
+)
+
+NUM_PERM = 128
+BANDS = 16  # 16 bands x 8 rows: pairs above ~0.7 Jaccard almost always share a bucket
+ROWS = NUM_PERM // BANDS
+_PRIME = (1 << 31) - 1  # Keeps (a * x + b) inside uint64 for x, a, b < 2^31
+_WORD = re.compile(r"\w+")
+
+_rng = np.random.RandomState(1)  # Fixed seed: stored signatures must stay comparable across runs
+_A = _rng.randint(1, _PRIME, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.randint(0, _PRIME, size=NUM_PERM, dtype=np.uint64)
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS minhash_signatures (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        namespace TEXT NOT NULL,
+        origin TEXT NOT NULL DEFAULT '',
+        source TEXT,
+        chunk_id INTEGER,
+        signature BLOB NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS minhash_buckets (
+        namespace TEXT NOT NULL,
+        origin TEXT NOT NULL DEFAULT '',
+        bucket INTEGER NOT NULL,
+        signature_id INTEGER NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_minhash_buckets_origin ON minhash_buckets (namespace, origin, bucket)",
+)
+
+# Files created before signatures were scoped by origin.
+_MIGRATIONS = (
+    ("minhash_signatures", "origin", "ALTER TABLE minhash_signatures ADD COLUMN origin TEXT NOT NULL DEFAULT ''"),
+    ("minhash_buckets", "origin", "ALTER TABLE minhash_buckets ADD COLUMN origin TEXT NOT NULL DEFAULT ''"),
+)
+
+
+def minhash(text: str, shingle_size: int = 3) -> np.ndarray:
+    """MinHash signature (NUM_PERM uint64 values) of the word `shingle_size`-grams of a text."""
+    words = _WORD.findall(text.lower())
+    if len(words) < shingle_size:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) % _PRIME for s in shingles), dtype=np.uint64, count=len(shingles))
+    # One row per shingle, one column per permutation; the minimum of each column is the signature.
+    return ((np.outer(hashes, _A) + _B) % _PRIME).min(axis=0)
+
+
+def band_buckets(signature: np.ndarray) -> List[int]:
+    """One LSH bucket key per band (the band index is part of the key)."""
+    buckets = []
+    for band in range(BANDS):
+        digest = hashlib.blake2b(signature[band * ROWS:(band + 1) * ROWS].tobytes(), digest_size=8, person=bytes([band]) * 8)
+        buckets.append(int.from_bytes(digest.digest(), "big", signed=True))
+    return buckets
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(a == b))
+
+
+class DedupeResult(NamedTuple):
+    kept: List[Chunk]
+    dropped: int
+    signatures: List[Tuple[Chunk, np.ndarray, List[int]]]  # kept chunks, to be remembered once stored
+
+
+class ChunkDeduplicator:
+    """
+    Drops chunks that are near-duplicates (estimated Jaccard >= `threshold`)
+    of a chunk already stored in the same vector namespace under the same
+    origin, or of an earlier such chunk in the same batch. Site boilerplate
+    (navigation, footers, contact blocks) is thereby embedded once per
+    source instead of once per page. Chunks are never dropped in favour of
+    another origin's copy, since retrieval can be scoped to an agent's
+    origins (see app.rag.scope).
+
+    MinHash signatures and their LSH buckets are kept in sqlite, so
+    duplicates are recognised across ingestion runs. Signatures are only
+    written by `remember`, after the kept chunks have been stored, and must
+    be dropped with `forget` / `reset` when the stored vectors go away.
+    """
+
+    def __init__(self, path: str, threshold: float = 0.85):
+        self.path = path
+        self.threshold = threshold
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            for table, column, statement in _MIGRATIONS:
+                columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                if columns and column not in columns:
+                    conn.execute(statement)
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _stored_candidates(self, namespace: str, origin: str, buckets: Sequence[int]) -> List[np.ndarray]:
+        placeholders = ",".join("?" * len(buckets))
+        rows = self._connection().execute(
+            f"""
+            SELECT DISTINCT s.id, s.signature FROM minhash_buckets b
+            JOIN minhash_signatures s ON s.id = b.signature_id
+            WHERE b.namespace = ? AND b.origin = ? AND b.bucket IN ({placeholders})
+            """,
+            (namespace, origin, *buckets),
+        ).fetchall()
+        return [np.frombuffer(signature, dtype=np.uint64) for _id, signature in rows]
+
+    def deduplicate(self, chunks: Sequence[Chunk], namespace: Optional[str] = None) -> DedupeResult:
+        namespace = namespace or ""
+        kept: List[Chunk] = []
+        signatures: List[Tuple[Chunk, np.ndarray, List[int]]] = []
+        batch_buckets: dict = {}  # (origin, bucket) -> indexes into `signatures`, for duplicates within this batch
+        dropped = 0
+
+        with self._lock:
+            for chunk in chunks:
+                signature = minhash(chunk.text)
+                buckets = band_buckets(signature)
+                origin = chunk.origin or ""
+                candidates = [signatures[i][1] for i in {i for b in buckets for i in batch_buckets.get((origin, b), ())}]
+                candidates += self._stored_candidates(namespace, origin, buckets)
+                if any(similarity(signature, other) >= self.threshold for other in candidates):
+                    dropped += 1
+                    continue
+                for bucket in buckets:
+                    batch_buckets.setdefault((origin, bucket), []).append(len(signatures))
+                signatures.append((chunk, signature, buckets))
+                kept.append(chunk)
+
+        INGEST_DEDUPE_CHUNKS.labels(result="kept").inc(len(kept))
+        INGEST_DEDUPE_CHUNKS.labels(result="dropped").inc(dropped)
+        if dropped:
+            log.info("Dropped near-duplicate chunks", dropped=dropped, kept=len(kept), namespace=namespace)
+        return DedupeResult(kept, dropped, signatures)
+
+    def remember(self, result: DedupeResult, namespace: Optional[str] = None):
+        """Persists the signatures of stored chunks so later runs treat them as seen."""
+        namespace = namespace or ""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                for chunk, signature, buckets in result.signatures:
+                    origin = chunk.origin or ""
+                    cursor = conn.execute(
+                        "INSERT INTO minhash_signatures (namespace, origin, source, chunk_id, signature) VALUES (?, ?, ?, ?, ?)",
+                        (namespace, origin, chunk.source, chunk.chunk_id, signature.tobytes()),
+                    )
+                    conn.executemany(
+                        "INSERT INTO minhash_buckets (namespace, origin, bucket, signature_id) VALUES (?, ?, ?, ?)",
+                        [(namespace, origin, bucket, cursor.lastrowid) for bucket in buckets],
+                    )
+
+    def forget(self, namespace: Optional[str] = None, origin: Optional[str] = None) -> int:
+        """
+        Deletes the stored signatures of a namespace (optionally of one origin
+        only), so its chunks are embedded again on the next ingestion. Needed
+        whenever the matching vectors are deleted. Returns the number removed.
+        """
+        namespace = namespace or ""
+        where, params = "namespace = ?", [namespace]
+        if origin is not None:
+            where, params = where + " AND origin = ?", params + [origin]
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(f"DELETE FROM minhash_buckets WHERE {where}", params)
+                removed = conn.execute(f"DELETE FROM minhash_signatures WHERE {where}", params).rowcount
+        log.info("Forgot near-duplicate signatures", namespace=namespace, origin=origin, signatures=removed)
+        return removed
+
+    def reset(self) -> int:
+        """Deletes every stored signature, e.g. after the vector index was recreated."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM minhash_buckets")
+                removed = conn.execute("DELETE FROM minhash_signatures").rowcount
+        log.info("Reset near-duplicate signatures", signatures=removed)
+        return removed
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+chunk_deduplicator = ChunkDeduplicator(settings.INGEST_DEDUPE_DB_PATH, threshold=settings.INGEST_DEDUPE_THRESHOLD)
@@ -1,22 +1,58 @@
+from itertools import islice
+from typing import Iterable, Optional
 
+from app.config import settings
+from app.data.dedupe import chunk_deduplicator
+from app.data.records import Chunk
 from app.rag.retriever import get_vector_store
-from langchain.docstore.document import Document
+from app.rag.scope import SHARED_NAMESPACE
+from app.log import get_logger
 
-def embed_and_store_chunks(chunks: list[dict]):
+log = get_logger(__name__)
+
+# Chunks turned into Documents at a time; matches the store's embedding request size.
+STORE_BATCH_SIZE = 1000
+
+def embed_and_store_chunks(
+    chunks: Iterable[Chunk],
+    namespace: Optional[str] = SHARED_NAMESPACE,
+    deduplicate: Optional[bool] = None,
+) -> int:
     """
     Embeds document chunks and stores them in the vector store.
     
     Args:
-        chunks (list[dict]): A list of dictionaries, where each dict
-                               contains 'text' and 'metadata'.
+        chunks (Iterable[Chunk]): Chunk records (see app.data.records); they
+                               become LangChain Documents one batch at a time,
+                               right before they are written.
+        namespace (str, optional): Vector namespace to write to; a tenant's
+                               own (see app.rag.scope.tenant_namespace) or
+                               the shared knowledge base.
+        deduplicate (bool, optional): Drop near-duplicates of chunks already
+                               in the namespace before embedding them
+                               (default: INGEST_DEDUPE_ENABLED).
+
+    Returns:
+        int: The number of chunks embedded and stored.
     """
     vectorstore = get_vector_store()
+    if deduplicate is None:
+        deduplicate = settings.INGEST_DEDUPE_ENABLED
 
-    # Convert dicts to LangChain Document objects
-    documents = [
-        Document(page_content=chunk["text"], metadata=chunk["metadata"])
-        for chunk in chunks
-    ]
-    
-    vectorstore.add_documents(documents)
-    print(f"Successfully added {len(documents)} chunks to the vector store.")
+    stored = dropped = 0
+    chunks = iter(chunks)
+    while True:
+        batch = list(islice(chunks, STORE_BATCH_SIZE))
+        if not batch:
+            break
+        result = chunk_deduplicator.deduplicate(batch, namespace) if deduplicate else None
+        if result is not None:
+            batch, dropped = result.kept, dropped + result.dropped
+        if batch:
+            vectorstore.add_documents([chunk.to_document() for chunk in batch], namespace=namespace)
+            stored += len(batch)
+        if result is not None:
+            # Only once stored: a failed write must not mark its chunks as seen.
+            chunk_deduplicator.remember(result, namespace)
+    log.info("Added chunks to the vector store", chunks=stored, near_duplicates=dropped, namespace=namespace or "")
+    return stored
@@ -1,17 +1,14 @@
-import trafilatura
+import asyncio
+
+from app.data.connectors.crawler_connector import CrawlerConnector
 
 def extract_text_from_url(url: str) -> str:
     """Fetch and clean main content from a URL."""
-    downloaded = trafilatura.fetch_url(url)
-    if not downloaded:
-        return ""
-    return trafilatura.extract(downloaded)
+    documents = CrawlerConnector(max_depth=0, max_pages=1).load_data(url)
+    return documents[0]["content"] if documents else ""
 
 def load_multiple_urls(url_list: list[str]) -> list[dict]:
-    """Fetch multiple URLs and return list of cleaned content blocks."""
-    documents = []
-    for url in url_list:
-        text = extract_text_from_url(url)
-        if text:
-            documents.append({"url": url, "content": text})
-    return documents
+    """Fetch multiple URLs concurrently and return list of cleaned content blocks."""
+    # Seeds are passed as a list: URLs may contain commas, which load_data splits on.
+    documents = asyncio.run(CrawlerConnector(max_depth=0, max_pages=len(url_list)).crawl(url_list))
+    return [{"url": doc["source"], "content": doc["content"]} for doc in documents]
@@ -0,0 +1,64 @@
+# --- START OF FILE app/data/records.py ---
+
+from typing import Any, Dict, Optional
+
+from langchain_core.documents import Document
+
+
+class Chunk:
+    """
+    One chunk of an ingested document.
+
+    The text is not copied: every chunk of a document keeps a reference to
+    the same source string plus its [start, end) offsets, and `__slots__`
+    keeps the per-chunk overhead to a few pointers. Metadata dicts and
+    LangChain Documents are only built when the chunk reaches the vector
+    store. Document-level metadata (`extra`, e.g. fields mapped by the API
+    connector) is likewise one dict shared by all chunks of the document.
+    """
+
+    __slots__ = ("source_text", "start", "end", "source", "chunk_id", "origin", "extra")
+
+    def __init__(
+        self,
+        source_text: str,
+        start: int,
+        end: int,
+        source: str,
+        chunk_id: int,
+        origin: Optional[str] = None,
+        extra: Optional[Dict[str, Any]] = None,
+    ):
+        self.source_text = source_text
+        self.start = start
+        self.end = end
+        self.source = source
+        self.chunk_id = chunk_id
+        self.origin = origin
+        self.extra = extra
+
+    @classmethod
+    def standalone(cls, text: str, source: str, chunk_id: int, origin: Optional[str] = None, extra: Optional[Dict[str, Any]] = None) -> "Chunk":
+        """A chunk owning its own text (for when it is not a substring of the source)."""
+        return cls(text, 0, len(text), source, chunk_id, origin, extra)
+
+    @property
+    def text(self) -> str:
+        return self.source_text[self.start:self.end]
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        metadata: Dict[str, Any] = dict(self.extra or ())
+        metadata.update(source=self.source, chunk_id=self.chunk_id)
+        if self.origin:
+            metadata["origin"] = self.origin
+        return metadata
+
+    def to_document(self) -> Document:
+        return Document(page_content=self.text, metadata=self.metadata)
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def __repr__(self) -> str:
+        return f"Chunk(source={self.source!r}, chunk_id={self.chunk_id}, span=({self.start}, {self.end}))"
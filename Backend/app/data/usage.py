@@ -1,8 +1,12 @@
 # --- START OF FILE app/data/usage.py (Modified) ---
 
 import os
+from typing import Iterator, Optional
+
 from app.data.chunker import chunk_documents
 from app.data.embedder import embed_and_store_chunks
+from app.log import get_logger
+from app.rag.scope import origin_of
 
 # Import all your connectors
 from app.data.connectors.url_connector import URLConnector
@@ -10,6 +14,9 @@ from app.data.connectors.pdf_connector import PDFConnector
 from app.data.connectors.docx_connector import DOCXConnector
 from app.data.connectors.image_connector import ImageConnector
 from app.data.connectors.api_connector import APIConnector   # ✅ NEW
+from app.data.connectors.crawler_connector import CrawlerConnector
+
+log = get_logger(__name__)
 
 # Define the location of your local files
 KNOWLEDGE_BASE_DIR = "Knowledge_Base"
@@ -25,8 +32,13 @@ SOURCES = [
     "https://www.firstdrivingcentre.ae/en/careers",
     "https://www.firstdrivingcentre.ae/en/taxi-driving-course",
 
+    # Crawl Example (follows links under the seed's path)
+    #"crawl:https://www.firstdrivingcentre.ae/en/",
+
     # API Example
     "api:https://jsonplaceholder.typicode.com/posts",   # ✅ Mark APIs with "api:" prefix
+    # Paged API with field mapping (options go in the URL fragment, see APIConnector)
+    #"api:https://jsonplaceholder.typicode.com/comments#content=name,body&metadata=postId,email&offset=_start&limit=_limit",
 
     # Local files (commented out here)
     #os.path.join(KNOWLEDGE_BASE_DIR, "sample.pdf"),
@@ -34,11 +46,15 @@ SOURCES = [
     #os.path.join(KNOWLEDGE_BASE_DIR, "product_image.png")
 ]
 
-def load_from_source(source: str) -> list[dict]:
+def _load_with_connector(source: str) -> list[dict]:
     """Detects the source type and uses the appropriate connector."""
     if source.startswith("api:"):
         connector = APIConnector()
         return connector.load_data(source.replace("api:", "", 1))
+    elif source.startswith("crawl:"):
+        # Seed URL(s) whose in-scope links are followed
+        connector = CrawlerConnector()
+        return connector.load_data(source.replace("crawl:", "", 1))
     elif source.startswith("http://") or source.startswith("https://"):
         connector = URLConnector()
     elif source.lower().endswith(".pdf"):
@@ -48,7 +64,33 @@ def load_from_source(source: str) -> list[dict]:
     elif source.lower().endswith((".png", ".jpg", ".jpeg")):
         connector = ImageConnector()
     else:
-        print(f"⚠️ Warning: No connector found for source: {source}. Skipping.")
+        log.warning("No connector found for source, skipping", source=source)
         return []
     
     return connector.load_data(source)
+
+def _tag_origin(docs: list[dict], source: str) -> list[dict]:
+    origin = origin_of(source)
+    for doc in docs:
+        doc.setdefault("origin", origin)
+    return docs
+
+def load_from_source(source: str) -> list[dict]:
+    """
+    Loads a source and tags each document with its origin, so retrieval
+    can be scoped to an agent's knowledge base.
+    """
+    return _tag_origin(_load_with_connector(source), source)
+
+def iter_source_batches(source: str, batch_size: Optional[int] = None) -> Iterator[list[dict]]:
+    """
+    Like load_from_source, but API sources are handed over in batches while
+    later pages are still streaming in, so a large API is never loaded whole.
+    Other sources arrive as a single batch.
+    """
+    if source.startswith("api:"):
+        batches = APIConnector().iter_batches(source.replace("api:", "", 1), batch_size)
+    else:
+        batches = iter([_load_with_connector(source)])
+    for docs in batches:
+        yield _tag_origin(docs, source)
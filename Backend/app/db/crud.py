@@ -1,9 +1,12 @@
 # --- START OF FILE: app/db/crud.py (Corrected) ---
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson.objectid import ObjectId
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime
 import uuid
 
+from pymongo import DeleteMany, InsertOne, ReturnDocument, UpdateOne
+
 from app.auth.schemas import UserCreate, DecisionTableCreate, AgentSpec, WorkflowCreate
 from app.auth.utils import get_password_hash
 from app.auth.models import (
@@ -11,10 +14,14 @@ from app.auth.models import (
     ChatLog,
     AgentConfiguration,
     DecisionTableInDB,
-    WorkflowInDB
+    WorkflowInDB,
+    WorkflowRunInDB
 )
 from app.auth.models import ToolInDB
 from app.auth.schemas import ToolCreate
+from app.log import get_logger
+
+log = get_logger(__name__)
 
 
 
@@ -181,6 +188,7 @@ async def create_workflow(db: AsyncIOMotorDatabase, workflow_data: WorkflowCreat
     """Creates a new workflow definition in the 'workflows' collection."""
     workflow_doc = workflow_data.model_dump(by_alias=True)
     workflow_doc["user_id"] = ObjectId(user_id)
+    workflow_doc["api_key"] = str(uuid.uuid4())
     result = await db["workflows"].insert_one(workflow_doc)
     created_workflow = await db["workflows"].find_one({"_id": result.inserted_id})
     return WorkflowInDB(**created_workflow)
@@ -225,6 +233,27 @@ async def delete_workflow(db: AsyncIOMotorDatabase, workflow_id: str, user_id: s
     except Exception:
         return False
 
+async def get_workflow_by_api_key(db: AsyncIOMotorDatabase, workflow_id: str, api_key: str) -> Optional[WorkflowInDB]:
+    """Retrieves a workflow by ID if `api_key` is its trigger key."""
+    try:
+        workflow_doc = await db["workflows"].find_one({"_id": ObjectId(workflow_id), "api_key": api_key})
+        if workflow_doc:
+            return WorkflowInDB(**workflow_doc)
+    except Exception:
+        return None
+    return None
+
+async def set_workflow_api_key(db: AsyncIOMotorDatabase, workflow_id: str, user_id: str, api_key: str) -> bool:
+    """Stores a new trigger key for a workflow."""
+    try:
+        result = await db["workflows"].update_one(
+            {"_id": ObjectId(workflow_id), "user_id": ObjectId(user_id)},
+            {"$set": {"api_key": api_key}}
+        )
+        return result.matched_count == 1
+    except Exception:
+        return False
+
 # <<< THIS IS THE NEW FUNCTION THAT FIXES THE 404 ERROR >>>
 async def get_public_workflow_by_id(db: AsyncIOMotorDatabase, workflow_id: str) -> Optional[WorkflowInDB]:
     """
@@ -242,6 +271,120 @@ async def get_public_workflow_by_id(db: AsyncIOMotorDatabase, workflow_id: str)
     return None
 
 
+# ====================================================================
+# Workflow Run CRUD
+# ====================================================================
+
+async def create_workflow_run(
+    db: AsyncIOMotorDatabase,
+    workflow_id: str,
+    user_id: str,
+    input_data: Dict[str, Any],
+    chat_history: Optional[List[Dict[str, Any]]] = None,
+    run_id: Optional[str] = None,
+    trigger: Optional[str] = None,
+    idempotency_key: Optional[str] = None,
+) -> WorkflowRunInDB:
+    """
+    Creates a queued run in the 'workflow_runs' collection. Raises
+    pymongo's DuplicateKeyError if the idempotency key was already used.
+    """
+    run = WorkflowRunInDB(
+        _id=ObjectId(run_id) if run_id else ObjectId(),
+        workflow_id=ObjectId(workflow_id),
+        user_id=ObjectId(user_id),
+        input_data=input_data,
+        chat_history=chat_history or [],
+        trigger=trigger,
+        idempotency_key=idempotency_key,
+    )
+    run_doc = run.model_dump(by_alias=True)
+    await db["workflow_runs"].insert_one(run_doc)
+    return run
+
+async def get_workflow_run(db: AsyncIOMotorDatabase, run_id: str, user_id: Optional[str] = None) -> Optional[WorkflowRunInDB]:
+    """Retrieves a run; pass user_id to restrict it to the workflow's owner."""
+    try:
+        query = {"_id": ObjectId(run_id)}
+        if user_id is not None:
+            query["user_id"] = ObjectId(user_id)
+        run_doc = await db["workflow_runs"].find_one(query)
+        if run_doc:
+            return WorkflowRunInDB(**run_doc)
+    except Exception:
+        return None
+    return None
+
+async def get_workflow_run_by_idempotency_key(db: AsyncIOMotorDatabase, workflow_id: str, idempotency_key: str) -> Optional[WorkflowRunInDB]:
+    """Retrieves the run a trigger event with this idempotency key created."""
+    run_doc = await db["workflow_runs"].find_one({"workflow_id": ObjectId(workflow_id), "idempotency_key": idempotency_key})
+    return WorkflowRunInDB(**run_doc) if run_doc else None
+
+async def claim_workflow_run(db: AsyncIOMotorDatabase, run_id: str, owner: str, stale_before: datetime) -> Optional[WorkflowRunInDB]:
+    """
+    Atomically takes the lease on a run that is queued or whose previous
+    owner stopped heartbeating. Returns None if someone else holds it.
+    """
+    now = datetime.utcnow()
+    run_doc = await db["workflow_runs"].find_one_and_update(
+        {
+            "_id": ObjectId(run_id),
+            "$or": [
+                {"status": "queued"},
+                {"status": "running", "heartbeat_at": {"$lt": stale_before}},
+            ],
+        },
+        {"$set": {"status": "running", "owner": owner, "heartbeat_at": now, "started_at": now}, "$inc": {"attempts": 1}},
+        return_document=ReturnDocument.AFTER,
+    )
+    return WorkflowRunInDB(**run_doc) if run_doc else None
+
+async def add_workflow_run_checkpoint(db: AsyncIOMotorDatabase, run_id: str, owner: str, checkpoint: Dict[str, Any]) -> bool:
+    """Appends a node checkpoint; False if the lease has been lost."""
+    result = await db["workflow_runs"].update_one(
+        {"_id": ObjectId(run_id), "owner": owner, "status": "running"},
+        {"$push": {"checkpoints": checkpoint}, "$set": {"heartbeat_at": datetime.utcnow()}},
+    )
+    return result.modified_count == 1
+
+async def heartbeat_workflow_run(db: AsyncIOMotorDatabase, run_id: str, owner: str) -> bool:
+    result = await db["workflow_runs"].update_one(
+        {"_id": ObjectId(run_id), "owner": owner, "status": "running"},
+        {"$set": {"heartbeat_at": datetime.utcnow()}},
+    )
+    return result.modified_count == 1
+
+async def finish_workflow_run(db: AsyncIOMotorDatabase, run_id: str, owner: Optional[str], fields: Dict[str, Any]) -> bool:
+    """Records the final status and result of a run."""
+    query = {"_id": ObjectId(run_id)}
+    if owner is not None:
+        query["owner"] = owner
+    result = await db["workflow_runs"].update_one(
+        query,
+        {"$set": {**fields, "finished_at": datetime.utcnow(), "heartbeat_at": None}},
+    )
+    return result.modified_count == 1
+
+async def release_workflow_runs(db: AsyncIOMotorDatabase, owner: str) -> int:
+    """Puts every run held by `owner` back in the queue (used on shutdown)."""
+    result = await db["workflow_runs"].update_many(
+        {"owner": owner, "status": "running"},
+        {"$set": {"status": "queued", "owner": None, "heartbeat_at": None}},
+    )
+    return result.modified_count
+
+async def list_resumable_workflow_run_ids(db: AsyncIOMotorDatabase, stale_before: datetime, limit: int) -> List[str]:
+    """IDs of runs that are queued or whose owner stopped heartbeating, oldest first."""
+    cursor = db["workflow_runs"].find(
+        {"$or": [
+            {"status": "queued"},
+            {"status": "running", "heartbeat_at": {"$lt": stale_before}},
+        ]},
+        {"_id": 1},
+    ).sort("created_at", 1).limit(limit)
+    return [str(run_doc["_id"]) async for run_doc in cursor]
+
+
 # ====================================================================
 # Tool CRUD (NEW SECTION)
 # ====================================================================
@@ -262,23 +405,62 @@ async def get_tools_for_user(db: AsyncIOMotorDatabase, user_id: str) -> List[Too
         tools.append(ToolInDB(**tool_doc))
     return tools
 
-async def update_tools_for_user(db: AsyncIOMotorDatabase, tools_data: List[ToolCreate], user_id: str) -> List[ToolInDB]:
+async def get_tools_version(db: AsyncIOMotorDatabase, user_id: str) -> int:
+    """Returns the user's tools version; it increases on every save that changes something."""
+    version_doc = await db["tool_versions"].find_one({"_id": ObjectId(user_id)})
+    return version_doc["version"] if version_doc else 0
+
+def _tool_fields(tool: ToolCreate) -> Dict[str, Any]:
+    return tool.model_dump(exclude={"id"})
+
+async def update_tools_for_user(db: AsyncIOMotorDatabase, tools_data: List[ToolCreate], user_id: str) -> Tuple[List[ToolInDB], int]:
     """
-    Deletes all existing tools for a user and replaces them with a new list.
-    This is a simple way to handle the "Save All Tools" functionality.
+    Makes the user's tools match `tools_data` with a single bulk write:
+    changed tools are updated in place (keeping their IDs), new ones are
+    inserted, missing ones are deleted and unchanged ones are not touched.
+    Tools are matched by ID, or by name when no ID is sent. Returns the
+    saved tools in the given order and the user's tools version.
     """
     user_object_id = ObjectId(user_id)
-    # Delete all existing tools for this user
-    await db["tools"].delete_many({"user_id": user_object_id})
-    
-    if not tools_data:
-        return []
-
-    # Insert the new list of tools
-    new_tools_docs = [tool.model_dump() for tool in tools_data]
-    for doc in new_tools_docs:
-        doc["user_id"] = user_object_id
-        
-    await db["tools"].insert_many(new_tools_docs)
-    
-    return await get_tools_for_user(db, user_id)
\ No newline at end of file
+    existing = {tool.id: tool for tool in await get_tools_for_user(db, user_id)}
+    by_name = {tool.name: tool_id for tool_id, tool in existing.items()}
+
+    operations, saved, kept_ids = [], [], set()
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    for tool in tools_data:
+        fields = _tool_fields(tool)
+        tool_id = ObjectId(tool.id) if tool.id and ObjectId.is_valid(tool.id) else None
+        if tool_id not in existing or tool_id in kept_ids:
+            tool_id = by_name.get(tool.name)
+        if tool_id is not None and tool_id not in kept_ids:
+            kept_ids.add(tool_id)
+            current = existing[tool_id]
+            if current.model_dump(include=set(fields)) == fields:
+                counts["unchanged"] += 1
+                saved.append(current)
+                continue
+            operations.append(UpdateOne({"_id": tool_id, "user_id": user_object_id}, {"$set": fields}))
+            counts["updated"] += 1
+            saved.append(ToolInDB(_id=tool_id, user_id=user_object_id, **fields))
+        else:
+            new_tool = ToolInDB(user_id=user_object_id, **fields)
+            operations.append(InsertOne(new_tool.model_dump(by_alias=True)))
+            counts["inserted"] += 1
+            saved.append(new_tool)
+
+    removed_ids = [tool_id for tool_id in existing if tool_id not in kept_ids]
+    if removed_ids:
+        operations.append(DeleteMany({"_id": {"$in": removed_ids}, "user_id": user_object_id}))
+
+    if not operations:
+        return saved, await get_tools_version(db, user_id)
+
+    await db["tools"].bulk_write(operations, ordered=False)
+    version_doc = await db["tool_versions"].find_one_and_update(
+        {"_id": user_object_id},
+        {"$inc": {"version": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    log.info("Saved tools", user_id=user_id, deleted=len(removed_ids), version=version_doc["version"], **counts)
+    return saved, version_doc["version"]
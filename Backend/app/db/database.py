@@ -2,20 +2,44 @@
 
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.config import settings
+from app.db.monitoring import command_listener, pool_listener
+from app.log import get_logger
+
+log = get_logger(__name__)
 
 db = {} # Global dictionary to hold the database client and instance
 
 async def connect_to_mongo():
-    print("--- Connecting to MongoDB ---")
+    log.info("Connecting to MongoDB")
+    # Pool sizing comes from Settings; unset timeouts keep the driver defaults.
+    pool_options = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    }
+    pool_options = {key: value for key, value in pool_options.items() if value is not None}
+
     # Ensure TLS/SSL is enabled for Atlas or remote MongoDB
-    db["client"] = AsyncIOMotorClient(settings.MONGO_URI, tls=True, tlsAllowInvalidCertificates=True)
+    db["client"] = AsyncIOMotorClient(
+        settings.MONGO_URI,
+        tls=True,
+        tlsAllowInvalidCertificates=settings.MONGO_TLS_ALLOW_INVALID_CERTIFICATES,
+        event_listeners=[command_listener, pool_listener],
+        **pool_options,
+    )
     db["database"] = db["client"][settings.MONGO_DB_NAME]
-    print(f"--- MongoDB connection to '{settings.MONGO_DB_NAME}' successful ---")
+    log.info(
+        "MongoDB connection successful",
+        database=settings.MONGO_DB_NAME,
+        min_pool_size=settings.MONGO_MIN_POOL_SIZE,
+        max_pool_size=settings.MONGO_MAX_POOL_SIZE,
+    )
 
 async def close_mongo_connection():
-    print("--- Closing MongoDB connection ---")
+    log.info("Closing MongoDB connection")
     db["client"].close()
 
 def get_database():
     """FastAPI dependency to get the database instance."""
-    return db["database"]
\ No newline at end of file
+    return db["database"]
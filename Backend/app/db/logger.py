@@ -1,15 +1,19 @@
+# --- START OF FILE app/db/logger.py ---
+
+import os
+import queue
 import sqlite3
+import threading
 from datetime import datetime
+from typing import Dict, List, Optional
+
 from app.config import settings
-import os
+from app.log import get_logger
 
-# Ensure the logs directory exists
-os.makedirs(os.path.dirname(settings.LOG_DB_PATH), exist_ok=True)
+log = get_logger(__name__)
 
-def init_log_db():
-    conn = sqlite3.connect(settings.LOG_DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
+_SCHEMA = (
+    """
     CREATE TABLE IF NOT EXISTS query_logs (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         timestamp TEXT,
@@ -17,18 +21,188 @@ def init_log_db():
         answer TEXT,
         lang TEXT
     )
-    """)
-    conn.commit()
-    conn.close()
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_query_logs_timestamp ON query_logs (timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_query_logs_lang_timestamp ON query_logs (lang, timestamp)",
+)
+
+_INSERT_SQL = "INSERT INTO query_logs (timestamp, query, answer, lang) VALUES (?, ?, ?, ?)"
+
+_STOP = object()  # Sentinel that tells the writer thread to flush and exit
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # With WAL, NORMAL only syncs at checkpoints instead of on every commit.
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class QueryLogWriter:
+    """
+    Owns one long-lived WAL-mode sqlite connection on a dedicated thread.
+    Callers only enqueue rows; the writer drains the queue and inserts
+    everything it finds in a single transaction.
+    """
+
+    def __init__(self, path: str, batch_size: int = 500, flush_interval: float = 1.0, max_queue: int = 10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self.dropped = 0
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = _connect(self.path)
+        for statement in _SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+        self._thread = threading.Thread(target=self._run, args=(conn,), name="query-log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, row: tuple):
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            # Logging must never block a request; count what we had to drop.
+            self.dropped += 1
+
+    def _run(self, conn: sqlite3.Connection):
+        try:
+            while True:
+                try:
+                    first = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
+                batch, stopping = [], first is _STOP
+                if not stopping:
+                    batch.append(first)
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                if batch:
+                    self._write(conn, batch)
+                if stopping:
+                    break
+        finally:
+            conn.close()
+
+    def _write(self, conn: sqlite3.Connection, batch: List[tuple]):
+        try:
+            with conn:  # One transaction (and at most one sync) per batch
+                conn.executemany(_INSERT_SQL, batch)
+        except sqlite3.Error as e:
+            log.error("Failed to write query log batch", rows=len(batch), error=str(e))
+
+
+_writer: Optional[QueryLogWriter] = None
+
+
+def init_log_db():
+    """Creates the schema and starts the background writer. Called on app startup."""
+    global _writer
+    if _writer is None:
+        _writer = QueryLogWriter(settings.LOG_DB_PATH)
+    _writer.start()
+
+
+def close_log_db():
+    """Flushes any pending rows and stops the writer. Called on app shutdown."""
+    global _writer
+    if _writer is not None:
+        _writer.stop()
+        _writer = None
+
 
 def log_query(query: str, answer: str, lang: str):
-    conn = sqlite3.connect(settings.LOG_DB_PATH)
-    cursor = conn.cursor()
+    """Queues a query log row. Never blocks on disk I/O."""
+    if _writer is None:
+        init_log_db()
     timestamp = datetime.utcnow().isoformat()
-    cursor.execute("INSERT INTO query_logs (timestamp, query, answer, lang) VALUES (?, ?, ?, ?)",
-                   (timestamp, query, answer, lang))
-    conn.commit()
-    conn.close()
+    _writer.submit((timestamp, query, answer, lang))
+
+
+# ====================================================================
+# Analytics Queries
+# ====================================================================
+
+def _read_connection() -> sqlite3.Connection:
+    # WAL readers never block the writer, so short-lived read connections are fine.
+    conn = sqlite3.connect(f"file:{settings.LOG_DB_PATH}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def get_query_logs(
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    lang: Optional[str] = None,
+    limit: int = 100,
+    offset: int = 0,
+) -> List[Dict]:
+    """Returns logged queries, newest first, filtered by ISO timestamp range and language."""
+    clauses, params = [], []
+    if lang:
+        clauses.append("lang = ?")
+        params.append(lang)
+    if since:
+        clauses.append("timestamp >= ?")
+        params.append(since)
+    if until:
+        clauses.append("timestamp < ?")
+        params.append(until)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    sql = f"SELECT id, timestamp, query, answer, lang FROM query_logs {where} ORDER BY timestamp DESC LIMIT ? OFFSET ?"
+    conn = _read_connection()
+    try:
+        return [dict(row) for row in conn.execute(sql, (*params, limit, offset))]
+    finally:
+        conn.close()
+
 
-# Run on import
-init_log_db()
+def get_query_stats(since: Optional[str] = None, until: Optional[str] = None) -> Dict:
+    """Returns query counts per language and per day for the given ISO timestamp range."""
+    clauses, params = [], []
+    if since:
+        clauses.append("timestamp >= ?")
+        params.append(since)
+    if until:
+        clauses.append("timestamp < ?")
+        params.append(until)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    conn = _read_connection()
+    try:
+        by_lang = {
+            row["lang"]: row["total"]
+            for row in conn.execute(f"SELECT lang, COUNT(*) AS total FROM query_logs {where} GROUP BY lang", params)
+        }
+        by_day = {
+            row["day"]: row["total"]
+            for row in conn.execute(
+                f"SELECT substr(timestamp, 1, 10) AS day, COUNT(*) AS total FROM query_logs {where} GROUP BY day ORDER BY day",
+                params,
+            )
+        }
+    finally:
+        conn.close()
+    return {"total": sum(by_lang.values()), "by_lang": by_lang, "by_day": by_day}
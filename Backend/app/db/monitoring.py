@@ -0,0 +1,131 @@
+# --- START OF FILE app/db/monitoring.py ---
+
+import threading
+import time
+from typing import Dict, Tuple
+
+from pymongo import monitoring
+
+from app.metrics import histogram
+
+# Commands whose first key is not a collection name (or which carry it elsewhere).
+_COLLECTION_KEYS = {"getMore": "collection"}
+
+MONGO_COMMAND_SECONDS = histogram(
+    "mongo_command_duration_seconds",
+    "Latency of MongoDB commands, by collection and command name.",
+    labelnames=("collection", "command", "status"),
+)
+
+MONGO_POOL_CHECKOUT_SECONDS = histogram(
+    "mongo_pool_checkout_wait_seconds",
+    "Time spent waiting to check a connection out of the MongoDB pool.",
+    labelnames=("status",),
+)
+
+
+def _collection_from_command(command_name: str, command: Dict) -> str:
+    key = _COLLECTION_KEYS.get(command_name, command_name)
+    value = command.get(key)
+    return value if isinstance(value, str) else "-"
+
+
+class CommandLatencyListener(monitoring.CommandListener):
+    """
+    Records per-collection / per-command latency histograms.
+    Only the collection name is remembered between the started and finished
+    events; the duration itself comes from the driver.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Tuple[int, object], str] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        collection = _collection_from_command(event.command_name, event.command)
+        with self._lock:
+            self._pending[(event.request_id, event.connection_id)] = collection
+
+    def _finish(self, event, status: str):
+        with self._lock:
+            collection = self._pending.pop((event.request_id, event.connection_id), "-")
+        MONGO_COMMAND_SECONDS.labels(
+            collection=collection, command=event.command_name, status=status
+        ).observe(event.duration_micros / 1_000_000)
+
+    def succeeded(self, event):
+        self._finish(event, "ok")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+
+class PoolCheckoutListener(monitoring.ConnectionPoolListener):
+    """
+    Measures how long operations wait for a pooled connection.
+    Motor runs every PyMongo call on a worker thread, so the checkout start
+    and the checkout result are always reported on the same thread.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.open_connections = 0
+        self.checked_out = 0
+
+    def _observe_wait(self, status: str):
+        start = getattr(self._local, "checkout_started", None)
+        if start is not None:
+            self._local.checkout_started = None
+            MONGO_POOL_CHECKOUT_SECONDS.labels(status=status).observe(time.perf_counter() - start)
+
+    def connection_check_out_started(self, event):
+        self._local.checkout_started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        self._observe_wait("ok")
+        with self._lock:
+            self.checked_out += 1
+
+    def connection_check_out_failed(self, event):
+        self._observe_wait(str(getattr(event, "reason", "failed")))
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    # The remaining pool events carry no latency information.
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+
+command_listener = CommandLatencyListener()
+pool_listener = PoolCheckoutListener()
+
+
+def get_pool_stats() -> Dict[str, int]:
+    """Returns the current connection counts seen by the pool listener."""
+    return {
+        "open_connections": pool_listener.open_connections,
+        "checked_out": pool_listener.checked_out,
+    }
@@ -0,0 +1,163 @@
+# --- START OF FILE app/llm_clients.py ---
+
+import json
+import threading
+from typing import Any, Dict, Optional
+
+import httpx
+from langchain_openai import ChatOpenAI
+
+from app.cache import LRUCache
+from app.config import settings
+from app.log import get_logger
+from app.metrics import counter, llm_usage_callback
+
+try:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+except ImportError:
+    ChatGoogleGenerativeAI = None
+
+log = get_logger(__name__)
+
+LLM_CLIENT_CACHE_LOOKUPS = counter(
+    "llm_client_cache_lookups_total",
+    "Chat model client registry lookups, by provider and result (hit, miss).",
+    labelnames=("provider", "result"),
+)
+
+
+class _SharedHTTPClient(httpx.Client):
+    # autogen deep-copies every llm_config; the copy must keep using this pool.
+    def __deepcopy__(self, memo):
+        return self
+
+
+class _SharedAsyncHTTPClient(httpx.AsyncClient):
+    def __deepcopy__(self, memo):
+        return self
+
+
+def _params_key(params: Dict[str, Any]) -> str:
+    return json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class LLMClientRegistry:
+    """
+    Builds chat model clients once per (provider, model, params) and hands
+    the same instance to every caller. All OpenAI clients, including the
+    ones autogen creates from `autogen_llm_config`, share one pooled sync
+    and one pooled async HTTP transport, so requests reuse warm TCP/TLS
+    connections instead of doing a new handshake each time.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 64,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 60.0,
+    ):
+        self.max_size = max_size
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._clients = LRUCache(max_size)
+        self._http: Optional[httpx.Client] = None
+        self._async_http: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+
+    # --- Shared transports ---
+
+    def http_client(self) -> httpx.Client:
+        with self._lock:
+            if self._http is None or self._http.is_closed:
+                self._http = _SharedHTTPClient(limits=self._limits)
+            return self._http
+
+    def async_http_client(self) -> httpx.AsyncClient:
+        with self._lock:
+            if self._async_http is None or self._async_http.is_closed:
+                self._async_http = _SharedAsyncHTTPClient(limits=self._limits)
+            return self._async_http
+
+    # --- Clients ---
+
+    def chat_model(self, provider: str, model: str, **params: Any):
+        """
+        Returns the shared chat model for a provider ("openai" or "google"),
+        model name and constructor params (e.g. temperature, model_kwargs).
+        Raises ValueError for unsupported providers.
+        """
+        provider = provider.lower()
+        if "openai" in provider:
+            provider = "openai"
+        elif "google" in provider:
+            provider = "google"
+        else:
+            raise ValueError(f"Unsupported LLM provider: {provider}")
+
+        key = (provider, model, _params_key(params))
+        client = self._clients.get(key)
+        if client is not None:
+            LLM_CLIENT_CACHE_LOOKUPS.labels(provider=provider, result="hit").inc()
+            return client
+        LLM_CLIENT_CACHE_LOOKUPS.labels(provider=provider, result="miss").inc()
+
+        client = self._build(provider, model, params)
+        log.debug("Created chat model client", provider=provider, model=model)
+        # Keep whichever instance won a concurrent first build.
+        return self._clients.setdefault(key, client)
+
+    def _build(self, provider: str, model: str, params: Dict[str, Any]):
+        if provider == "openai":
+            return ChatOpenAI(
+                model=model,
+                api_key=settings.OPENAI_API_KEY or None,
+                http_client=self.http_client(),
+                http_async_client=self.async_http_client(),
+                callbacks=[llm_usage_callback],
+                **params,
+            )
+        if ChatGoogleGenerativeAI is None:
+            raise ValueError("Google provider requested but langchain-google-genai is not installed.")
+        # The Gemini client manages its own channel; reusing the instance keeps it warm.
+        return ChatGoogleGenerativeAI(model=model, callbacks=[llm_usage_callback], **params)
+
+    def autogen_llm_config(self, model: str, **extra: Any) -> Dict[str, Any]:
+        """An autogen llm_config whose OpenAI clients use the shared HTTP pool. `extra` is merged in (e.g. tools)."""
+        entry = {
+            "model": model,
+            "api_key": settings.OPENAI_API_KEY,
+            "http_client": self.http_client(),
+        }
+        return {"config_list": [entry], **extra}
+
+    # --- Lifecycle ---
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+    async def aclose(self):
+        """Drops cached clients and closes the shared transports. Called on shutdown."""
+        with self._lock:
+            self._clients.clear()
+            http, async_http = self._http, self._async_http
+            self._http = self._async_http = None
+        if http is not None:
+            http.close()
+        if async_http is not None:
+            await async_http.aclose()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+
+llm_clients = LLMClientRegistry(
+    max_size=settings.LLM_CLIENT_CACHE_SIZE,
+    max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS,
+)
@@ -0,0 +1,167 @@
+# --- START OF FILE app/log.py ---
+
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from app.config import settings
+
+_RESERVED_KEYS = ("ts", "level", "logger", "event")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _render_value(value: Any, limit: int) -> Any:
+    """Resolves lazy (callable) fields and truncates oversized payloads."""
+    if callable(value):
+        value = value()
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    if not isinstance(value, str):
+        try:
+            value = json.dumps(value, default=str, ensure_ascii=False)
+        except (TypeError, ValueError):
+            value = repr(value)
+    if len(value) > limit:
+        value = f"{value[:limit]}... <{len(value) - limit} more chars>"
+    return value
+
+
+class _StructuredFormatter(logging.Formatter):
+    """
+    Renders a record plus its structured fields as JSON or as `key=value` text.
+    Runs on the queue listener thread, so all serialization cost is paid off
+    the request path.
+    """
+
+    def __init__(self, fmt_type: str = "text", max_field_chars: int = 2000):
+        super().__init__()
+        self.fmt_type = fmt_type
+        self.max_field_chars = max_field_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {
+            key: _render_value(value, self.max_field_chars)
+            for key, value in (getattr(record, "fields", None) or {}).items()
+        }
+        timestamp = datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds")
+        message = record.getMessage()
+        if self.fmt_type == "json":
+            payload = {"ts": timestamp, "level": record.levelname, "logger": record.name, "event": message}
+            payload.update({key: value for key, value in fields.items() if key not in _RESERVED_KEYS})
+            if record.exc_info:
+                payload["exc"] = self.formatException(record.exc_info)
+            return json.dumps(payload, default=str, ensure_ascii=False)
+
+        line = f"{timestamp} {record.levelname:<7} {record.name}: {message}"
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener thread without formatting them first and
+    drops (and counts) records instead of blocking when the queue is full.
+    """
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _NonBlockingQueueHandler.dropped += 1
+
+
+class StructuredLogger:
+    """
+    Thin wrapper around a stdlib logger:
+
+        log.info("Agent finished", agent=name, answer=lambda: expensive(answer))
+
+    The level check happens before anything is built, callable fields are
+    only evaluated if the record is actually emitted, and `sample=0.1`
+    keeps roughly one in ten records of a noisy event.
+    """
+
+    __slots__ = ("_logger",)
+
+    def __init__(self, logger: logging.Logger):
+        self._logger = logger
+
+    def is_enabled_for(self, level: int) -> bool:
+        return self._logger.isEnabledFor(level)
+
+    def _log(self, level: int, event: str, sample: float, exc_info, fields: Dict[str, Any]):
+        if not self._logger.isEnabledFor(level):
+            return
+        if sample < 1.0 and random.random() >= sample:
+            return
+        self._logger.log(level, event, exc_info=exc_info, extra={"fields": fields}, stacklevel=3)
+
+    def debug(self, event: str, sample: float = 1.0, **fields: Any):
+        self._log(logging.DEBUG, event, sample, None, fields)
+
+    def info(self, event: str, sample: float = 1.0, **fields: Any):
+        self._log(logging.INFO, event, sample, None, fields)
+
+    def warning(self, event: str, sample: float = 1.0, **fields: Any):
+        self._log(logging.WARNING, event, sample, None, fields)
+
+    def error(self, event: str, sample: float = 1.0, **fields: Any):
+        self._log(logging.ERROR, event, sample, None, fields)
+
+    def exception(self, event: str, **fields: Any):
+        """Logs at ERROR level with the current exception's traceback attached."""
+        self._log(logging.ERROR, event, 1.0, True, fields)
+
+
+def get_logger(name: str) -> StructuredLogger:
+    """Returns a structured logger; pass the module's `__name__`."""
+    return StructuredLogger(logging.getLogger(name))
+
+
+def configure_logging(level: Optional[str] = None, fmt_type: Optional[str] = None):
+    """
+    Routes every `app.*` logger through a bounded queue to a single listener
+    thread that formats and writes to stdout. Safe to call more than once.
+    """
+    global _listener
+    app_logger = logging.getLogger("app")
+    app_logger.setLevel((level or settings.LOG_LEVEL).upper())
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(_StructuredFormatter(fmt_type or settings.LOG_FORMAT, settings.LOG_MAX_FIELD_CHARS))
+
+    log_queue: "queue.Queue" = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    app_logger.addHandler(_NonBlockingQueueHandler(log_queue))
+    app_logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Drains the queue and stops the listener thread. Called on app shutdown."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_records() -> int:
+    """Number of records dropped because the logging queue was full."""
+    return _NonBlockingQueueHandler.dropped
@@ -1,12 +1,20 @@
 # --- START OF FILE app/main.py ---
 
 import asyncio
+import time
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Query, status, Depends, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 
+# Logging is configured before the app modules below are imported.
+from app.log import configure_logging, shutdown_logging, get_logger
+configure_logging()
+
 from app.orchestrator import initialize_orchestrator
 from app.db.database import connect_to_mongo, close_mongo_connection, get_database
+from app.db.logger import init_log_db, close_log_db
+from app.workflows.runs import workflow_runs
+from app.llm_clients import llm_clients
 
 # --- This import section is now complete and correct ---
 from app.api import (
@@ -16,7 +24,8 @@ from app.api import (
     rules_routes as rules_api_routes, # Assuming this was already added
     workflow_routes as workflow_api_routes,
     tool_routes as tool_api_routes,
-    trigger_routes as trigger_api_routes # <<< FIX: ADDED THIS IMPORT
+    trigger_routes as trigger_api_routes, # <<< FIX: ADDED THIS IMPORT
+    metrics_routes as metrics_api_routes
 )
 
 #from app.api import websocket_routes
@@ -27,22 +36,35 @@ from app.auth.dependencies import get_current_user_for_websocket
 from app.auth.schemas import UserPublic
 from app.auth.models import ChatLog
 from app.db import crud
+from app.config import settings
+from app.metrics import HTTP_REQUEST_SECONDS, ACTIVE_WEBSOCKETS
+from app.tracing import init_tracing, shutdown_tracing, span, extract_context, set_attributes
+
+log = get_logger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Manages application startup and shutdown events using the recommended lifespan protocol.
     """
-    print("--- Application Lifespan: Startup ---")
+    log.info("Application startup")
+    init_tracing()
     await connect_to_mongo()
+    init_log_db()
     app.state.graph = initialize_orchestrator()
-    print("--- Application Lifespan: Startup Complete ---")
+    await workflow_runs.start(get_database())
+    log.info("Application startup complete")
 
     yield  # The application runs here
 
-    print("--- Application Lifespan: Shutdown ---")
+    log.info("Application shutdown")
+    await workflow_runs.stop()
+    await llm_clients.aclose()
     await close_mongo_connection()
-    print("--- Application Lifespan: Shutdown Complete ---")
+    close_log_db()
+    shutdown_tracing()
+    log.info("Application shutdown complete")
+    shutdown_logging()
 
 # Create the main FastAPI application instance and attach the lifespan manager
 app = FastAPI(title="Conversational RAG Orchestrator", lifespan=lifespan)
@@ -56,6 +78,37 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Records request latency per route template (not per raw path, to keep cardinality bounded)."""
+    started_at, status_code = time.perf_counter(), 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.labels(
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status_code),
+        ).observe(time.perf_counter() - started_at)
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Opens the root span of each request, continuing any trace propagated by the caller."""
+    with span(
+        f"{request.method} {request.url.path}",
+        parent=extract_context(request.headers),
+        **{"http.method": request.method, "http.target": request.url.path}
+    ) as request_span:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        if route is not None and request_span is not None:
+            request_span.update_name(f"{request.method} {route.path}")
+        set_attributes(**{"http.route": getattr(route, "path", None), "http.status_code": response.status_code})
+        return response
+
 # --- WebSocket Endpoint ---
 @app.websocket("/ws")
 async def websocket_endpoint(
@@ -73,26 +126,26 @@ async def websocket_endpoint(
         return
 
     await websocket.accept()
-    print(f"✅ WebSocket connected: {user.email} session={session_id}")
+    log.info("WebSocket connected", user=user.email, session_id=session_id)
 
     db = get_database()
 
     session_event = SESSION_EVENTS.get(session_id)
     if session_event:
         session_event.set()
-        print(f"--- [WebSocket] Session event set for {session_id}")
+        log.debug("WebSocket session event set", session_id=session_id)
 
     async def listen_to_client(ws: WebSocket, sid: str, current_user: UserPublic, db_conn):
         try:
             while True:
                 data = await ws.receive_text()
-                print(f"--- [WebSocket] Received from client (session={sid}): {data} ---")
-                log = ChatLog(session_id=sid, user_id=current_user.id, sender="user", content=data)
+                log.debug("WebSocket message received", sample=settings.LOG_PAYLOAD_SAMPLE_RATE, session_id=sid, data=data)
+                chat_log = ChatLog(session_id=sid, user_id=current_user.id, sender="user", content=data)
                 if db_conn:
-                    await crud.create_chat_log(db_conn, log)
+                    await crud.create_chat_log(db_conn, chat_log)
                 await frontend_input_queue.put(data)
         except WebSocketDisconnect:
-            print(f"--- [WebSocket] Client disconnected from session {sid} ---")
+            log.info("WebSocket client disconnected", session_id=sid)
             await frontend_input_queue.put("User has disconnected.")
 
     async def send_to_client(ws: WebSocket, sid: str, current_user: UserPublic, db_conn):
@@ -100,27 +153,29 @@ async def websocket_endpoint(
             while True:
                 message = await backend_output_queue.get()
                 if message == "END_OF_CONVERSATION":
-                    print(f"--- [WebSocket] End of conversation for session={sid}. Closing. ---")
+                    log.info("End of conversation, closing WebSocket", session_id=sid)
                     await ws.close()
                     break
-                print(f"--- [WebSocket] Sending to client (session={sid}): {message} ---")
-                log = ChatLog(session_id=sid, user_id=current_user.id, sender="agent", content=message)
+                log.debug("WebSocket message sent", sample=settings.LOG_PAYLOAD_SAMPLE_RATE, session_id=sid, data=message)
+                chat_log = ChatLog(session_id=sid, user_id=current_user.id, sender="agent", content=message)
                 if db_conn:
-                    await crud.create_chat_log(db_conn, log)
+                    await crud.create_chat_log(db_conn, chat_log)
                 await ws.send_text(message)
                 backend_output_queue.task_done()
         except asyncio.CancelledError:
-            print(f"--- [WebSocket] Send task cancelled for session={sid}. ---")
+            log.debug("WebSocket send task cancelled", session_id=sid)
 
+    ACTIVE_WEBSOCKETS.inc()
     try:
         listen_task = asyncio.create_task(listen_to_client(websocket, session_id, user, db))
         send_task = asyncio.create_task(send_to_client(websocket, session_id, user, db))
-        print(f"--- [WebSocket] Started listen/send tasks for session={session_id} ---")
+        log.debug("WebSocket listen/send tasks started", session_id=session_id)
         await asyncio.gather(listen_task, send_task)
     finally:
+        ACTIVE_WEBSOCKETS.dec()
         if session_id in SESSION_EVENTS:
             del SESSION_EVENTS[session_id]
-            print(f"--- [WebSocket] Cleaned up session event for session={session_id}. ---")
+            log.debug("WebSocket session event cleaned up", session_id=session_id)
             
 app.include_router(auth_api_routes.router, prefix="/api")
 
@@ -138,6 +193,9 @@ app.include_router(tool_api_routes.router, prefix="/api")
 # matched by a more generic rule if one existed in `api_routes`.
 app.include_router(api_routes.router, prefix="/api")
 
+# Metrics are served outside of /api so scrapers can use the conventional path.
+app.include_router(metrics_api_routes.router)
+
 @app.get("/")
 async def root():
     """Root endpoint to confirm that the server is running."""
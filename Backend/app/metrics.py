@@ -0,0 +1,412 @@
+# --- START OF FILE app/metrics.py ---
+
+import bisect
+import threading
+from abc import ABC, abstractmethod
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Default latency buckets in seconds, from sub-millisecond lookups up to slow LLM calls.
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+# USD per 1M tokens as (input, output). Matched by longest model-name prefix.
+MODEL_PRICES_PER_MILLION: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o-2024-05-13": (5.00, 15.00),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-4": (30.00, 60.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-1.5-pro": (1.25, 5.00),
+}
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels.items())
+    return "{" + inner + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# ====================================================================
+# Metric Children (one labelled time series each)
+# ====================================================================
+
+class _CounterChild:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def get(self) -> float:
+        return self._value
+
+
+class _GaugeChild(_CounterChild):
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def set(self, value: float):
+        with self._lock:
+            self._value = value
+
+    @contextmanager
+    def track_inprogress(self):
+        """Increments the gauge for the duration of the block."""
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Sequence[float]):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)  # Last slot is the +Inf bucket
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    @contextmanager
+    def time(self):
+        """Observes the elapsed wall-clock time in seconds. Also usable as a decorator."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def cumulative_buckets(self) -> Tuple[List[Tuple[float, int]], float, int]:
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative, buckets = 0, []
+        for upper, bucket_count in zip(list(self._buckets) + [float("inf")], counts):
+            cumulative += bucket_count
+            buckets.append((upper, cumulative))
+        return buckets, total, count
+
+    def snapshot(self) -> Dict:
+        buckets, total, count = self.cumulative_buckets()
+        return {
+            "count": count,
+            "sum": total,
+            "avg": (total / count) if count else 0.0,
+            "buckets": {_format_value(upper): value for upper, value in buckets},
+        }
+
+
+# ====================================================================
+# Metric Families
+# ====================================================================
+
+class _Metric(ABC):
+    """
+    Base class for a labelled metric family.
+    Usage mirrors prometheus_client: `METRIC.labels(op="find").observe(0.01)`.
+    """
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _new_child(self):
+        """Creates the time series for one new combination of label values."""
+
+    def labels(self, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new_child()
+        return child
+
+    def _items(self) -> List[Tuple[Dict[str, str], Any]]:
+        with self._lock:
+            items = list(self._children.items())
+        return [(dict(zip(self.labelnames, key)), child) for key, child in items]
+
+    def snapshot(self) -> List[Dict]:
+        return [{"labels": labels, "value": child.get()} for labels, child in self._items()]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for labels, child in self._items():
+            lines.append(f"{self.name}{_format_labels(labels)} {_format_value(child.get())}")
+        return lines
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def snapshot(self) -> List[Dict]:
+        return [{"labels": labels, **child.snapshot()} for labels, child in self._items()]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, child in self._items():
+            buckets, total, count = child.cumulative_buckets()
+            for upper, value in buckets:
+                bucket_labels = {**labels, "le": _format_value(upper)}
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_labels)} {value}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds every metric created through this module so they can be exported together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def _all(self) -> List[_Metric]:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {
+            metric.name: {"help": metric.documentation, "type": metric.type_name, "series": metric.snapshot()}
+            for metric in self._all()
+        }
+
+    def render_prometheus(self) -> str:
+        """Renders every metric in the Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        for metric in self._all():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    """Creates (or returns the already registered) counter with the given name."""
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    """Creates (or returns the already registered) gauge with the given name."""
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+    """Creates (or returns the already registered) histogram with the given name."""
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# ====================================================================
+# Shared Application Metrics
+# ====================================================================
+
+HTTP_REQUEST_SECONDS = histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template, method and status code.",
+    labelnames=("method", "route", "status"),
+)
+
+RAG_STAGE_SECONDS = histogram(
+    "rag_stage_duration_seconds",
+    "Latency of each stage of the RAG pipeline (embed, vector_search, rerank, prompt_build, llm, json_parse).",
+    labelnames=("stage",),
+)
+
+GRAPH_NODE_SECONDS = histogram(
+    "orchestrator_node_duration_seconds",
+    "Latency of each LangGraph orchestrator node.",
+    labelnames=("node",),
+)
+
+TOOL_CALL_SECONDS = histogram(
+    "tool_call_duration_seconds",
+    "Latency of agent tool calls, by tool name and outcome.",
+    labelnames=("tool", "status"),
+)
+
+LLM_REQUEST_SECONDS = histogram(
+    "llm_request_duration_seconds",
+    "Latency of LLM calls made through LangChain, by model.",
+    labelnames=("model",),
+)
+
+LLM_TOKENS = counter(
+    "llm_tokens_total",
+    "Tokens consumed by LLM calls, by model and kind (prompt/completion).",
+    labelnames=("model", "kind"),
+)
+
+LLM_COST_USD = counter(
+    "llm_cost_usd_total",
+    "Estimated LLM spend in USD, by model.",
+    labelnames=("model",),
+)
+
+ACTIVE_WEBSOCKETS = gauge(
+    "websocket_connections_active",
+    "Currently open WebSocket connections.",
+)
+
+ACTIVE_AGENT_SESSIONS = gauge(
+    "agent_sessions_active",
+    "Currently running AutoGen conversation sessions.",
+)
+
+
+def _price_for(model: str) -> Tuple[float, float]:
+    best = ""
+    for prefix in MODEL_PRICES_PER_MILLION:
+        if model.startswith(prefix) and len(prefix) > len(best):
+            best = prefix
+    return MODEL_PRICES_PER_MILLION.get(best, (0.0, 0.0))
+
+
+def record_llm_usage(model: str, prompt_tokens: int, completion_tokens: int):
+    """Adds token counts and the estimated cost of one LLM call to the usage counters."""
+    model = model or "unknown"
+    LLM_TOKENS.labels(model=model, kind="prompt").inc(prompt_tokens)
+    LLM_TOKENS.labels(model=model, kind="completion").inc(completion_tokens)
+    input_price, output_price = _price_for(model)
+    LLM_COST_USD.labels(model=model).inc(
+        (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+    )
+
+
+class LLMUsageCallback(BaseCallbackHandler):
+    """
+    LangChain callback that records latency, token counts and cost of every
+    LLM call it is attached to. Stateless apart from in-flight start times,
+    so a single instance can be shared by all models.
+    """
+
+    def __init__(self):
+        self._started: Dict[Any, Tuple[float, str]] = {}
+
+    def _start(self, serialized: Optional[Dict], run_id, kwargs: Dict):
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model_name") or params.get("model") or "unknown"
+        self._started[run_id] = (time.perf_counter(), model)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(serialized, run_id, kwargs)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(serialized, run_id, kwargs)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        started_at, model = self._started.pop(run_id, (None, "unknown"))
+        llm_output = response.llm_output or {}
+        model = llm_output.get("model_name") or model
+        if started_at is not None:
+            LLM_REQUEST_SECONDS.labels(model=model).observe(time.perf_counter() - started_at)
+
+        usage = llm_output.get("token_usage") or {}
+        prompt_tokens = usage.get("prompt_tokens")
+        completion_tokens = usage.get("completion_tokens")
+        if prompt_tokens is None:
+            # Providers that do not fill llm_output report usage on the message instead.
+            for generations in response.generations:
+                for generation in generations:
+                    usage_metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                    prompt_tokens = (prompt_tokens or 0) + usage_metadata.get("input_tokens", 0)
+                    completion_tokens = (completion_tokens or 0) + usage_metadata.get("output_tokens", 0)
+        record_llm_usage(model, prompt_tokens or 0, completion_tokens or 0)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._started.pop(run_id, None)
+
+
+llm_usage_callback = LLMUsageCallback()
@@ -2,16 +2,22 @@
 
 import os
 import json
+import functools
 from typing import TypedDict, List, Literal, Dict, Optional, Any
 
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, END
 
 from app.config import settings
+from app.metrics import GRAPH_NODE_SECONDS
+from app.llm_clients import llm_clients
+from app.tracing import timed_span, span
+from app.log import get_logger
 from app.rag.pipeline import get_rag_answer
 from app.autogen_runner3 import run_conversation_from_config 
 
+log = get_logger(__name__)
+
 # --- Global variables to hold loaded configurations ---
 # Initialize them as empty. They will be populated at app startup.
 SUPERVISOR_PROFILE: Dict = {}
@@ -26,13 +32,13 @@ def load_supervisor_profile():
     try:
         with open("supervisor_profile.json", "r") as f:
             SUPERVISOR_PROFILE = json.load(f)
-        print(f"--- Loaded supervisor profile: {SUPERVISOR_PROFILE.get('name', 'Unnamed')} ---")
+        log.info("Loaded supervisor profile", name=SUPERVISOR_PROFILE.get('name', 'Unnamed'))
     except FileNotFoundError:
         SUPERVISOR_PROFILE = {"supervisor_system_message": "You are a helpful supervisor."}
-        print(f"--- WARNING: supervisor_profile.json not found. Using default profile. ---")
+        log.warning("supervisor_profile.json not found, using default profile")
     except Exception as e:
         SUPERVISOR_PROFILE = {"supervisor_system_message": "You are a helpful supervisor."}
-        print(f"--- WARNING: Error loading supervisor profile: {e}. Using default. ---")
+        log.warning("Error loading supervisor profile, using default", error=str(e))
 
 def load_assistants_config():
     """Loads the default assistant configurations from a JSON file into the global variable."""
@@ -42,13 +48,25 @@ def load_assistants_config():
             data = json.load(f)
             # Correctly extract the LIST from the "assistants" key.
             ASSISTANT_CONFIGS = data.get("assistants", [])
-        print(f"--- Loaded {len(ASSISTANT_CONFIGS)} default assistants from assistant_config.json ---")
+        log.info("Loaded default assistants from assistant_config.json", count=len(ASSISTANT_CONFIGS))
     except FileNotFoundError:
         ASSISTANT_CONFIGS = []
-        print(f"--- WARNING: assistant_config.json not found. No default assistants loaded. ---")
+        log.warning("assistant_config.json not found, no default assistants loaded")
     except Exception as e:
         ASSISTANT_CONFIGS = []
-        print(f"--- WARNING: Error loading assistant_config.json: {e}. No default assistants loaded. ---")
+        log.warning("Error loading assistant_config.json, no default assistants loaded", error=str(e))
+
+
+def _timed_node(name: str, node_fn):
+    """Wraps a LangGraph node in a span and records its latency under its node name."""
+    timer = GRAPH_NODE_SECONDS.labels(node=name)
+
+    @functools.wraps(node_fn)
+    def wrapper(state):
+        with timed_span(f"orchestrator.node.{name}", timer):
+            return node_fn(state)
+
+    return wrapper
 
 
 # --- MAIN INITIALIZER FOR STARTUP ---
@@ -57,13 +75,13 @@ def initialize_orchestrator():
     Main initialization function called once on app startup via the lifespan manager.
     It loads configurations and compiles the LangGraph.
     """
-    print("--- Initializing Orchestrator ---")
+    log.info("Initializing orchestrator")
     
     # Load all configurations from their dedicated functions
     load_supervisor_profile()
     load_assistants_config()
 
-    llm = ChatOpenAI(model=settings.LLM_MODEL_NAME, temperature=0, api_key=settings.OPENAI_API_KEY)
+    llm = llm_clients.chat_model("openai", settings.LLM_MODEL_NAME, temperature=0)
 
     # --- LangGraph Definition ---
     class GraphState(TypedDict):
@@ -74,22 +92,29 @@ def initialize_orchestrator():
         final_response: Optional[Dict]
         assistant_configs: List[Dict]
         supervisor_profile: Dict
+        retrieval_filter: Optional[Dict]
+        retrieval_namespaces: Optional[List[Optional[str]]]
 
     # --- NODE 1: Perform RAG ---
     def structured_rag_node(state: GraphState) -> Dict[str, Any]:
-        print("--- [LangGraph] Node 1: Running Structured RAG ---")
-        rag_result = get_rag_answer(state["question"], state["lang"])
+        log.debug("Node 1: running structured RAG")
+        rag_result = get_rag_answer(
+            state["question"],
+            state["lang"],
+            metadata_filter=state.get("retrieval_filter"),
+            namespaces=state.get("retrieval_namespaces"),
+        )
         return {"rag_answer": rag_result}
 
     # --- NODE 2: Decide the Route ---
     def route_query_node(state: GraphState) -> Dict[str, str]:
-        print("--- [LangGraph] Node 2: Routing Query ---")
+        log.debug("Node 2: routing query")
         
         # This logic is now robust. It correctly checks the configs for the specific run.
         assistant_configs_for_this_run = state.get("assistant_configs", [])
         
         if not assistant_configs_for_this_run:
-            print("--- [LangGraph] No agents configured for this run. Defaulting to RAG_Is_Sufficient. ---")
+            log.debug("No agents configured for this run, defaulting to RAG_Is_Sufficient")
             return {"agent_decision": "RAG_Is_Sufficient"}
             
         class RouterTool(BaseModel):
@@ -105,24 +130,24 @@ def initialize_orchestrator():
         **User Query:** "{state['question']}"
         """
         result = structured_llm.invoke(prompt)
-        print(f"--- [LangGraph] Routing Decision: {result.decision} ---")
+        log.info("Routing decision", decision=result.decision)
         return {"agent_decision": result.decision}
 
     # --- NODE 3: Format Final Output ---
     def format_rag_output_node(state: GraphState) -> Dict[str, Dict]:
-        print("--- [LangGraph] Node 3a: Formatting RAG Output ---")
+        log.debug("Node 3a: formatting RAG output")
         return {"final_response": state["rag_answer"]}
         
     def format_agent_output_node(state: GraphState) -> Dict[str, Dict]:
-        print("--- [LangGraph] Node 3b: Formatting Agent Output ---")
+        log.debug("Node 3b: formatting agent output")
         return {"final_response": {"type": "interactive_session_start"}}
 
     # --- Define the Workflow ---
     workflow = StateGraph(GraphState)
-    workflow.add_node("structured_rag", structured_rag_node)
-    workflow.add_node("route_query", route_query_node)
-    workflow.add_node("format_rag_output", format_rag_output_node)
-    workflow.add_node("format_agent_output", format_agent_output_node)
+    workflow.add_node("structured_rag", _timed_node("structured_rag", structured_rag_node))
+    workflow.add_node("route_query", _timed_node("route_query", route_query_node))
+    workflow.add_node("format_rag_output", _timed_node("format_rag_output", format_rag_output_node))
+    workflow.add_node("format_agent_output", _timed_node("format_agent_output", format_agent_output_node))
     
     workflow.set_entry_point("structured_rag")
     workflow.add_edge("structured_rag", "route_query")
@@ -140,15 +165,16 @@ def initialize_orchestrator():
     workflow.add_edge("format_agent_output", END)
     
     app_graph = workflow.compile()
-    print("--- Orchestrator Initialized: LangGraph is ready. ---")
+    log.info("Orchestrator initialized, LangGraph is ready")
     
     return app_graph
 
 # --- TOP-LEVEL HELPER FOR BACKGROUND TASKS ---
 def run_agent_session(config, loop, session_id: str): # Added session_id for Redis
     """Helper function to run the AutoGen session in a background task."""
-    print(f"--- [Background Task] Kicking off AutoGen session for session_id: {session_id} ---")
+    log.info("Kicking off AutoGen session", session_id=session_id)
     # This assumes you have implemented the Redis-based wait logic from our previous discussions
     # For example: await redis_manager.wait_for_session(session_id)
-    run_conversation_from_config(config, loop)
-    print(f"--- [Background Task] AutoGen session has finished for session_id: {session_id}. ---")
\ No newline at end of file
+    with span("autogen.start_session", **{"session.id": session_id}):
+        run_conversation_from_config(config, loop)
+    log.info("AutoGen session finished", session_id=session_id)
\ No newline at end of file
@@ -0,0 +1,114 @@
+# --- START OF FILE app/rag/context_builder.py ---
+
+import re
+from functools import lru_cache
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from langchain_core.documents import Document
+
+from app.log import get_logger
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+log = get_logger(__name__)
+
+_WORD = re.compile(r"\w+")
+
+
+class BuiltContext(NamedTuple):
+    text: str
+    citations: List[Dict[str, object]]
+    tokens: int
+    dropped_duplicates: int
+    dropped_over_budget: int
+
+
+def _approximate_tokens(text: str) -> int:
+    # Roughly 4 characters per token for English text with OpenAI tokenizers.
+    return (len(text) + 3) // 4
+
+
+@lru_cache(maxsize=16)
+def get_token_counter(model: str) -> Callable[[str], int]:
+    """
+    Returns a function counting tokens with `model`'s tokenizer. Falls back
+    to cl100k_base for unknown models and to a character estimate when
+    tiktoken (or its encoding files) is unavailable.
+    """
+    if tiktoken is not None:
+        try:
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoding = tiktoken.get_encoding("cl100k_base")
+            return lambda text: len(encoding.encode(text, disallowed_special=()))
+        except Exception as e:
+            log.warning("Could not load tokenizer, estimating token counts", model=model, error=str(e))
+    return _approximate_tokens
+
+
+def _shingles(text: str, size: int = 3) -> frozenset:
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return frozenset([" ".join(words)])
+    return frozenset(" ".join(words[i:i + size]) for i in range(len(words) - size + 1))
+
+
+def _is_near_duplicate(shingles: frozenset, kept: Sequence[frozenset], threshold: float) -> bool:
+    for other in kept:
+        union = len(shingles | other)
+        if union and len(shingles & other) / union >= threshold:
+            return True
+    return False
+
+
+def _citation_header(source_id: int, source_name: str) -> str:
+    return f"--- [CITATION id={source_id}, source=\"{source_name}\"] ---\n"
+
+
+def build_context(
+    documents: Sequence[Document],
+    token_budget: int,
+    count_tokens: Optional[Callable[[str], int]] = None,
+    duplicate_threshold: float = 0.9,
+) -> BuiltContext:
+    """
+    Formats ranked documents into the citation-annotated prompt context.
+
+    Documents are taken in rank order. Near-identical chunks (word 3-gram
+    Jaccard similarity >= `duplicate_threshold`) are dropped, and a chunk
+    that would push the context past `token_budget` is skipped so smaller,
+    lower-ranked chunks can still fill the remaining room.
+    """
+    count_tokens = count_tokens or _approximate_tokens
+    parts: List[str] = []
+    citations: List[Dict[str, object]] = []
+    kept_shingles: List[frozenset] = []
+    used = duplicates = over_budget = 0
+
+    for doc in documents:
+        content = doc.page_content.strip()
+        if not content:
+            continue
+        shingles = _shingles(content)
+        if _is_near_duplicate(shingles, kept_shingles, duplicate_threshold):
+            duplicates += 1
+            continue
+
+        source_id = len(citations) + 1
+        source_name = doc.metadata.get("source", "Unknown Source")
+        block = f"{_citation_header(source_id, source_name)}{content}\n\n"
+        block_tokens = count_tokens(block)
+        if used + block_tokens > token_budget:
+            over_budget += 1
+            continue
+
+        parts.append(block)
+        citations.append({"id": source_id, "source": source_name})
+        kept_shingles.append(shingles)
+        used += block_tokens
+
+    return BuiltContext("".join(parts), citations, used, duplicates, over_budget)
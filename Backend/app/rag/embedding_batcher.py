@@ -0,0 +1,131 @@
+# --- START OF FILE app/rag/embedding_batcher.py ---
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from app.log import get_logger
+from app.metrics import counter, histogram
+
+log = get_logger(__name__)
+
+EMBED_BATCH_SIZE = histogram(
+    "rag_embed_batch_size",
+    "Query texts sent per batched embedding request.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+EMBED_REQUESTS = counter(
+    "rag_embed_requests_total",
+    "Embedding API requests made by the query micro-batcher, by result (ok, error).",
+    labelnames=("result",),
+)
+
+Vector = List[float]
+
+
+class QueryEmbeddingBatcher:
+    """
+    Coalesces query embeddings requested by concurrent callers into one
+    batched embedding call.
+
+    The first request opens a window of `max_wait_ms`; everything arriving
+    before it closes (up to `max_batch_size` texts) is embedded together and
+    each vector is handed back to its waiting caller. Batches are sent on a
+    small pool so a slow request does not hold up the next window. Identical
+    queries within a batch are embedded once.
+    """
+
+    def __init__(
+        self,
+        embed_batch: Callable[[List[str]], Sequence[Vector]],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        concurrency: int = 4,
+    ):
+        self.embed_batch = embed_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_ms / 1000.0
+        self.concurrency = concurrency
+        self._queue: "queue.Queue[Optional[Tuple[str, Future]]]" = queue.Queue()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._collector: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def embed(self, text: str) -> Vector:
+        """Blocks until the vector for `text` is ready. Re-raises the embedding error, if any."""
+        if self.max_wait_seconds <= 0:
+            # Batching disabled.
+            return self._embed_now([text])[0]
+        return self.submit(text).result()
+
+    def submit(self, text: str) -> "Future[Vector]":
+        self._ensure_started()
+        future: "Future[Vector]" = Future()
+        self._queue.put((text, future))
+        return future
+
+    def stop(self):
+        with self._lock:
+            if self._collector is None:
+                return
+            self._queue.put(None)
+            self._collector.join()
+            self._pool.shutdown(wait=True)
+            self._collector = self._pool = None
+
+    def _ensure_started(self):
+        if self._collector is not None:
+            return
+        with self._lock:
+            if self._collector is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="embed-batch")
+                self._collector = threading.Thread(target=self._collect, name="embed-batcher", daemon=True)
+                self._collector.start()
+
+    def _collect(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait_seconds
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._pool.submit(self._flush, batch)
+                    return
+                batch.append(item)
+            self._pool.submit(self._flush, batch)
+
+    def _embed_now(self, texts: List[str]) -> Sequence[Vector]:
+        EMBED_BATCH_SIZE.observe(len(texts))
+        try:
+            vectors = self.embed_batch(texts)
+        except Exception:
+            EMBED_REQUESTS.labels(result="error").inc()
+            raise
+        EMBED_REQUESTS.labels(result="ok").inc()
+        return vectors
+
+    def _flush(self, batch: List[Tuple[str, Future]]):
+        unique = list(dict.fromkeys(text for text, _future in batch))
+        try:
+            vectors = self._embed_now(unique)
+            if len(vectors) != len(unique):
+                raise ValueError(f"Expected {len(unique)} embeddings, got {len(vectors)}.")
+        except Exception as e:
+            log.warning("Batched query embedding failed", batch_size=len(unique), error=str(e))
+            for _text, future in batch:
+                future.set_exception(e)
+            return
+        by_text = dict(zip(unique, vectors))
+        for text, future in batch:
+            future.set_result(by_text[text])
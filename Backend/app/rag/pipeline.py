@@ -1,63 +1,93 @@
 # --- START OF FILE app/rag/pipeline.py (Final Version) ---
 
 import json
-from langchain_openai import ChatOpenAI
-from app.rag.retriever import get_retriever
+from typing import Any, Dict, List, Optional
+from app.rag.retriever import search_scored_documents
+from app.rag.reranker import rerank
 from app.rag.prompt_template import get_structured_prompt_template
+from app.rag.context_builder import build_context, get_token_counter
 from app.config import settings
+from app.metrics import RAG_STAGE_SECONDS
+from app.llm_clients import llm_clients
+from app.tracing import traced, timed_span, set_attributes
+from app.log import get_logger
 from langchain.prompts import PromptTemplate
 
-def get_rag_answer(query: str, lang: str = "en"):
-    # 1. Prepare retriever
-    retriever = get_retriever()
-    
-    # 2. Get the raw source documents
-    source_documents = retriever.invoke(query) 
+log = get_logger(__name__)
 
-    # 3. Format the context for the prompt, making citations very clear
-    context_with_citations = ""
-    citations_map = []
-    for i, doc in enumerate(source_documents):
-        source_id = i + 1
-        source_name = doc.metadata.get("source", "Unknown Source")
-        
-        # This format is easy for the LLM to parse
-        context_with_citations += f"--- [CITATION id={source_id}, source=\"{source_name}\"] ---\n"
-        context_with_citations += f"{doc.page_content}\n\n"
-        
-        citations_map.append({"id": source_id, "source": source_name})
+def _stage(name: str):
+    """A span plus a RAG stage latency observation."""
+    return timed_span(f"rag.{name}", RAG_STAGE_SECONDS.labels(stage=name))
 
-    # 4. Prepare the LLM with JSON Mode enabled
-    llm = ChatOpenAI(
+@traced("rag.get_rag_answer")
+def get_rag_answer(
+    query: str,
+    lang: str = "en",
+    metadata_filter: Optional[Dict[str, Any]] = None,
+    namespaces: Optional[List[Optional[str]]] = None,
+):
+    # 1-2. Embed the query and over-fetch candidate documents from the caller's
+    # namespaces, scoped by the selected agent's knowledge base if any (each stage is timed inside)
+    candidates = search_scored_documents(query, k=settings.RAG_FETCH_K, metadata_filter=metadata_filter, namespaces=namespaces)
+
+    with _stage("rerank"):
+        # Keep only the best few candidates for the prompt
+        source_documents = rerank(
+            query,
+            candidates,
+            top_n=settings.RAG_TOP_N,
+            lexical_weight=settings.RAG_RERANK_LEXICAL_WEIGHT,
+            cross_encoder_model=settings.RAG_RERANK_MODEL or None,
+        )
+        set_attributes(**{"rag.candidates": len(candidates), "rag.reranked": len(source_documents)})
+
+    with _stage("prompt_build"):
+        # 3. Format the context for the prompt within the token budget, making citations very clear
+        context = build_context(
+            source_documents,
+            token_budget=settings.RAG_CONTEXT_TOKEN_BUDGET,
+            count_tokens=get_token_counter(settings.LLM_MODEL_NAME),
+            duplicate_threshold=settings.RAG_DUPLICATE_THRESHOLD,
+        )
+        context_with_citations, citations_map = context.text, context.citations
+        set_attributes(**{
+            "rag.context_tokens": context.tokens,
+            "rag.dropped_duplicates": context.dropped_duplicates,
+            "rag.dropped_over_budget": context.dropped_over_budget,
+        })
+
+        # 4. Setup prompt using the new, more detailed template
+        template_str = get_structured_prompt_template(lang)
+        prompt = PromptTemplate(input_variables=["context", "question"], template=template_str)
+
+        # 5. Format the final prompt
+        final_prompt = prompt.format(context=context_with_citations, question=query)
+
+    # 6. Get the shared LLM client with JSON Mode enabled (built once, reuses pooled connections)
+    llm = llm_clients.chat_model(
+        "openai",
+        settings.LLM_MODEL_NAME, # e.g., "gpt-4-1106-preview" or "gpt-3.5-turbo-1106"
         temperature=0.0, # Set to 0 for more deterministic, factual JSON output
-        model_name=settings.LLM_MODEL_NAME, # e.g., "gpt-4-1106-preview" or "gpt-3.5-turbo-1106"
-        openai_api_key=settings.OPENAI_API_KEY,
         model_kwargs={"response_format": {"type": "json_object"}},
     )
 
-    # 5. Setup prompt using the new, more detailed template
-    template_str = get_structured_prompt_template(lang)
-    prompt = PromptTemplate(input_variables=["context", "question"], template=template_str)
-    
-    # 6. Format the final prompt
-    final_prompt = prompt.format(context=context_with_citations, question=query)
-
     # 7. Run the LLM directly
-    llm_response_str = llm.invoke(final_prompt).content
-    
-    try:
-        # 8. Parse the JSON string response
-        response_json = json.loads(llm_response_str)
-        print("Successfully parsed LLM JSON response.") # For debugging
-    except json.JSONDecodeError as e:
-        print(f"Error: LLM did not return valid JSON. Response was:\n{llm_response_str}\nError: {e}")
-        response_json = {
-            "type": "answer",
-            "text": "Sorry, I had trouble formatting my response. Please try rephrasing your question.",
-            "citations": [],
-            "follow_ups": []
-        }
-        
+    with _stage("llm"):
+        llm_response_str = llm.invoke(final_prompt).content
+
+    with _stage("json_parse"):
+        try:
+            # 8. Parse the JSON string response
+            response_json = json.loads(llm_response_str)
+        except json.JSONDecodeError as e:
+            log.error("LLM did not return valid JSON", error=str(e), response=llm_response_str)
+            response_json = {
+                "type": "answer",
+                "text": "Sorry, I had trouble formatting my response. Please try rephrasing your question.",
+                "citations": [],
+                "follow_ups": []
+            }
+
     # Before returning, we need to map the citation IDs the LLM used back to the full source names
     if 'citations' in response_json and isinstance(response_json['citations'], list):
         resolved_citations = []
@@ -69,7 +99,7 @@ def get_rag_answer(query: str, lang: str = "en"):
                      resolved_citations.append(match)
         response_json['citations'] = resolved_citations
 
-    print(response_json)
+    log.debug("RAG answer", sample=settings.LOG_PAYLOAD_SAMPLE_RATE, response=response_json)
 
 
-    return response_json
\ No newline at end of file
+    return response_json
@@ -0,0 +1,104 @@
+# --- START OF FILE app/rag/reranker.py ---
+
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from app.log import get_logger
+
+try:
+    from sentence_transformers import CrossEncoder
+except ImportError:
+    CrossEncoder = None
+
+log = get_logger(__name__)
+
+_WORD = re.compile(r"\w+")
+
+# Standard Okapi BM25 parameters.
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+
+
+def _terms(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def bm25_scores(query: str, texts: Sequence[str]) -> np.ndarray:
+    """
+    BM25 score of every text for the query, with term statistics taken from
+    the candidate set itself (the over-fetched chunks are the corpus).
+    """
+    query_terms = list(dict.fromkeys(_terms(query)))
+    if not texts or not query_terms:
+        return np.zeros(len(texts))
+
+    counts = [Counter(_terms(text)) for text in texts]
+    # Term frequency matrix: one row per candidate, one column per query term.
+    tf = np.array([[c.get(term, 0) for term in query_terms] for c in counts], dtype=float)
+    lengths = np.array([sum(c.values()) for c in counts], dtype=float)
+    avg_length = lengths.mean() or 1.0
+
+    n = len(texts)
+    df = (tf > 0).sum(axis=0)
+    idf = np.log(1.0 + (n - df + 0.5) / (df + 0.5))
+    norm = _BM25_K1 * (1.0 - _BM25_B + _BM25_B * lengths / avg_length)
+    return (tf * (_BM25_K1 + 1.0) / (tf + norm[:, None]) * idf).sum(axis=1)
+
+
+def _min_max(scores: np.ndarray) -> np.ndarray:
+    if scores.size == 0:
+        return scores
+    low, high = scores.min(), scores.max()
+    if math.isclose(low, high):
+        return np.ones_like(scores) if high > 0 else np.zeros_like(scores)
+    return (scores - low) / (high - low)
+
+
+@lru_cache(maxsize=2)
+def _cross_encoder(model_name: str):
+    if CrossEncoder is None:
+        log.warning("Cross-encoder reranking requested but sentence-transformers is not installed", model=model_name)
+        return None
+    log.info("Loading cross-encoder reranker", model=model_name)
+    return CrossEncoder(model_name, device="cpu")
+
+
+def rerank(
+    query: str,
+    candidates: Sequence[Tuple[Document, float]],
+    top_n: int,
+    lexical_weight: float = 0.3,
+    cross_encoder_model: Optional[str] = None,
+    batch_size: int = 32,
+) -> List[Document]:
+    """
+    Reorders over-fetched (document, vector score) candidates and keeps the
+    best `top_n`.
+
+    With `cross_encoder_model` set (and sentence-transformers installed) the
+    query/chunk pairs are scored by that CPU cross-encoder in batches.
+    Otherwise the min-max normalised vector score is fused with a BM25 score
+    computed over the candidates: `lexical_weight` * BM25 + (1 - weight) * vector.
+    """
+    if not candidates:
+        return []
+    documents = [doc for doc, _score in candidates]
+    texts = [doc.page_content for doc in documents]
+
+    model = _cross_encoder(cross_encoder_model) if cross_encoder_model else None
+    if model is not None:
+        scores = np.asarray(model.predict([(query, text) for text in texts], batch_size=batch_size), dtype=float)
+    else:
+        vector = _min_max(np.array([score for _doc, score in candidates], dtype=float))
+        lexical = _min_max(bm25_scores(query, texts))
+        scores = lexical_weight * lexical + (1.0 - lexical_weight) * vector
+
+    # Stable sort keeps the vector store's order for ties.
+    order = np.argsort(-scores, kind="stable")[:top_n]
+    return [documents[i] for i in order]
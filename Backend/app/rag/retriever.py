@@ -1,21 +1,47 @@
 # --- START OF FILE app/rag/retriever.py (Corrected) ---
 
+import contextvars
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
 from app.config import settings
+from app.metrics import RAG_STAGE_SECONDS
+from app.tracing import timed_span
+from app.log import get_logger
+from app.rag.embedding_batcher import QueryEmbeddingBatcher
+from app.rag.scope import SHARED_NAMESPACE
+from langchain_core.documents import Document
 from pinecone import Pinecone, ServerlessSpec
 from langchain_community.vectorstores import Pinecone as LangchainPinecone
 from langchain_openai import OpenAIEmbeddings
 
+log = get_logger(__name__)
+
 # Use a global variable to hold the vector_store instance (Singleton pattern)
 _vector_store = None
+# Our own handle on the same index, for index-level calls the LangChain wrapper does not expose.
+_index = None
+
+# Shared by every multi-namespace search; Pinecone queries are I/O bound.
+_fanout_pool = ThreadPoolExecutor(max_workers=settings.RAG_SEARCH_FANOUT_WORKERS, thread_name_prefix="rag-search")
+
+# Query embeddings from concurrent requests are sent to the embedding API together.
+query_embedder = QueryEmbeddingBatcher(
+    lambda texts: get_vector_store().embeddings.embed_documents(texts),
+    max_batch_size=settings.RAG_EMBED_BATCH_MAX_SIZE,
+    max_wait_ms=settings.RAG_EMBED_BATCH_WINDOW_MS,
+    concurrency=settings.RAG_EMBED_BATCH_CONCURRENCY,
+)
 
 def _initialize_vector_store():
     """
     Private function to initialize the vector store connection.
     This function will only be called once.
     """
-    global _vector_store
+    global _vector_store, _index
     
-    print("--- Initializing Pinecone Vector Store ---")
+    log.info("Initializing Pinecone vector store")
     
     pc = Pinecone(api_key=settings.PINECONE_API_KEY)
     index_name = settings.PINECONE_INDEX_NAME
@@ -26,7 +52,7 @@ def _initialize_vector_store():
     )
 
     if index_name not in pc.list_indexes().names():
-        print(f"Index '{index_name}' not found. Creating a new SERVERLESS index...")
+        log.warning("Pinecone index not found, creating a new serverless index", index=index_name)
         pc.create_index(
             name=index_name,
             dimension=settings.EMBEDDING_DIMENSION,
@@ -37,11 +63,12 @@ def _initialize_vector_store():
             )
         )
     
+    _index = pc.Index(index_name)
     _vector_store = LangchainPinecone.from_existing_index(
         index_name=index_name,
         embedding=embedding_model
     )
-    print("--- Pinecone Vector Store Initialized ---")
+    log.info("Pinecone vector store initialized", index=index_name)
 
 def get_vector_store():
     """
@@ -52,9 +79,78 @@ def get_vector_store():
         _initialize_vector_store()
     return _vector_store
 
-def get_retriever(search_k: int = 4):
+def get_index():
+    """
+    Returns the Pinecone index handle opened alongside the vector store.
+    Initializes both on the first call.
+    """
+    if _index is None:
+        _initialize_vector_store()
+    return _index
+
+def get_retriever(search_k: int = 4, metadata_filter: Optional[Dict[str, Any]] = None):
     """
-    Returns a retriever instance from the global vector store.
+    Returns a retriever instance from the global vector store, optionally
+    scoped by a metadata filter.
     """
     vs = get_vector_store()
-    return vs.as_retriever(search_kwargs={'k': search_k})
\ No newline at end of file
+    search_kwargs: Dict[str, Any] = {'k': search_k}
+    if metadata_filter is not None:
+        search_kwargs['filter'] = metadata_filter
+    return vs.as_retriever(search_kwargs=search_kwargs)
+
+def _search_namespace(vs, query_vector: List[float], k: int, metadata_filter, namespace: Optional[str]) -> List[Tuple[Document, float]]:
+    results = vs.similarity_search_by_vector_with_score(query_vector, k=k, filter=metadata_filter, namespace=namespace)
+    for doc, _score in results:
+        doc.metadata["namespace"] = namespace or ""
+    return results
+
+def _search_namespaces(vs, query_vector: List[float], k: int, metadata_filter, namespaces: Sequence[Optional[str]]) -> List[Tuple[Document, float]]:
+    """Queries every namespace in parallel and merges the per-namespace top-k by score."""
+    if len(namespaces) == 1:
+        return _search_namespace(vs, query_vector, k, metadata_filter, namespaces[0])
+    # Each task gets its own copy of the caller's context so spans stay parented.
+    futures = [
+        _fanout_pool.submit(contextvars.copy_context().run, _search_namespace, vs, query_vector, k, metadata_filter, namespace)
+        for namespace in namespaces
+    ]
+    results = [match for future in futures for match in future.result()]
+    return heapq.nlargest(k, results, key=lambda match: match[1])
+
+def search_scored_documents(
+    query: str,
+    k: int = 4,
+    metadata_filter: Optional[Dict[str, Any]] = None,
+    namespaces: Optional[Sequence[Optional[str]]] = None,
+) -> List[Tuple[Document, float]]:
+    """
+    Embeds the query and runs the vector search as two separately timed
+    stages, so embedding latency and index latency show up independently.
+    `metadata_filter` (see app.rag.scope) is applied inside the index search;
+    `namespaces` (default: the shared one) are searched in parallel.
+    Returns (document, similarity score) pairs, best first.
+    """
+    vs = get_vector_store()
+    namespaces = list(namespaces) if namespaces else [SHARED_NAMESPACE]
+    with timed_span("rag.embed", RAG_STAGE_SECONDS.labels(stage="embed")):
+        query_vector = query_embedder.embed(query)
+    with timed_span(
+        "rag.vector_search",
+        RAG_STAGE_SECONDS.labels(stage="vector_search"),
+        **{"rag.k": k, "rag.filtered": metadata_filter is not None, "rag.namespaces": len(namespaces)},
+    ):
+        return _search_namespaces(vs, query_vector, k, metadata_filter, namespaces)
+
+def search_documents(
+    query: str,
+    k: int = 4,
+    metadata_filter: Optional[Dict[str, Any]] = None,
+    namespaces: Optional[Sequence[Optional[str]]] = None,
+) -> List[Document]:
+    """Like search_scored_documents, without the scores."""
+    return [doc for doc, _score in search_scored_documents(query, k=k, metadata_filter=metadata_filter, namespaces=namespaces)]
+
+def list_namespaces() -> List[str]:
+    """Names of every non-empty namespace in the index (the default one is "")."""
+    stats = get_index().describe_index_stats()
+    return sorted(stats.namespaces.keys())
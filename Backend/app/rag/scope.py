@@ -0,0 +1,53 @@
+# --- START OF FILE app/rag/scope.py ---
+
+import os
+from urllib.parse import urldefrag
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.config import settings
+
+# Pinecone's default namespace holds the shared knowledge base (the ingestion pipeline's SOURCES).
+SHARED_NAMESPACE: Optional[str] = None
+TENANT_NAMESPACE_PREFIX = "tenant-"
+
+# Prefixes load_from_source uses to pick a connector; they are not part of the origin.
+_SOURCE_PREFIXES = ("api:", "crawl:")
+
+
+def origin_of(source: str) -> str:
+    """
+    The `origin` metadata stored on every chunk: the ingested URL as given,
+    or the bare filename for local files, matching the entries of an
+    agent's knowledge_base_urls / knowledge_base_files.
+    """
+    source = source.strip()
+    for prefix in _SOURCE_PREFIXES:
+        if source.startswith(prefix):
+            source = source[len(prefix):]
+    if source.startswith(("http://", "https://")):
+        # The fragment never reaches the server (the API connector reads its options from it).
+        return urldefrag(source)[0].rstrip("/")
+    return os.path.basename(source)
+
+
+def knowledge_base_filter(files: Iterable[str] = (), urls: Iterable[str] = ()) -> Optional[Dict[str, Any]]:
+    """
+    Vector store metadata filter restricting a search to an agent's
+    knowledge base. None (search everything) when the agent lists no sources.
+    """
+    origins = sorted({origin_of(source) for source in [*files, *urls] if source and source.strip()})
+    if not origins:
+        return None
+    return {"origin": {"$in": origins}}
+
+
+def tenant_namespace(user_id: Any) -> Optional[str]:
+    """The vector namespace holding a user's own uploads (the shared one when tenant namespaces are off)."""
+    if not settings.RAG_TENANT_NAMESPACES:
+        return SHARED_NAMESPACE
+    return f"{TENANT_NAMESPACE_PREFIX}{user_id}"
+
+
+def search_namespaces(user_id: Any) -> List[Optional[str]]:
+    """Namespaces a query on behalf of `user_id` searches: the tenant's own plus the shared knowledge base."""
+    return list(dict.fromkeys([tenant_namespace(user_id), SHARED_NAMESPACE]))
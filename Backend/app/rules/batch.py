@@ -0,0 +1,176 @@
+# --- START OF FILE app/rules/batch.py ---
+
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.rules.decision_cache import evaluate_decision
+from app.rules.simple_table import SimpleDecisionTable
+from app.metrics import counter
+
+_NATIVE_WINDOW = 1024
+
+DECISION_BATCH_ITEMS = counter(
+    "decision_batch_items_total",
+    "Contexts evaluated through the batch endpoints, by status (ok, error).",
+    labelnames=("status",),
+)
+
+
+class _InvalidLine:
+    """Stands in for an NDJSON line that could not be parsed."""
+    __slots__ = ("error",)
+
+    def __init__(self, error: str):
+        self.error = error
+
+
+def _invalid_item(index: int, context: Any) -> Optional[Dict[str, Any]]:
+    """Returns an error item for contexts that cannot be evaluated at all."""
+    if isinstance(context, _InvalidLine):
+        error = f"Invalid JSON: {context.error}"
+    elif not isinstance(context, dict):
+        error = "Context must be a JSON object."
+    else:
+        return None
+    DECISION_BATCH_ITEMS.labels(status="error").inc()
+    return {"index": index, "result": None, "error": error}
+
+
+async def _evaluate_item(decision, index: int, context: Any) -> Dict[str, Any]:
+    """Evaluates one context and turns any failure into a per-item error."""
+    invalid = _invalid_item(index, context)
+    if invalid is not None:
+        return invalid
+    try:
+        errors, output = await evaluate_decision(decision, context)
+    except Exception as e:
+        errors, output = [str(e)], None
+    if errors or output is None:
+        DECISION_BATCH_ITEMS.labels(status="error").inc()
+        return {"index": index, "result": None, "error": str(errors) if errors else "ZenEngine returned no result."}
+    DECISION_BATCH_ITEMS.labels(status="ok").inc()
+    return {"index": index, "result": output, "error": None}
+
+
+async def _evaluate_native(table: SimpleDecisionTable, first_index: int, contexts: List[Any]) -> List[Dict[str, Any]]:
+    """Evaluates a whole window with the native engine's vectorized batch path."""
+    results: List[Optional[Dict[str, Any]]] = [_invalid_item(first_index + i, context) for i, context in enumerate(contexts)]
+    valid = [i for i, item in enumerate(results) if item is None]
+    # The NumPy work is CPU-bound; keep it off the event loop.
+    outputs = await asyncio.to_thread(table.evaluate_batch, [contexts[i] for i in valid])
+    for i, output in zip(valid, outputs):
+        results[i] = {"index": first_index + i, "result": output, "error": None}
+    DECISION_BATCH_ITEMS.labels(status="ok").inc(len(valid))
+    return results
+
+
+async def _evaluate_window(decision, first_index: int, contexts: List[Any], concurrency: int) -> List[Dict[str, Any]]:
+    if isinstance(decision, SimpleDecisionTable):
+        return await _evaluate_native(decision, first_index, contexts)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(index: int, context: Any):
+        async with semaphore:
+            return await _evaluate_item(decision, index, context)
+
+    return await asyncio.gather(*(bounded(first_index + i, context) for i, context in enumerate(contexts)))
+
+
+async def evaluate_many(decision, contexts: List[Any], concurrency: int) -> List[Dict[str, Any]]:
+    """
+    Evaluates every context against one compiled decision with at most
+    `concurrency` evaluations in flight (zen), or in one vectorized pass
+    (native simple tables). Results keep the input order.
+    """
+    return await _evaluate_window(decision, 0, contexts, concurrency)
+
+
+def summarize(results: List[Dict[str, Any]], started_at: float) -> Dict[str, Any]:
+    """Counts successes/failures and reports the batch throughput."""
+    elapsed = max(time.perf_counter() - started_at, 1e-9)
+    failed = sum(1 for item in results if item["error"] is not None)
+    return {
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "duration_ms": round(elapsed * 1000, 3),
+        "throughput_per_second": round(len(results) / elapsed, 1),
+    }
+
+
+async def buffered_chunks(body: bytes) -> AsyncIterator[bytes]:
+    """Serves an already-read (and size-limited) request body to `stream_evaluations`."""
+    yield body
+
+
+async def _ndjson_contexts(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """Splits a byte stream into NDJSON lines; malformed lines become error items."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _parse_line(line)
+    if buffer.strip():
+        yield _parse_line(buffer)
+
+
+def _parse_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return _InvalidLine(str(e))
+
+
+async def stream_evaluations(
+    decision,
+    chunks: AsyncIterator[bytes],
+    concurrency: int,
+) -> AsyncIterator[str]:
+    """
+    Reads NDJSON contexts from `chunks` and yields one NDJSON result line per
+    context, in input order, followed by a summary line. Contexts are
+    evaluated in windows of `concurrency`, so only one window of contexts and
+    results is alive at a time. Memory for the input itself is up to the
+    caller: the HTTP endpoint buffers the whole body, capped by
+    DECISION_STREAM_MAX_BYTES.
+    """
+    started_at = time.perf_counter()
+    index, succeeded, failed = 0, 0, 0
+    # Native tables evaluate a window in one vectorized pass, so bigger windows pay off.
+    window_size = max(concurrency, _NATIVE_WINDOW) if isinstance(decision, SimpleDecisionTable) else concurrency
+    window: List[Any] = []
+
+    async def flush():
+        nonlocal succeeded, failed
+        results = await _evaluate_window(decision, index - len(window), window, concurrency)
+        window.clear()
+        lines = []
+        for item in results:
+            if item["error"] is None:
+                succeeded += 1
+            else:
+                failed += 1
+            lines.append(json.dumps(item, default=str) + "\n")
+        return "".join(lines)
+
+    async for context in _ndjson_contexts(chunks):
+        window.append(context)
+        index += 1
+        if len(window) >= window_size:
+            yield await flush()
+    if window:
+        yield await flush()
+
+    elapsed = max(time.perf_counter() - started_at, 1e-9)
+    summary = {
+        "summary": True,
+        "succeeded": succeeded,
+        "failed": failed,
+        "duration_ms": round(elapsed * 1000, 3),
+        "throughput_per_second": round(index / elapsed, 1),
+    }
+    yield json.dumps(summary) + "\n"
@@ -0,0 +1,100 @@
+# --- START OF FILE app/rules/decision_cache.py ---
+
+import inspect
+from typing import Any, Dict, Tuple
+
+import zen
+
+from app.cache import CompiledCache, definition_hash
+from app.config import settings
+from app.log import get_logger
+from app.metrics import counter
+from app.rules.simple_table import SimpleDecisionTable, compile_simple_table
+
+log = get_logger(__name__)
+
+DECISION_CACHE_LOOKUPS = counter(
+    "decision_cache_lookups_total",
+    "Compiled decision-table cache lookups, by result (hit, miss).",
+    labelnames=("result",),
+)
+
+# One engine is enough for every decision; it holds no per-request state.
+_engine = zen.ZenEngine()
+
+
+def wrap_definition(definition: Dict[str, Any], table_id: str) -> Dict[str, Any]:
+    """Wraps a plain decision table into a single-node zen graph if needed."""
+    if "nodes" in definition:
+        return definition
+
+    node_type = "decisionTableNode" if definition.get("kind") == "DecisionTable" else "customNode"
+
+    # Ensure decision table content has an ID
+    table_content = dict(definition)
+    if "id" not in table_content:
+        table_content["id"] = f"table_{table_id}"
+
+    return {
+        "nodes": [
+            {
+                "id": "node_main",
+                "name": table_content.get("name", "Main Decision Table"),
+                "type": node_type,
+                "content": table_content,
+            }
+        ],
+        "edges": [],
+    }
+
+
+def compile_decision(definition: Dict[str, Any], table_id: str):
+    """
+    Compiles simple flat tables with the native engine and everything else
+    (graphs, expressions, custom nodes) with zen. Both expose evaluate().
+    """
+    if settings.DECISION_NATIVE_ENGINE:
+        table = compile_simple_table(definition)
+        if table is not None:
+            return table
+    return _engine.create_decision(wrap_definition(definition, table_id))
+
+
+async def evaluate_decision(decision, context: Dict[str, Any]) -> Tuple[list, Any]:
+    """
+    Evaluates a compiled decision and returns (errors, result). Current zen
+    releases offer async_evaluate() (which lets many evaluations overlap);
+    older ones return an awaitable from evaluate().
+    """
+    async_evaluate = getattr(decision, "async_evaluate", None)
+    result = async_evaluate(context) if async_evaluate is not None else decision.evaluate(context)
+    if inspect.isawaitable(result):
+        result = await result
+
+    if isinstance(result, dict):
+        return result.get("errors", []), result.get("result")
+    return getattr(result, "errors", []), getattr(result, "result", None)
+
+
+def _compile_and_log(table_id: str, definition: Dict[str, Any]):
+    decision = compile_decision(definition, table_id)
+    log.debug(
+        "Compiled decision table",
+        table_id=table_id,
+        definition_hash=definition_hash(definition)[:12],
+        engine="native" if isinstance(decision, SimpleDecisionTable) else "zen",
+    )
+    return decision
+
+
+class CompiledDecisionCache(CompiledCache):
+    """Compiled decisions (ZenDecision or SimpleDecisionTable) per decision table; see CompiledCache."""
+
+    def __init__(self, max_size: int = 256, ttl_seconds: float = 60.0):
+        super().__init__(_compile_and_log, max_size, ttl_seconds, lookups=DECISION_CACHE_LOOKUPS)
+
+
+decision_cache = CompiledDecisionCache(
+    max_size=settings.DECISION_CACHE_SIZE,
+    ttl_seconds=settings.DECISION_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,346 @@
+# --- START OF FILE app/rules/simple_table.py ---
+
+import bisect
+import math
+import re
+from collections.abc import Hashable
+from itertools import repeat
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# NumPy is optional; without it batches are evaluated row by row.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_NUMBER = r"-?\d+(?:\.\d+)?"
+_COMPARISON = re.compile(rf"^(>=|<=|>|<|==)\s*({_NUMBER})$")
+_INTERVAL = re.compile(rf"^([\[\(\]])\s*({_NUMBER})\s*\.\.\s*({_NUMBER})\s*([\]\)\[])$")
+_QUOTED = re.compile(r'^"([^"]*)"$|^\'([^\']*)\'$')
+_OPERATOR_PREFIXES = (">", "<", "=", "!", "[", "(", "]")
+_ANY = (None, "", "-")
+
+# Below this many rows the NumPy setup costs more than it saves.
+_VECTORIZE_MIN_ROWS = 64
+
+Range = Tuple[Optional[float], bool, Optional[float], bool]  # (low, low_inclusive, high, high_inclusive)
+
+
+class UnsupportedTable(ValueError):
+    """The definition uses features the native engine does not implement."""
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _unquote(text: str) -> Optional[str]:
+    match = _QUOTED.match(text)
+    if match is None:
+        return None
+    return match.group(1) if match.group(1) is not None else match.group(2)
+
+
+def _parse_literal(text: str, numeric: bool) -> Any:
+    unquoted = _unquote(text)
+    if unquoted is not None:
+        return unquoted
+    if re.fullmatch(_NUMBER, text):
+        return float(text) if numeric or "." in text else int(text)
+    return None
+
+
+def _parse_input_cell(cell: Any, numeric: bool):
+    """
+    Returns ("any", None), ("eq", [values]) or ("range", Range) for one rule
+    cell. Raises UnsupportedTable for anything that needs zen's expression
+    language.
+    """
+    if cell in _ANY:
+        return "any", None
+    if not isinstance(cell, str):
+        if isinstance(cell, (int, float, bool)):
+            return "eq", [cell]
+        raise UnsupportedTable(f"Unsupported cell value: {cell!r}")
+
+    text = cell.strip()
+    if text in _ANY:
+        return "any", None
+
+    comparison = _COMPARISON.match(text)
+    if comparison:
+        operator, number = comparison.group(1), float(comparison.group(2))
+        if operator == "==":
+            return "eq", [number]
+        if operator in (">", ">="):
+            return "range", (number, operator == ">=", None, False)
+        return "range", (None, False, number, operator == "<=")
+
+    interval = _INTERVAL.match(text)
+    if interval:
+        opening, low, high, closing = interval.groups()
+        return "range", (float(low), opening == "[", float(high), closing == "]")
+
+    # A comma-separated list of literals ('"a", "b"' or '1, 2') matches any of them.
+    if "," in text:
+        values = [_parse_literal(part.strip(), numeric) for part in text.split(",")]
+        if all(value is not None for value in values):
+            return "eq", values
+
+    literal = _parse_literal(text, numeric)
+    if literal is not None:
+        return "eq", [literal]
+    if text.startswith(_OPERATOR_PREFIXES):
+        raise UnsupportedTable(f"Unsupported expression: {text!r}")
+    # Plain strings (e.g. "High") are equality matches, as in the API examples.
+    return "eq", [text]
+
+
+def _parse_output_cell(cell: Any) -> Any:
+    if isinstance(cell, str):
+        unquoted = _unquote(cell.strip())
+        if unquoted is not None:
+            return unquoted
+    return cell
+
+
+def _range_matches(spec: Range, value: float) -> bool:
+    low, low_inclusive, high, high_inclusive = spec
+    if low is not None and (value < low or (value == low and not low_inclusive)):
+        return False
+    if high is not None and (value > high or (value == high and not high_inclusive)):
+        return False
+    return True
+
+
+def _as_numbers(values: Sequence[Any]):
+    """Converts a column to floats; anything non-numeric (incl. bools) becomes NaN."""
+    types = set(map(type, values))
+    if types <= {int, float, type(None)}:
+        return np.asarray(values, dtype=float)  # None converts to NaN in C
+    return np.fromiter(
+        (value if _is_number(value) else np.nan for value in values), dtype=float, count=len(values)
+    )
+
+
+def _unfold(key: int, radixes: List[int]) -> List[int]:
+    """Inverse of the mixed-radix fold in evaluate_columns()."""
+    row = []
+    for radix in reversed(radixes):
+        key, code = divmod(key, radix)
+        row.append(code)
+    return row[::-1]
+
+
+def _lookup(context: Dict[str, Any], path: Sequence[str]) -> Any:
+    value: Any = context
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+class _Column:
+    """
+    One input column compiled to rule bitsets: a hash map for equality cells,
+    a wildcard mask, and sorted boundary points for range cells. Each segment
+    between (and at) consecutive boundaries has a precomputed mask, so a
+    range lookup is one bisect.
+    """
+
+    __slots__ = ("path", "wildcard", "equals", "points", "segments")
+
+    def __init__(self, path: Sequence[str]):
+        self.path = tuple(path)
+        self.wildcard = 0
+        self.equals: Dict[Any, int] = {}
+        self.points: List[float] = []
+        self.segments: List[int] = []
+
+    def build_ranges(self, ranges: List[Tuple[int, Range]]):
+        points = sorted({bound for _, spec in ranges for bound in (spec[0], spec[2]) if bound is not None})
+        if not ranges:
+            return
+        # Segment 2i is the open gap before points[i]; segment 2i + 1 is points[i] itself.
+        representatives: List[float] = []
+        for i, point in enumerate(points):
+            representatives.append(point - 1 if i == 0 else (points[i - 1] + point) / 2)
+            representatives.append(point)
+        representatives.append(points[-1] + 1 if points else 0.0)
+        self.points = points
+        self.segments = [
+            sum(1 << rule for rule, spec in ranges if _range_matches(spec, value))
+            for value in representatives
+        ]
+
+    def mask(self, value: Any) -> int:
+        bits = self.wildcard
+        try:
+            bits |= self.equals.get(value, 0)
+        except TypeError:  # Unhashable input (list/dict) never equals a literal
+            pass
+        if self.segments and _is_number(value):
+            index = bisect.bisect_left(self.points, value)
+            is_point = index < len(self.points) and self.points[index] == value
+            bits |= self.segments[2 * index + is_point]
+        return bits
+
+
+class SimpleDecisionTable:
+    """
+    Native evaluator for the flat `kind: DecisionTable` shape:
+
+        {"kind": "DecisionTable", "hitPolicy": "first",
+         "inputs": [{"name": "Urgency"}], "outputs": [{"name": "SLA"}],
+         "rules": [{"Urgency": "High", "SLA": 4}, {"Urgency": "-", "SLA": 48}]}
+
+    Cells may be literals, quoted literals, comma-separated literal lists,
+    comparisons (`>= 10`) or intervals (`[1..5)`); empty/"-" matches
+    anything. Evaluation returns the same {"result": ...} shape as a zen
+    decision so callers can use either interchangeably.
+    """
+
+    def __init__(self, definition: Dict[str, Any]):
+        if definition.get("kind") != "DecisionTable" or "nodes" in definition:
+            raise UnsupportedTable("Not a flat DecisionTable definition.")
+        inputs, outputs, rules = definition.get("inputs"), definition.get("outputs"), definition.get("rules")
+        if not isinstance(inputs, list) or not isinstance(outputs, list) or not isinstance(rules, list):
+            raise UnsupportedTable("inputs, outputs and rules must be lists.")
+
+        self.hit_policy = definition.get("hitPolicy", "first")
+        if self.hit_policy not in ("first", "collect"):
+            raise UnsupportedTable(f"Unsupported hit policy: {self.hit_policy}")
+
+        output_names = [column["name"] for column in outputs]
+        self.rule_count = len(rules)
+        self.all_rules = (1 << self.rule_count) - 1
+        self.outputs: List[Dict[str, Any]] = [
+            {name: _parse_output_cell(rule.get(name)) for name in output_names if name in rule}
+            for rule in rules
+        ]
+
+        self.columns: List[_Column] = []
+        for column_def in inputs:
+            name = column_def["name"]
+            numeric = column_def.get("type") == "number"
+            column = _Column((column_def.get("field") or name).split("."))
+            ranges: List[Tuple[int, Range]] = []
+            for rule_index, rule in enumerate(rules):
+                kind, payload = _parse_input_cell(rule.get(name), numeric)
+                bit = 1 << rule_index
+                if kind == "any":
+                    column.wildcard |= bit
+                elif kind == "eq":
+                    for value in payload:
+                        column.equals[value] = column.equals.get(value, 0) | bit
+                else:
+                    ranges.append((rule_index, payload))
+            column.build_ranges(ranges)
+            self.columns.append(column)
+
+    # --- single evaluation ---
+
+    def match(self, context: Dict[str, Any]) -> int:
+        bits = self.all_rules
+        for column in self.columns:
+            bits &= column.mask(_lookup(context, column.path))
+            if not bits:
+                break
+        return bits
+
+    def _result_for(self, bits: int) -> Any:
+        if self.hit_policy == "first":
+            if not bits:
+                return {}
+            return dict(self.outputs[(bits & -bits).bit_length() - 1])
+        return [dict(self.outputs[rule]) for rule in range(self.rule_count) if bits >> rule & 1]
+
+    def evaluate(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        return {"result": self._result_for(self.match(context))}
+
+    # --- batch evaluation ---
+
+    def evaluate_batch(self, contexts: List[Dict[str, Any]]) -> List[Any]:
+        """Evaluates many contexts; vectorized with NumPy for larger batches."""
+        if np is None or len(contexts) < _VECTORIZE_MIN_ROWS or not self.columns or not self.rule_count:
+            return [self._result_for(self.match(context)) for context in contexts]
+        columns = [
+            [context.get(column.path[0]) for context in contexts] if len(column.path) == 1
+            else [_lookup(context, column.path) for context in contexts]
+            for column in self.columns
+        ]
+        return self.evaluate_columns(columns)
+
+    def evaluate_columns(self, columns: List[Sequence[Any]]) -> List[Any]:
+        """
+        Evaluates columnar input (one sequence per input column, all the same
+        length). Each column is reduced to small integer codes with NumPy
+        (literal index, range segment via searchsorted); rows with the same
+        codes share one bitset evaluation, so the cost scales with the number
+        of distinct input combinations rather than with the row count.
+        """
+        codes = [self._column_codes(column, values) for column, values in zip(self.columns, columns)]
+        radixes = [(len(column.equals) + 1) * (len(column.segments) + 1) for column in self.columns]
+
+        if math.prod(radixes) < 2 ** 62:
+            # Fold the per-column codes into one integer per row so a 1-D unique finds the distinct combinations.
+            combined = np.zeros(len(codes[0]), dtype=np.int64)
+            for column_codes, radix in zip(codes, radixes):
+                combined = combined * radix + column_codes
+            unique_keys, inverse = np.unique(combined, return_inverse=True)
+            unique_rows = [_unfold(key, radixes) for key in unique_keys.tolist()]
+        else:
+            unique_keys, inverse = np.unique(np.stack(codes, axis=1), axis=0, return_inverse=True)
+            unique_rows = unique_keys.tolist()
+
+        literals = [list(column.equals) for column in self.columns]
+        unique_results = []
+        for row in unique_rows:
+            bits = self.all_rules
+            for column, column_literals, code in zip(self.columns, literals, row):
+                bits &= self._mask_for_code(column, column_literals, code)
+            unique_results.append(self._result_for(bits))
+        # Rows with the same inputs share one result object.
+        return [unique_results[i] for i in inverse.reshape(-1).tolist()]
+
+    @staticmethod
+    def _column_codes(column: _Column, values: Sequence[Any]):
+        """Encodes each value as literal_code * (segments + 1) + (segment + 1); -1 means no match."""
+        literal_codes = {literal: code for code, literal in enumerate(column.equals)}
+        try:
+            equal = np.fromiter(map(literal_codes.get, values, repeat(-1)), dtype=np.int64, count=len(values))
+        except TypeError:  # Unhashable input (list/dict) never equals a literal
+            equal = np.fromiter(
+                (literal_codes.get(value, -1) if isinstance(value, Hashable) else -1 for value in values),
+                dtype=np.int64,
+                count=len(values),
+            )
+
+        segment = np.full(len(values), -1, dtype=np.int64)
+        if column.segments:
+            numbers = _as_numbers(values)
+            numeric = ~np.isnan(numbers)
+            points = np.asarray(column.points, dtype=float)
+            index = np.searchsorted(points, numbers, side="left")
+            is_point = (index < len(points)) & (points[np.minimum(index, len(points) - 1)] == numbers)
+            segment = np.where(numeric, 2 * index + is_point, -1)
+        return (equal + 1) * (len(column.segments) + 1) + (segment + 1)
+
+    @staticmethod
+    def _mask_for_code(column: _Column, literals: List[Any], code: int) -> int:
+        equal, segment = divmod(code, len(column.segments) + 1)
+        bits = column.wildcard
+        if equal > 0:
+            bits |= column.equals[literals[equal - 1]]
+        if segment > 0:
+            bits |= column.segments[segment - 1]
+        return bits
+
+
+def compile_simple_table(definition: Dict[str, Any]) -> Optional[SimpleDecisionTable]:
+    """Returns a native evaluator for simple tables, or None if zen is needed."""
+    try:
+        return SimpleDecisionTable(definition)
+    except (UnsupportedTable, KeyError, TypeError):
+        return None
@@ -2,6 +2,7 @@
 
 # --- Python & FastAPI Imports ---
 import json
+import logging
 import asyncio
 from fastapi import HTTPException
 from motor.motor_asyncio import AsyncIOMotorDatabase
@@ -13,16 +14,19 @@ from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.tools import tool
 
 # --- LangChain Integration Imports ---
-from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.agents import AgentExecutor, create_openai_tools_agent
 
 # --- Local Application Imports ---
 from app.auth.schemas import RunAgentRequest
 from app.agents.tools import ToolRegistry
+from app.llm_clients import llm_clients
+from app.tracing import traced, set_attributes
+from app.log import get_logger
 # Queues are no longer needed for this synchronous flow
 # from app.state import frontend_input_queue, backend_output_queue
 
+log = get_logger(__name__)
+
 
 # ====================================================================
 # Helper Function: Deserialize frontend messages into LangChain messages
@@ -43,6 +47,7 @@ def deserialize_messages(serialized_messages: List[Dict[str, Any]]) -> List[Base
 # ====================================================================
 # Main Agent Execution: Synchronous Request/Response
 # ====================================================================
+@traced("agent.execute_dynamic_agent")
 async def execute_dynamic_agent(
     payload: RunAgentRequest,
     db: AsyncIOMotorDatabase,
@@ -52,19 +57,15 @@ async def execute_dynamic_agent(
     Runs an agent session synchronously and returns the final answer directly.
     This is designed for a standard HTTP request/response flow.
     """
-    print("--- [Agent Service] Starting synchronous agent execution ---")
+    log.info("Starting synchronous agent execution")
 
     try:
         # --- 1. Initialize Chat Model ---
         chat_model_config = payload.chat_model_config
         provider = chat_model_config.get("provider", "").lower()
         model_name = chat_model_config.get("model_name")
-        if "openai" in provider:
-            llm = ChatOpenAI(model_name=model_name, temperature=0, streaming=False)
-        elif "google" in provider:
-            llm = ChatGoogleGenerativeAI(model=model_name, temperature=0)
-        else:
-            raise ValueError(f"Unsupported LLM provider: {provider}")
+        set_attributes(**{"llm.provider": provider, "llm.model": model_name})
+        llm = llm_clients.chat_model(provider, model_name, temperature=0)
 
         # --- 2. Define a tool for asking the user ---
         # In a sync flow, we can't wait for input. The agent's job is to
@@ -76,7 +77,7 @@ async def execute_dynamic_agent(
             tool to formulate a clarifying question for the user. The user's answer
             will be provided in a subsequent request. This tool returns the question you asked.
             """
-            print(f"--- [Agent Service] Agent needs to ask user: '{question}' ---")
+            log.info("Agent needs to ask the user", question=question)
             return f"CLARIFICATION_NEEDED: {question}"
 
         # --- 3. Load DB tools and include the interactive tool ---
@@ -87,7 +88,7 @@ async def execute_dynamic_agent(
 
         tools = db_tools + [ask_user_for_input]
         tool_name_list = [t.name for t in tools]
-        print(f"--- [Agent Service] Loaded tools: {tool_name_list} ---")
+        log.debug("Loaded agent tools", tools=tool_name_list)
 
         # --- 4. Build agent prompt ---
         prompt = ChatPromptTemplate.from_messages([
@@ -107,7 +108,8 @@ async def execute_dynamic_agent(
         agent_executor = AgentExecutor(
             agent=agent,
             tools=tools,
-            verbose=True,
+            # LangChain's own chain tracing is only worth its cost at DEBUG level
+            verbose=log.is_enabled_for(logging.DEBUG),
             handle_parsing_errors=True,
         )
 
@@ -118,7 +120,7 @@ async def execute_dynamic_agent(
             raise ValueError("Input data must contain a 'message' field.")
 
         # --- 7. Invoke agent ---
-        print(f"\n--- [Agent Service] Invoking agent with input: '{input_query}' ---")
+        log.debug("Invoking agent", input=input_query)
         result = await agent_executor.ainvoke({
             "input": input_query,
             "tool_names": ", ".join(tool_name_list),
@@ -127,13 +129,11 @@ async def execute_dynamic_agent(
         final_answer = result.get("output", "Task completed.")
 
         # --- 8. Return the final answer as a string ---
-        print(f"--- [Agent Service] Agent finished with final answer: '{final_answer}' ---")
+        log.debug("Agent finished", answer=final_answer)
         return final_answer
 
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        log.exception("Agent execution failed")
         error_message = f"An error occurred during agent execution: {str(e)}"
-        print(f"--- [Agent Service] ERROR: {error_message} ---")
         # Return the error message as the response
         return error_message
\ No newline at end of file
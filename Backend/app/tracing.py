@@ -0,0 +1,202 @@
+# --- START OF FILE app/tracing.py ---
+
+import asyncio
+import contextvars
+import functools
+import os
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from app.config import settings
+from app.log import get_logger
+
+# The OpenTelemetry API is optional; without it every helper below is a no-op.
+try:
+    from opentelemetry import trace, propagate
+except ImportError:
+    trace = None
+    propagate = None
+
+# The SDK (and exporters) are only needed when an exporter is configured.
+try:
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import (
+        BatchSpanProcessor,
+        ConsoleSpanExporter,
+        SimpleSpanProcessor,
+        SpanExporter,
+        SpanExportResult,
+    )
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+except ImportError:
+    TracerProvider = None
+    SpanExporter = object
+
+log = get_logger(__name__)
+
+_TRACER_NAME = "happyplace.backend"
+_provider = None
+_memory_exporter = None
+
+
+class JsonLinesFileExporter(SpanExporter):
+    """Appends every finished span as one JSON line. Handy for tests and offline analysis."""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, spans):
+        for finished_span in spans:
+            self._file.write(finished_span.to_json(indent=None) + "\n")
+        self._file.flush()
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        self._file.close()
+
+
+def _build_exporter(name: str):
+    global _memory_exporter
+    if name == "console":
+        return ConsoleSpanExporter(), False
+    if name == "file":
+        return JsonLinesFileExporter(settings.TRACING_FILE_PATH), False
+    if name == "memory":
+        _memory_exporter = InMemorySpanExporter()
+        return _memory_exporter, True
+    if name == "otlp":
+        # Endpoint, headers and protocol follow the standard OTEL_EXPORTER_OTLP_* env vars.
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter(), False
+    raise ValueError(f"Unknown tracing exporter: {name}")
+
+
+def init_tracing(exporter: Optional[str] = None):
+    """
+    Configures the global tracer provider with the exporter named in
+    settings.TRACING_EXPORTER ("none", "otlp", "console", "file", "memory").
+    Called once on app startup; later calls are ignored.
+    """
+    global _provider
+    exporter_name = (exporter or settings.TRACING_EXPORTER).lower()
+    if _provider is not None or exporter_name == "none":
+        return _provider
+    if trace is None or TracerProvider is None:
+        log.warning("opentelemetry-sdk is not installed, tracing disabled")
+        return None
+
+    try:
+        span_exporter, synchronous = _build_exporter(exporter_name)
+    except Exception as e:
+        log.error("Could not create span exporter, tracing disabled", exporter=exporter_name, error=str(e))
+        return None
+
+    provider = TracerProvider(resource=Resource.create({"service.name": settings.TRACING_SERVICE_NAME}))
+    # Test exporters export synchronously so spans are visible as soon as they end.
+    processor = SimpleSpanProcessor(span_exporter) if synchronous else BatchSpanProcessor(span_exporter)
+    provider.add_span_processor(processor)
+    trace.set_tracer_provider(provider)
+    _provider = provider
+    log.info("Tracing enabled", exporter=exporter_name)
+    return provider
+
+
+def shutdown_tracing():
+    """Flushes pending spans. Called on app shutdown."""
+    global _provider
+    if _provider is not None:
+        _provider.shutdown()
+        _provider = None
+
+
+def get_memory_exporter():
+    """Returns the in-memory exporter when tracing was initialised with "memory"."""
+    return _memory_exporter
+
+
+@contextmanager
+def span(name: str, parent=None, **attributes: Any):
+    """
+    Starts a span as a child of the current context (or of `parent`, a context
+    returned by extract_context). Exceptions raised inside the block are
+    recorded on the span and re-raised.
+    """
+    if trace is None:
+        yield None
+        return
+    tracer = trace.get_tracer(_TRACER_NAME)
+    clean_attributes = {key: value for key, value in attributes.items() if value is not None}
+    with tracer.start_as_current_span(name, context=parent, attributes=clean_attributes) as current:
+        yield current
+
+
+@contextmanager
+def timed_span(name: str, timer, **attributes: Any):
+    """A span that also observes its duration on a histogram child (see app.metrics)."""
+    with span(name, **attributes) as current, timer.time():
+        yield current
+
+
+def traced(name: Optional[str] = None):
+    """Decorator that wraps a sync or async function in a span."""
+
+    def decorator(fn: Callable):
+        span_name = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def set_attributes(**attributes: Any):
+    """Adds attributes to the currently active span, if any."""
+    if trace is None:
+        return
+    current = trace.get_current_span()
+    for key, value in attributes.items():
+        if value is not None:
+            current.set_attribute(key, value)
+
+
+def inject_headers(headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Returns `headers` with W3C trace-context headers for the current span added."""
+    headers = dict(headers or {})
+    if propagate is not None:
+        propagate.inject(headers)
+    return headers
+
+
+def extract_context(headers):
+    """Returns the remote parent context carried by incoming request headers."""
+    if propagate is None:
+        return None
+    return propagate.extract(headers)
+
+
+def run_in_executor_with_context(loop: asyncio.AbstractEventLoop, fn: Callable, *args):
+    """
+    loop.run_in_executor() does not carry contextvars into the worker thread,
+    which would orphan every span started there. This copies the caller's
+    context (including the active span) into the thread.
+    """
+    ctx = contextvars.copy_context()
+    return loop.run_in_executor(None, functools.partial(ctx.run, fn, *args))
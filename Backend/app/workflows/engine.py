@@ -0,0 +1,374 @@
+# --- START OF FILE app/workflows/engine.py ---
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.agents.tools import call_api_tool
+from app.auth.schemas import RunAgentRequest
+from app.db import crud
+from app.metrics import histogram
+from app.rules.decision_cache import decision_cache, evaluate_decision
+from app.services import agent_service
+from app.tracing import span
+from app.log import get_logger
+
+log = get_logger(__name__)
+
+WORKFLOW_NODE_SECONDS = histogram(
+    "workflow_node_seconds",
+    "Time spent executing one workflow node, by node type and status.",
+    labelnames=("node_type", "status"),
+)
+
+# Edges drawn into these agent handles configure the agent; they are not data flow.
+CONFIG_HANDLES = ("chatModel", "memory", "tool")
+CONFIG_NODE_TYPES = ("chatModelNode", "memoryNode")
+
+
+class WorkflowDefinitionError(ValueError):
+    """The workflow definition cannot be compiled (cycle, dangling edge, unknown node type)."""
+
+
+@dataclass
+class CompiledWorkflow:
+    """
+    A workflow definition indexed for execution: node lookup, validated
+    per-node configs, flow-edge adjacency in both directions and a
+    topological order of the flow nodes.
+    """
+    nodes: Dict[str, Dict[str, Any]]
+    configs: Dict[str, Dict[str, Any]]
+    successors: Dict[str, List[str]]
+    predecessors: Dict[str, List[str]]
+    order: List[str]
+    triggers: List[str]
+
+    def node_type(self, node_id: str) -> str:
+        return self.nodes[node_id].get("type") or ""
+
+
+@dataclass
+class WorkflowContext:
+    """Everything a node executor may need besides its own inputs."""
+    db: Any
+    user_id: str
+    input_data: Dict[str, Any]
+    chat_history: List[Dict[str, Any]] = field(default_factory=list)
+
+
+@dataclass
+class WorkflowRunResult:
+    status: str
+    outputs: Dict[str, Any]
+    errors: Dict[str, str]
+    skipped: List[str]
+    node_timings_ms: Dict[str, float]
+    final_node_id: Optional[str]
+
+
+NodeConfig = Dict[str, Any]
+NodeExecutor = Callable[[NodeConfig, Dict[str, Any], WorkflowContext], Awaitable[Any]]
+
+
+def is_trigger(node_type: str) -> bool:
+    return node_type.endswith("TriggerNode")
+
+
+def _is_config_edge(edge: Dict[str, Any], nodes: Dict[str, Dict[str, Any]]) -> bool:
+    target = nodes.get(edge.get("target"))
+    return (
+        edge.get("targetHandle") in CONFIG_HANDLES
+        and target is not None
+        and target.get("type") == "aiAgentNode"
+    )
+
+
+def compile_workflow(definition: Dict[str, Any]) -> CompiledWorkflow:
+    """
+    Builds the execution index for a React Flow definition. Config edges
+    (model, memory and tools attached to an agent) and the nodes that only
+    exist to configure an agent are left out of the flow graph.
+    """
+    nodes: Dict[str, Dict[str, Any]] = {}
+    for node in definition.get("nodes", []):
+        if "id" not in node:
+            raise WorkflowDefinitionError("Every node needs an 'id'.")
+        nodes[node["id"]] = node
+
+    flow_edges, config_sources = [], set()
+    for edge in definition.get("edges", []):
+        source, target = edge.get("source"), edge.get("target")
+        if source not in nodes or target not in nodes:
+            raise WorkflowDefinitionError(f"Edge '{edge.get('id')}' points to a node that does not exist.")
+        if _is_config_edge(edge, nodes):
+            config_sources.add(source)
+        else:
+            flow_edges.append((source, target))
+
+    flow_node_ids = {source for source, _ in flow_edges} | {target for _, target in flow_edges}
+    flow_nodes = {
+        node_id: node for node_id, node in nodes.items()
+        if node.get("type") not in CONFIG_NODE_TYPES
+        and (node_id not in config_sources or node_id in flow_node_ids)
+    }
+
+    configs: Dict[str, NodeConfig] = {}
+    for node_id, node in flow_nodes.items():
+        node_type = node.get("type") or ""
+        if is_trigger(node_type):
+            configs[node_id] = {}
+        elif node_type in NODE_EXECUTORS:
+            configs[node_id] = NODE_CONFIGS[node_type](node_id, node.get("data") or {})
+        else:
+            raise WorkflowDefinitionError(f"Node '{node_id}' has unsupported type '{node_type}'.")
+
+    successors: Dict[str, List[str]] = {node_id: [] for node_id in flow_nodes}
+    predecessors: Dict[str, List[str]] = {node_id: [] for node_id in flow_nodes}
+    for source, target in flow_edges:
+        if source not in flow_nodes or target not in flow_nodes:
+            raise WorkflowDefinitionError(f"Config node connected as a flow step: '{source}' -> '{target}'.")
+        if target not in successors[source]:
+            successors[source].append(target)
+            predecessors[target].append(source)
+
+    # Kahn's algorithm; definition order breaks ties so runs are reproducible.
+    in_degree = {node_id: len(predecessors[node_id]) for node_id in flow_nodes}
+    ready = deque(node_id for node_id in flow_nodes if in_degree[node_id] == 0)
+    order: List[str] = []
+    while ready:
+        node_id = ready.popleft()
+        order.append(node_id)
+        for successor in successors[node_id]:
+            in_degree[successor] -= 1
+            if in_degree[successor] == 0:
+                ready.append(successor)
+    if len(order) != len(flow_nodes):
+        raise WorkflowDefinitionError("Workflow contains a cycle.")
+
+    triggers = [node_id for node_id in order if is_trigger(flow_nodes[node_id].get("type") or "")]
+    if not triggers:
+        triggers = [node_id for node_id in order if not predecessors[node_id]]
+    if not triggers:
+        raise WorkflowDefinitionError("Workflow has no trigger node.")
+
+    return CompiledWorkflow(flow_nodes, configs, successors, predecessors, order, triggers)
+
+
+def merge_inputs(inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """Merges upstream outputs into one context; later predecessors win on key clashes."""
+    merged: Dict[str, Any] = {}
+    for output in inputs.values():
+        if isinstance(output, dict):
+            merged.update(output)
+        elif output is not None:
+            merged["result"] = output
+    return merged
+
+
+# ====================================================================
+# Node configs (validated once at compile time) and executors
+# ====================================================================
+
+def _agent_config(node_id: str, data: Dict[str, Any]) -> NodeConfig:
+    return {
+        "chat_model_config": data.get("chatModel") or {},
+        "memory_config": data.get("memory"),
+        "tools_config": data.get("tools", []),
+    }
+
+
+def _decision_table_config(node_id: str, data: Dict[str, Any]) -> NodeConfig:
+    table_id = data.get("table_id")
+    if not table_id:
+        raise WorkflowDefinitionError(f"Decision table node '{node_id}' has no 'table_id'.")
+    return {"table_id": str(table_id)}
+
+
+def _tool_config(node_id: str, data: Dict[str, Any]) -> NodeConfig:
+    endpoint = data.get("endpoint")
+    if not endpoint:
+        raise WorkflowDefinitionError(f"Tool node '{node_id}' has no API endpoint.")
+    properties = (data.get("params_schema") or {}).get("properties") or {}
+    return {"name": data.get("name") or node_id, "endpoint": endpoint, "param_names": frozenset(properties)}
+
+
+async def _run_trigger_node(config, inputs, ctx: WorkflowContext):
+    return dict(ctx.input_data)
+
+
+async def _run_agent_node(config, inputs, ctx: WorkflowContext):
+    context = merge_inputs(inputs)
+    message = context.get("message")
+    if not message:
+        raise ValueError("Input data for AI Agent node must contain a 'message' field.")
+
+    run_agent_payload = RunAgentRequest(input_data={"message": message}, chat_history=ctx.chat_history, **config)
+    answer = await agent_service.execute_dynamic_agent(payload=run_agent_payload, db=ctx.db, user_id=ctx.user_id)
+    return {**context, "message": answer}
+
+
+async def _run_decision_table_node(config, inputs, ctx: WorkflowContext):
+    table_id = config["table_id"]
+    decision = decision_cache.get_current(table_id, ctx.user_id)
+    if decision is None:
+        table = await crud.get_decision_table_by_id(ctx.db, table_id=table_id, user_id=ctx.user_id)
+        if not table:
+            raise ValueError(f"Decision table '{table_id}' not found.")
+        decision = decision_cache.get_or_compile(table_id, ctx.user_id, table.definition)
+
+    context = merge_inputs(inputs)
+    errors, result = await evaluate_decision(decision, context)
+    if errors or result is None:
+        raise ValueError(f"Decision table '{table_id}' failed: {errors or 'no result'}")
+    return {**context, **result} if isinstance(result, dict) else {**context, "result": result}
+
+
+async def _run_tool_node(config, inputs, ctx: WorkflowContext):
+    context = merge_inputs(inputs)
+    params = {key: value for key, value in context.items() if key in config["param_names"]}
+    response = await call_api_tool(config["name"], config["endpoint"], params)
+    return {**context, "response": response}
+
+
+NODE_CONFIGS: Dict[str, Callable[[str, Dict[str, Any]], NodeConfig]] = {
+    "aiAgentNode": _agent_config,
+    "decisionTableNode": _decision_table_config,
+    "toolNode": _tool_config,
+}
+
+NODE_EXECUTORS: Dict[str, NodeExecutor] = {
+    "aiAgentNode": _run_agent_node,
+    "decisionTableNode": _run_decision_table_node,
+    "toolNode": _run_tool_node,
+}
+
+
+def _executor_for(node_type: str) -> NodeExecutor:
+    return _run_trigger_node if is_trigger(node_type) else NODE_EXECUTORS[node_type]
+
+
+# ====================================================================
+# Execution
+# ====================================================================
+
+def _reachable(plan: CompiledWorkflow, start: List[str]) -> set:
+    seen, stack = set(start), list(start)
+    while stack:
+        for successor in plan.successors[stack.pop()]:
+            if successor not in seen:
+                seen.add(successor)
+                stack.append(successor)
+    return seen
+
+
+async def _timed_run(plan: CompiledWorkflow, node_id: str, inputs: Dict[str, Any], ctx: WorkflowContext):
+    node_type = plan.node_type(node_id)
+    started_at, status = time.perf_counter(), "ok"
+    try:
+        with span("workflow.node", **{"workflow.node_id": node_id, "workflow.node_type": node_type}):
+            return await _executor_for(node_type)(plan.configs[node_id], inputs, ctx)
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        WORKFLOW_NODE_SECONDS.labels(node_type=node_type, status=status).observe(time.perf_counter() - started_at)
+
+
+async def execute(
+    plan: CompiledWorkflow,
+    ctx: WorkflowContext,
+    completed: Optional[Dict[str, Any]] = None,
+    on_node_complete: Optional[Callable[[str, Any, Optional[str], float], Awaitable[None]]] = None,
+) -> WorkflowRunResult:
+    """
+    Runs every node reachable from the triggers. A node starts as soon as all
+    of its predecessors have finished, so independent branches run
+    concurrently. A failed node skips everything downstream of it; other
+    branches keep going.
+
+    `completed` holds outputs from an earlier, interrupted run: those nodes
+    are not executed again. `on_node_complete(node_id, output, error, ms)` is
+    awaited after every executed node.
+    """
+    completed = completed or {}
+    reachable = _reachable(plan, plan.triggers)
+    waiting = {
+        node_id: sum(1 for pred in plan.predecessors[node_id] if pred in reachable)
+        for node_id in reachable
+    }
+    outputs: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    timings: Dict[str, float] = {}
+    blocked: set = set()
+    skipped: List[str] = []
+    running: Dict[asyncio.Task, str] = {}
+    started_at: Dict[str, float] = {}
+    ready = deque(node_id for node_id in plan.order if node_id in reachable and waiting[node_id] == 0)
+
+    def finish(node_id: str, ok: bool):
+        for successor in plan.successors[node_id]:
+            if not ok:
+                blocked.add(successor)
+            waiting[successor] -= 1
+            if waiting[successor] == 0:
+                ready.append(successor)
+
+    try:
+        while ready or running:
+            while ready:
+                node_id = ready.popleft()
+                if node_id in blocked:
+                    skipped.append(node_id)
+                    finish(node_id, ok=False)
+                elif node_id in completed:
+                    outputs[node_id] = completed[node_id]
+                    finish(node_id, ok=True)
+                else:
+                    inputs = {pred: outputs[pred] for pred in plan.predecessors[node_id] if pred in outputs}
+                    started_at[node_id] = time.perf_counter()
+                    running[asyncio.create_task(_timed_run(plan, node_id, inputs, ctx))] = node_id
+            if not running:
+                continue
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                node_id = running.pop(task)
+                elapsed_ms = round((time.perf_counter() - started_at[node_id]) * 1000, 3)
+                timings[node_id] = elapsed_ms
+                error = None
+                if task.exception() is not None:
+                    error = str(task.exception()) or type(task.exception()).__name__
+                    errors[node_id] = error
+                    log.warning("Workflow node failed", node_id=node_id, node_type=plan.node_type(node_id), error=error)
+                else:
+                    outputs[node_id] = task.result()
+                if on_node_complete is not None:
+                    await on_node_complete(node_id, outputs.get(node_id), error, elapsed_ms)
+                finish(node_id, ok=error is None)
+    finally:
+        for task in running:
+            task.cancel()
+
+    sinks = [node_id for node_id in plan.order if node_id in outputs and not plan.successors[node_id]]
+    return WorkflowRunResult(
+        status="failed" if errors else "completed",
+        outputs=outputs,
+        errors=errors,
+        skipped=skipped,
+        node_timings_ms=timings,
+        final_node_id=sinks[-1] if sinks else None,
+    )
+
+
+def final_result(plan: CompiledWorkflow, final_node_id: Optional[str], outputs: Dict[str, Any]):
+    """Returns (result, node_type) for the run's final node; agents report just their answer."""
+    if final_node_id is None:
+        return None, None
+    node_type = plan.node_type(final_node_id)
+    result = outputs.get(final_node_id)
+    if node_type == "aiAgentNode" and isinstance(result, dict):
+        result = result.get("message")
+    return result, node_type
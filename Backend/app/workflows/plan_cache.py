@@ -0,0 +1,56 @@
+# --- START OF FILE app/workflows/plan_cache.py ---
+
+from typing import Any, Dict, Optional
+
+from app.cache import CompiledCache, definition_hash
+from app.config import settings
+from app.db import crud
+from app.log import get_logger
+from app.metrics import counter
+from app.workflows.engine import CompiledWorkflow, compile_workflow
+
+log = get_logger(__name__)
+
+WORKFLOW_PLAN_CACHE_LOOKUPS = counter(
+    "workflow_plan_cache_lookups_total",
+    "Compiled workflow plan cache lookups, by result (hit, miss).",
+    labelnames=("result",),
+)
+
+
+def _compile_and_log(workflow_id: str, definition: Dict[str, Any]) -> CompiledWorkflow:
+    plan = compile_workflow(definition)
+    log.debug("Compiled workflow plan", workflow_id=workflow_id, definition_hash=definition_hash(definition)[:12], nodes=len(plan.order))
+    return plan
+
+
+class CompiledPlanCache(CompiledCache):
+    """
+    Compiled workflow plans per workflow; see CompiledCache. A hot execution
+    skips both the Mongo read and the graph analysis. Invalid definitions
+    raise WorkflowDefinitionError and are never cached.
+    """
+
+    def __init__(self, max_size: int = 256, ttl_seconds: float = 60.0):
+        super().__init__(_compile_and_log, max_size, ttl_seconds, lookups=WORKFLOW_PLAN_CACHE_LOOKUPS)
+
+
+workflow_plan_cache = CompiledPlanCache(
+    max_size=settings.WORKFLOW_PLAN_CACHE_SIZE,
+    ttl_seconds=settings.WORKFLOW_PLAN_CACHE_TTL_SECONDS,
+)
+
+
+async def load_plan(db, workflow_id: str, user_id: str) -> Optional[CompiledWorkflow]:
+    """
+    Returns the compiled plan for a user's workflow, reading Mongo only on a
+    cache miss. None if the workflow does not exist or has no definition;
+    WorkflowDefinitionError if it does not compile.
+    """
+    plan = workflow_plan_cache.get_current(workflow_id, user_id)
+    if plan is not None:
+        return plan
+    workflow = await crud.get_workflow_by_id(db, workflow_id=workflow_id, user_id=user_id)
+    if not workflow or not workflow.definition:
+        return None
+    return workflow_plan_cache.get_or_compile(workflow_id, user_id, workflow.definition)
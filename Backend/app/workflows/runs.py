@@ -0,0 +1,306 @@
+# --- START OF FILE app/workflows/runs.py ---
+
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from app.config import settings
+from app.db import crud
+from app.auth.models import WorkflowRunInDB
+from app.metrics import counter, gauge
+from app.tracing import span
+from app.log import get_logger
+from app.workflows.engine import WorkflowContext, WorkflowDefinitionError, execute, final_result
+from app.workflows.plan_cache import load_plan
+
+log = get_logger(__name__)
+
+WORKFLOW_RUNS = counter(
+    "workflow_runs_total",
+    "Asynchronous workflow runs finished, by status (completed, failed).",
+    labelnames=("status",),
+)
+WORKFLOW_RUNS_ACTIVE = gauge(
+    "workflow_runs_active",
+    "Workflow runs currently being executed by this process.",
+)
+WORKFLOW_RUN_QUEUE_DEPTH = gauge(
+    "workflow_run_queue_depth",
+    "Workflow runs waiting for a free worker in this process.",
+)
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class WorkflowQueueFull(Exception):
+    """Raised when the run queue is at capacity."""
+
+
+class WorkflowRunManager:
+    """
+    Executes workflow runs on a bounded pool of background workers.
+
+    Runs live in the `workflow_runs` collection. A worker takes a lease on a
+    run before executing it, heartbeats while it works and appends a
+    checkpoint after every node, so a run interrupted by a crash or restart
+    is picked up again (by any process) once its lease goes stale and only
+    re-executes the nodes that had not finished. Subscribers are woken up
+    in-process whenever a run they watch changes.
+    """
+
+    def __init__(self, workers: int = 8, queue_size: int = 1000, lease_seconds: float = 60.0):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._db = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._watchers: Dict[str, Set[asyncio.Event]] = {}
+        self._pending: Set[str] = set()  # queued here, not yet picked up by a worker
+
+    # --- Lifecycle ---
+
+    async def start(self, db):
+        """Starts the workers and the reaper that resumes orphaned runs."""
+        if self._tasks:
+            return
+        self._db = db
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        try:
+            await db["workflow_runs"].create_index([("status", 1), ("heartbeat_at", 1)])
+            await db["workflow_runs"].create_index([("user_id", 1), ("workflow_id", 1), ("created_at", -1)])
+            await db["workflow_runs"].create_index(
+                [("workflow_id", 1), ("idempotency_key", 1)],
+                unique=True,
+                partialFilterExpression={"idempotency_key": {"$type": "string"}},
+            )
+        except Exception as e:
+            log.warning("Could not create workflow_runs indexes", error=str(e))
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._reaper()))
+        log.info("Workflow run workers started", workers=self.workers, owner=self.owner)
+
+    async def stop(self):
+        """Stops the workers and hands unfinished runs back to the queue for the next process."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._db is not None:
+            released = await crud.release_workflow_runs(self._db, self.owner)
+            log.info("Workflow run workers stopped", released_runs=released)
+
+    # --- Submission and observation ---
+
+    async def submit(
+        self,
+        workflow_id: str,
+        user_id: str,
+        input_data: Dict[str, Any],
+        chat_history: Optional[List[Dict[str, Any]]] = None,
+        reject_when_full: bool = True,
+        **run_fields: Any,
+    ) -> WorkflowRunInDB:
+        """
+        Persists a queued run and hands it to a worker. Raises
+        WorkflowQueueFull under backpressure, unless `reject_when_full` is
+        False: then the run waits in Mongo until the reaper finds room.
+        """
+        if self._queue is None:
+            raise RuntimeError("WorkflowRunManager has not been started.")
+        if reject_when_full and self._queue.full():
+            raise WorkflowQueueFull()
+        run = await crud.create_workflow_run(self._db, workflow_id, user_id, input_data, chat_history, **run_fields)
+        self._enqueue(str(run.id))
+        return run
+
+    def _enqueue(self, run_id: str) -> bool:
+        if run_id in self._pending:
+            return False
+        try:
+            self._queue.put_nowait(run_id)
+        except asyncio.QueueFull:
+            # The run stays queued in Mongo; the reaper picks it up once there is room.
+            return False
+        self._pending.add(run_id)
+        WORKFLOW_RUN_QUEUE_DEPTH.set(self._queue.qsize())
+        return True
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _notify(self, run_id: str):
+        for event in self._watchers.get(run_id, ()):
+            event.set()
+
+    async def wait_for_change(self, run_id: str, timeout: float):
+        """Returns when this process updates the run, or after `timeout` (runs may move elsewhere)."""
+        event = asyncio.Event()
+        self._watchers.setdefault(run_id, set()).add(event)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            watchers = self._watchers.get(run_id)
+            if watchers is not None:
+                watchers.discard(event)
+                if not watchers:
+                    del self._watchers[run_id]
+
+    # --- Execution ---
+
+    async def _worker(self, index: int):
+        while True:
+            run_id = await self._queue.get()
+            self._pending.discard(run_id)
+            WORKFLOW_RUN_QUEUE_DEPTH.set(self._queue.qsize())
+            try:
+                await self._execute_run(run_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.exception("Workflow run crashed", run_id=run_id, worker=index)
+                try:
+                    await self._finish(run_id, "failed", {"errors": {"workflow": str(e)}})
+                except Exception:
+                    log.exception("Could not mark workflow run as failed", run_id=run_id)
+            finally:
+                self._queue.task_done()
+
+    async def _reaper(self):
+        """Periodically re-queues runs that are waiting or whose owner stopped heartbeating."""
+        while True:
+            try:
+                free_slots = self.queue_size - self._queue.qsize()
+                if free_slots > 0:
+                    run_ids = await crud.list_resumable_workflow_run_ids(self._db, self._stale_before(), free_slots)
+                    resumed = sum(1 for run_id in run_ids if self._enqueue(run_id))
+                    if resumed:
+                        log.info("Queued resumable workflow runs", runs=resumed)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("Workflow run reaper failed")
+            await asyncio.sleep(self.lease_seconds / 2)
+
+    def _stale_before(self) -> datetime:
+        return datetime.utcnow() - timedelta(seconds=self.lease_seconds)
+
+    async def _heartbeat(self, run_id: str, execution: asyncio.Task):
+        """
+        Renews the lease while `execution` runs. A failed renewal is retried on
+        the next beat; a lost lease cancels `execution`, since another worker
+        may already be running the same nodes.
+        """
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                renewed = await crud.heartbeat_workflow_run(self._db, run_id, self.owner)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("Workflow run heartbeat failed", run_id=run_id)
+                continue
+            if not renewed:
+                log.warning("Lost the lease on workflow run, stopping execution", run_id=run_id)
+                execution.cancel()
+                return
+
+    async def _execute_run(self, run_id: str):
+        run = await crud.claim_workflow_run(self._db, run_id, self.owner, self._stale_before())
+        if run is None:
+            return  # Finished, or another worker holds the lease.
+        self._notify(run_id)
+        workflow_id, user_id = str(run.workflow_id), str(run.user_id)
+
+        try:
+            plan = await load_plan(self._db, workflow_id, user_id)
+        except WorkflowDefinitionError as e:
+            await self._finish(run_id, "failed", {"errors": {"workflow": str(e)}})
+            return
+        if plan is None:
+            await self._finish(run_id, "failed", {"errors": {"workflow": "Workflow not found or has no definition."}})
+            return
+
+        completed = {checkpoint.node_id: checkpoint.output for checkpoint in run.checkpoints if checkpoint.error is None}
+        if completed:
+            log.info("Resuming workflow run", run_id=run_id, completed_nodes=len(completed), attempt=run.attempts)
+
+        async def checkpoint(node_id: str, output: Any, error: Optional[str], duration_ms: float):
+            stored = await crud.add_workflow_run_checkpoint(self._db, run_id, self.owner, {
+                "node_id": node_id,
+                "output": output,
+                "error": error,
+                "duration_ms": duration_ms,
+                "finished_at": datetime.utcnow(),
+            })
+            if not stored:
+                raise RuntimeError(f"Lost the lease on workflow run {run_id}.")
+            self._notify(run_id)
+
+        ctx = WorkflowContext(db=self._db, user_id=user_id, input_data=run.input_data, chat_history=run.chat_history)
+        with span("workflow.run", **{"workflow.id": workflow_id, "workflow.run_id": run_id}), \
+                WORKFLOW_RUNS_ACTIVE.labels().track_inprogress():
+            execution = asyncio.create_task(execute(plan, ctx, completed=completed, on_node_complete=checkpoint))
+            heartbeat = asyncio.create_task(self._heartbeat(run_id, execution))
+            try:
+                result = await execution
+            except asyncio.CancelledError:
+                if heartbeat.done() and not heartbeat.cancelled():
+                    return  # The heartbeat lost the lease; the new owner carries on.
+                raise
+            finally:
+                heartbeat.cancel()
+
+        final, final_node_type = final_result(plan, result.final_node_id, result.outputs)
+        await self._finish(run_id, result.status, {
+            "result": final,
+            "final_node_type": final_node_type,
+            "errors": result.errors,
+            "skipped": result.skipped,
+        })
+
+    async def _finish(self, run_id: str, status: str, fields: Dict[str, Any]) -> bool:
+        """Records the outcome; False (and nothing recorded) if another worker has taken over the run."""
+        if not await crud.finish_workflow_run(self._db, run_id, self.owner, {"status": status, **fields}):
+            log.warning("Lost the lease on workflow run, outcome discarded", run_id=run_id, status=status)
+            return False
+        WORKFLOW_RUNS.labels(status=status).inc()
+        log.info("Workflow run finished", run_id=run_id, status=status)
+        self._notify(run_id)
+        return True
+
+
+def run_view(run: WorkflowRunInDB) -> Dict[str, Any]:
+    """Flattens a run document into the public response shape."""
+    # A node retried after a resume has several checkpoints; the latest one counts.
+    latest = {checkpoint.node_id: checkpoint for checkpoint in run.checkpoints}
+    outputs = {node_id: c.output for node_id, c in latest.items() if c.error is None}
+    errors = {**{node_id: c.error for node_id, c in latest.items() if c.error is not None}, **run.errors}
+    return {
+        "id": str(run.id),
+        "workflow_id": str(run.workflow_id),
+        "status": run.status,
+        "result": run.result,
+        "final_node_type": run.final_node_type,
+        "outputs": outputs,
+        "errors": errors,
+        "skipped": run.skipped,
+        "node_timings_ms": {node_id: c.duration_ms for node_id, c in latest.items()},
+        "attempts": run.attempts,
+        "created_at": run.created_at,
+        "started_at": run.started_at,
+        "finished_at": run.finished_at,
+    }
+
+
+workflow_runs = WorkflowRunManager(
+    workers=settings.WORKFLOW_RUN_WORKERS,
+    queue_size=settings.WORKFLOW_RUN_QUEUE_SIZE,
+    lease_seconds=settings.WORKFLOW_RUN_LEASE_SECONDS,
+)
@@ -0,0 +1,154 @@
+# --- START OF FILE app/workflows/triggers.py ---
+
+import hashlib
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from app.cache import LRUCache
+from app.config import settings
+from app.db import crud
+from app.metrics import counter, gauge, histogram
+from app.log import get_logger
+from app.workflows.runs import workflow_runs
+
+log = get_logger(__name__)
+
+WORKFLOW_TRIGGERS = counter(
+    "workflow_triggers_total",
+    "Trigger events received, by trigger and result (accepted, duplicate, unauthorized, rejected).",
+    labelnames=("trigger", "result"),
+)
+WORKFLOW_TRIGGER_IN_FLIGHT = gauge(
+    "workflow_trigger_in_flight",
+    "Trigger events whose workflow run is being written.",
+)
+WORKFLOW_TRIGGER_PERSIST_SECONDS = histogram(
+    "workflow_trigger_persist_seconds",
+    "Time taken to store the workflow run of a trigger event.",
+)
+
+
+class TriggerQueueFull(Exception):
+    """Raised when too many trigger events are being stored at once."""
+
+
+_UNAUTHORIZED = ""  # Cached marker for a rejected (workflow, key) pair.
+
+
+class TriggerKeyCache:
+    """
+    Caches which (workflow, API key) pairs are valid and who owns the
+    workflow, so bursts of webhook traffic do not each hit Mongo. Keys are
+    stored hashed. Rejected pairs are cached briefly as well.
+    """
+
+    def __init__(self, max_size: int = 4096, ttl_seconds: float = 60.0, negative_ttl_seconds: float = 5.0):
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._entries = LRUCache(max_size, ttl_seconds)
+
+    @staticmethod
+    def _key(workflow_id: str, api_key: str) -> Tuple[str, str]:
+        return workflow_id, hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+    async def owner_of(self, db, workflow_id: str, api_key: str) -> Optional[str]:
+        """Returns the owning user ID if `api_key` unlocks the workflow, else None."""
+        key = self._key(workflow_id, api_key)
+        owner = self._entries.get(key)
+        if owner is not None:
+            return owner or None
+        workflow = await crud.get_workflow_by_api_key(db, workflow_id, api_key)
+        if workflow is None:
+            self._entries.set(key, _UNAUTHORIZED, ttl_seconds=self.negative_ttl_seconds)
+            return None
+        owner = str(workflow.user_id)
+        self._entries.set(key, owner)
+        return owner
+
+    def invalidate(self, workflow_id: str):
+        """Forgets every cached key for a workflow. Called on key rotation, update and delete."""
+        self._entries.discard_where(lambda key: key[0] == workflow_id)
+
+
+class TriggerDispatcher:
+    """
+    Turns trigger events into durable workflow runs (see
+    WorkflowRunManager). The run document is written before the trigger is
+    acknowledged, so an accepted event survives a crash; execution then
+    happens in the background.
+
+    Events carrying an idempotency key are deduplicated here for
+    `idempotency_ttl_seconds` and, across processes, by a unique index on
+    the run documents: a retry gets the original run's ID back.
+    """
+
+    def __init__(self, max_in_flight: int = 1000, idempotency_ttl_seconds: float = 86400.0):
+        self.max_in_flight = max_in_flight
+        self._seen = LRUCache(max_size=100000, ttl_seconds=idempotency_ttl_seconds)
+        self._in_flight = 0
+
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def dispatch(
+        self,
+        db,
+        workflow_id: str,
+        user_id: str,
+        trigger: str,
+        input_data: Dict[str, Any],
+        idempotency_key: Optional[str] = None,
+    ) -> Tuple[str, bool]:
+        """
+        Persists a queued run and returns (run_id, duplicate). A repeated
+        idempotency key returns the original run ID without creating
+        another run. Raises TriggerQueueFull under backpressure.
+        """
+        if idempotency_key:
+            first_run_id = self._seen.get((workflow_id, idempotency_key))
+            if first_run_id is not None:
+                WORKFLOW_TRIGGERS.labels(trigger=trigger, result="duplicate").inc()
+                return first_run_id, True
+        if self._in_flight >= self.max_in_flight:
+            WORKFLOW_TRIGGERS.labels(trigger=trigger, result="rejected").inc()
+            raise TriggerQueueFull()
+
+        run_id, duplicate = str(ObjectId()), False
+        self._in_flight += 1
+        WORKFLOW_TRIGGER_IN_FLIGHT.set(self._in_flight)
+        started = time.perf_counter()
+        try:
+            await workflow_runs.submit(
+                workflow_id,
+                user_id,
+                input_data,
+                reject_when_full=False,
+                run_id=run_id,
+                trigger=trigger,
+                idempotency_key=idempotency_key,
+            )
+        except DuplicateKeyError:
+            # Another request (possibly in another process) stored this event first.
+            existing = await crud.get_workflow_run_by_idempotency_key(db, workflow_id, idempotency_key) if idempotency_key else None
+            if existing is None:
+                raise
+            run_id, duplicate = str(existing.id), True
+        finally:
+            self._in_flight -= 1
+            WORKFLOW_TRIGGER_IN_FLIGHT.set(self._in_flight)
+            WORKFLOW_TRIGGER_PERSIST_SECONDS.observe(time.perf_counter() - started)
+
+        if idempotency_key:
+            self._seen.set((workflow_id, idempotency_key), run_id)
+        WORKFLOW_TRIGGERS.labels(trigger=trigger, result="duplicate" if duplicate else "accepted").inc()
+        return run_id, duplicate
+
+
+trigger_keys = TriggerKeyCache(ttl_seconds=settings.WORKFLOW_TRIGGER_KEY_CACHE_TTL_SECONDS)
+
+trigger_dispatcher = TriggerDispatcher(
+    max_in_flight=settings.WORKFLOW_TRIGGER_MAX_IN_FLIGHT,
+    idempotency_ttl_seconds=settings.WORKFLOW_TRIGGER_IDEMPOTENCY_TTL_SECONDS,
+)
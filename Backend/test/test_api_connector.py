@@ -0,0 +1,75 @@
+# --- START OF FILE test_api_connector.py ---
+
+import asyncio
+import json
+
+import httpx
+
+from app.data.chunker import chunk_documents
+from app.data.connectors.api_connector import APIConnector, JSONStream
+
+PRODUCTS = [{"id": i, "name": f"Course {i}", "details": {"hours": i * 2}, "category": "driving"} for i in range(1, 8)]
+
+
+async def _chunks(text: str, size: int):
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+
+def _parse(text: str, size: int, path=None):
+    async def run():
+        stream = JSONStream(_chunks(text, size))
+        return [item async for item in stream.items(path)], stream.envelope
+    return asyncio.run(run())
+
+
+def test_json_stream_yields_items_across_chunk_boundaries():
+    # Arrange
+    body = json.dumps({"meta": {"next": "abc"}, "data": PRODUCTS, "total": 123456})
+
+    # Act
+    items, envelope = _parse(body, size=7, path=("data",))
+    auto_items, _ = _parse(json.dumps(PRODUCTS), size=3)
+    single, _ = _parse('{"id": 1, "name": "Only"}', size=4)
+
+    # Assert
+    assert items == PRODUCTS
+    assert auto_items == PRODUCTS
+    assert envelope == {"meta": {"next": "abc"}, "total": 123456}  # the number is not cut at a chunk boundary
+    assert single == [{"id": 1, "name": "Only"}]
+
+
+def test_connector_follows_link_cursor_and_offset_pagination():
+    # Arrange
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url)
+        params = request.url.params
+        if request.url.path == "/linked":
+            page = int(params.get("page", 1))
+            headers = {"link": f'</linked?page={page + 1}>; rel="next"'} if page < 3 else {}
+            return httpx.Response(200, json=PRODUCTS[(page - 1) * 3:page * 3], headers=headers)
+        if request.url.path == "/cursored":
+            start = int(params.get("cursor", 0))
+            nxt = start + 4 if start + 4 < len(PRODUCTS) else None
+            return httpx.Response(200, json={"items": PRODUCTS[start:start + 4], "meta": {"next_cursor": nxt}})
+        offset, limit = int(params["_start"]), int(params["_limit"])
+        return httpx.Response(200, json=PRODUCTS[offset:offset + limit])
+
+    connector = APIConnector(concurrency=3, transport=httpx.MockTransport(handler))
+
+    # Act
+    linked = connector.load_data("https://api.example/linked#content=name&metadata=category,details.hours")
+    cursored = [doc for batch in connector.iter_batches("https://api.example/cursored#items=items&cursor=meta.next_cursor", batch_size=3) for doc in batch]
+    offset = connector.load_data("https://api.example/offset#offset=_start&limit=_limit&page_size=2")
+
+    # Assert
+    for docs in (linked, cursored, offset):
+        assert [doc["source"] for doc in docs] == [f"{docs[0]['source'].split('#')[0]}#{i}" for i in range(1, 8)]
+    assert linked[0]["content"] == "Course 1"
+    assert linked[0]["metadata"] == {"category": "driving", "details.hours": 2}
+    assert "name: Course 1" in cursored[0]["content"] and "details.hours: 2" in cursored[0]["content"]
+    assert sum(1 for url in requests if url.path == "/offset") == 4  # 2 + 2 + 2 + 1 items
+    chunk = chunk_documents(linked[:1])[0]
+    assert chunk.metadata["details.hours"] == 2 and chunk.metadata["source"] == "https://api.example/linked#1"
@@ -0,0 +1,45 @@
+# --- START OF FILE test_cache.py ---
+
+from app.cache import CompiledCache, LRUCache
+
+
+def test_lru_cache_evicts_least_recently_used_and_expires_entries():
+    # Arrange
+    cache = LRUCache(max_size=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    # Act
+    cache.get("a")  # "b" is now the least recently used
+    cache.set("c", 3)
+    kept = cache.setdefault("a", 100)
+    short_lived = LRUCache(max_size=2, ttl_seconds=60)
+    short_lived.set("expired", "", ttl_seconds=-1)
+
+    # Assert
+    assert cache.get("b") is None
+    assert kept == 1 and cache.get("c") == 3
+    assert short_lived.get("expired", "gone") == "gone" and len(short_lived) == 0
+
+
+def test_compiled_cache_is_scoped_to_the_owner_and_compiles_once_per_definition():
+    # Arrange
+    compiled = []
+
+    def compile(object_id, definition):
+        compiled.append(definition["v"])
+        return f"{object_id}:{definition['v']}"
+
+    cache = CompiledCache(compile, max_size=4, ttl_seconds=60)
+
+    # Act
+    first = cache.get_or_compile("x", "u1", {"v": 1})
+    cache.get_or_compile("x", "u1", {"v": 1})
+    edited = cache.get_or_compile("x", "u1", {"v": 2})
+
+    # Assert
+    assert (first, edited) == ("x:1", "x:2") and compiled == [1, 2]
+    assert cache.get_current("x", "u1") == "x:2"
+    assert cache.get_current("x", "u2") is None
+    cache.invalidate("x")
+    assert cache.get_current("x", "u1") is None and len(cache) == 0
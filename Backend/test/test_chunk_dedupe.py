@@ -0,0 +1,93 @@
+# --- START OF FILE test_chunk_dedupe.py ---
+
+from app.data.dedupe import ChunkDeduplicator, minhash, similarity
+from app.data.records import Chunk
+
+FOOTER = (
+    "Contact us at First Driving Centre, Al Quoz, Dubai. Call 800 342 or email info@example.ae. "
+    "Follow us on social media. Copyright 2024 all rights reserved. Privacy policy and terms of use."
+)
+
+
+def _chunk(text: str, source: str, chunk_id: int = 0, origin: str = None) -> Chunk:
+    return Chunk.standalone(text, source, chunk_id, origin)
+
+
+def test_minhash_estimates_jaccard_similarity():
+    # Act
+    same = similarity(minhash(FOOTER), minhash(FOOTER + " Home"))
+    different = similarity(minhash(FOOTER), minhash("Limousine training requires a valid light vehicle licence and two years of experience."))
+
+    # Assert
+    assert same > 0.85
+    assert different < 0.2
+
+
+def test_boilerplate_repeated_across_pages_is_kept_once(tmp_path):
+    # Arrange
+    dedupe = ChunkDeduplicator(str(tmp_path / "minhash.db"), threshold=0.8)
+    chunks = [
+        _chunk("Car driving course: 40 lessons with a certified instructor.", "car"),
+        _chunk(FOOTER, "car", 1),
+        _chunk("Taxi driving course for RTA permit holders.", "taxi"),
+        _chunk(FOOTER + " Careers", "taxi", 1),
+    ]
+
+    # Act
+    result = dedupe.deduplicate(chunks, "tenant-a")
+
+    # Assert
+    assert [c.source for c in result.kept] == ["car", "car", "taxi"]
+    assert result.dropped == 1
+
+
+def test_seen_chunks_are_remembered_across_runs_per_namespace(tmp_path):
+    # Arrange
+    path = str(tmp_path / "minhash.db")
+    first = ChunkDeduplicator(path)
+    first.remember(first.deduplicate([_chunk(FOOTER, "about")], "tenant-a"), "tenant-a")
+    first.close()
+    second = ChunkDeduplicator(path)
+
+    # Act
+    same_tenant = second.deduplicate([_chunk(FOOTER, "careers")], "tenant-a")
+    other_tenant = second.deduplicate([_chunk(FOOTER, "careers")], "tenant-b")
+
+    # Assert
+    assert same_tenant.kept == [] and same_tenant.dropped == 1
+    assert len(other_tenant.kept) == 1
+
+
+def test_copies_under_another_origin_are_kept(tmp_path):
+    # Arrange
+    dedupe = ChunkDeduplicator(str(tmp_path / "minhash.db"))
+    v1 = dedupe.deduplicate([_chunk(FOOTER, "brochure_v1.pdf (page 1)", origin="brochure_v1.pdf")], "tenant-a")
+    dedupe.remember(v1, "tenant-a")
+
+    # Act
+    v2 = dedupe.deduplicate([
+        _chunk(FOOTER, "brochure_v2.pdf (page 1)", origin="brochure_v2.pdf"),
+        _chunk(FOOTER, "brochure_v2.pdf (page 2)", 1, origin="brochure_v2.pdf"),
+    ], "tenant-a")
+
+    # Assert
+    assert [c.source for c in v2.kept] == ["brochure_v2.pdf (page 1)"]  # stored under its own origin once
+    assert v2.dropped == 1
+
+
+def test_forgotten_signatures_are_embedded_again(tmp_path):
+    # Arrange
+    dedupe = ChunkDeduplicator(str(tmp_path / "minhash.db"))
+    for namespace in ("tenant-a", "tenant-b"):
+        dedupe.remember(dedupe.deduplicate([_chunk(FOOTER, "about", origin="https://example.ae")], namespace), namespace)
+
+    # Act
+    removed = dedupe.forget("tenant-a", origin="https://example.ae")
+    tenant_a = dedupe.deduplicate([_chunk(FOOTER, "about", origin="https://example.ae")], "tenant-a")
+    tenant_b = dedupe.deduplicate([_chunk(FOOTER, "about", origin="https://example.ae")], "tenant-b")
+    reset = dedupe.reset()
+
+    # Assert
+    assert removed == 1 and len(tenant_a.kept) == 1
+    assert tenant_b.dropped == 1
+    assert reset == 1
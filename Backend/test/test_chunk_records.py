@@ -0,0 +1,33 @@
+# --- START OF FILE test_chunk_records.py ---
+
+from app.data.chunker import chunk_documents
+from app.data.records import Chunk
+
+
+def test_chunks_reference_the_document_text_by_offset():
+    # Arrange
+    content = " ".join(f"Sentence number {i} about driving lessons." for i in range(60))
+    docs = [{"source": "Knowledge_Base/course.pdf (page 1)", "content": content, "origin": "course.pdf"}]
+
+    # Act
+    chunks = chunk_documents(docs)
+
+    # Assert
+    assert len(chunks) > 1
+    assert all(chunk.source_text is content for chunk in chunks)
+    assert all(content[chunk.start:chunk.end] == chunk.text for chunk in chunks)
+    assert [chunk.chunk_id for chunk in chunks] == list(range(len(chunks)))
+    assert chunks[1].start < chunks[0].end  # the splitter's overlap is kept
+
+
+def test_chunk_becomes_a_document_only_on_request():
+    # Arrange
+    chunk = Chunk("abc hello world xyz", 4, 15, "page.html", 3, origin="https://example.com")
+
+    # Act
+    document = chunk.to_document()
+
+    # Assert
+    assert not hasattr(chunk, "__dict__")
+    assert document.page_content == "hello world"
+    assert document.metadata == {"source": "page.html", "chunk_id": 3, "origin": "https://example.com"}
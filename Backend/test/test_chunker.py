@@ -0,0 +1,50 @@
+# --- START OF FILE test_chunker.py ---
+
+from app.config import settings
+from app.data.chunker import ChunkingConfig, chunk_documents, get_splitter
+
+PAGE = (
+    "# Courses\nWe offer car and limousine courses for every level.\n\n"
+    "## Prices\n| Course | Price |\n| Car | 2000 |\n| Limousine | 3500 |\n\n"
+    "## Schedule\nLessons run every day from eight to eight."
+)
+
+
+def test_splitters_are_built_once_per_configuration():
+    # Arrange
+    config = ChunkingConfig("tokens", 100, 10, "text-embedding-3-small")
+
+    # Act / Assert
+    assert get_splitter(config) is get_splitter(ChunkingConfig("tokens", 100, 10, "text-embedding-3-small"))
+    assert get_splitter(config) is not get_splitter(ChunkingConfig("characters", 100, 10))
+
+
+def test_structure_mode_keeps_headings_and_tables_together():
+    # Arrange
+    config = ChunkingConfig("structure", 20, 0, "text-embedding-3-small")
+
+    # Act
+    chunks = chunk_documents([{"source": "courses.html", "content": PAGE}], config)
+
+    # Assert
+    texts = [chunk.text for chunk in chunks]
+    assert texts[0].startswith("# Courses")
+    table = next(text for text in texts if "| Course | Price |" in text)
+    assert "| Limousine | 3500 |" in table
+    assert any(text.startswith("## Schedule") for text in texts)
+
+
+def test_large_batches_are_chunked_in_parallel_with_the_same_result(monkeypatch):
+    # Arrange
+    docs = [{"source": f"page-{i}", "content": PAGE * 3} for i in range(6)]
+    config = ChunkingConfig("tokens", 40, 5, "text-embedding-3-small")
+    serial = chunk_documents(docs, config)
+    monkeypatch.setattr(settings, "CHUNK_PARALLEL_MIN_DOCS", 2)
+    monkeypatch.setattr(settings, "CHUNK_WORKERS", 2)
+
+    # Act
+    parallel = chunk_documents(docs, config)
+
+    # Assert
+    assert [(c.source, c.start, c.end) for c in parallel] == [(c.source, c.start, c.end) for c in serial]
+    assert parallel[0].source_text is docs[0]["content"]
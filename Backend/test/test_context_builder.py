@@ -0,0 +1,30 @@
+# --- START OF FILE test_context_builder.py ---
+
+from langchain_core.documents import Document
+
+from app.rag.context_builder import build_context
+
+
+def _words(text: str) -> int:
+    return len(text.split())
+
+
+def test_context_drops_near_duplicates_and_respects_the_budget():
+    # Arrange: ranked best first
+    documents = [
+        Document(page_content="Check-in starts at 3pm and check-out is at 11am.", metadata={"source": "faq.md"}),
+        Document(page_content="Check-in starts at 3pm and check-out is at 11am!", metadata={"source": "faq-copy.md"}),
+        Document(page_content=" ".join(["long"] * 50), metadata={"source": "terms.pdf"}),
+        Document(page_content="Pets are welcome in garden rooms.", metadata={"source": "pets.md"}),
+    ]
+
+    # Act
+    context = build_context(documents, token_budget=30, count_tokens=_words)
+
+    # Assert
+    assert [c["source"] for c in context.citations] == ["faq.md", "pets.md"]
+    assert [c["id"] for c in context.citations] == [1, 2]
+    assert context.dropped_duplicates == 1
+    assert context.dropped_over_budget == 1
+    assert context.tokens == _words(context.text) <= 30
+    assert context.text.startswith('--- [CITATION id=1, source="faq.md"] ---\n')
@@ -0,0 +1,100 @@
+# --- START OF FILE test_crawler.py ---
+
+import asyncio
+import functools
+
+import httpx
+
+from app.data import loader
+from app.data.connectors import crawler_connector
+from app.data.connectors.crawler_connector import CrawlScope, CrawlerConnector
+
+BODY = " ".join(["Our instructors teach safe and confident driving in every lesson."] * 12)
+
+
+def _page(title: str, links=()):
+    anchors = "".join(f'<a href="{href}">{href}</a>' for href in links)
+    return f"<html><head><title>{title}</title></head><body><nav>{anchors}</nav><article><h1>{title}</h1><p>{title}. {BODY}</p></article></body></html>"
+
+
+class FakeSite:
+    """Serves a tiny site with robots.txt and ETags, and records the requests made."""
+
+    def __init__(self):
+        self.requests = []
+        self.pages = {
+            "/en/": _page("Home", ["/en/courses", "/en/private", "/ar/home", "https://other.example/en/x"]),
+            "/en/courses": _page("Courses", ["/en/"]),
+            "/en/private": _page("Private"),
+            "/en/faq,refunds": _page("Refunds"),
+        }
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.requests.append((path, request.headers.get("if-none-match")))
+        if path == "/robots.txt":
+            return httpx.Response(200, text="User-agent: *\nDisallow: /en/private\n")
+        if path not in self.pages:
+            return httpx.Response(404)
+        etag = f'"{path}-v1"'
+        if request.headers.get("if-none-match") == etag:
+            return httpx.Response(304, headers={"etag": etag})
+        return httpx.Response(200, text=self.pages[path], headers={"content-type": "text/html; charset=utf-8", "etag": etag})
+
+
+def test_scope_follows_seed_host_and_path_only():
+    # Arrange
+    scope = CrawlScope.for_seeds(["https://site.example/en/about-us"], exclude=(r"\.pdf$",))
+
+    # Act / Assert
+    assert scope.allows("https://site.example/en/courses")
+    assert not scope.allows("https://site.example/ar/courses")
+    assert not scope.allows("https://other.example/en/courses")
+    assert not scope.allows("https://site.example/en/brochure.pdf")
+
+
+def test_crawl_respects_robots_and_revalidates_with_etags(tmp_path):
+    # Arrange
+    site = FakeSite()
+    crawler = CrawlerConnector(max_depth=2, host_delay=0, cache_dir=str(tmp_path), transport=httpx.MockTransport(site))
+
+    # Act
+    first = asyncio.run(crawler.crawl(["https://site.example/en/"]))
+    site.requests.clear()
+    second = crawler.load_data("https://site.example/en/")
+
+    # Assert
+    assert sorted(doc["source"] for doc in first) == ["https://site.example/en/", "https://site.example/en/courses"]
+    assert all(doc["origin"] == "https://site.example/en" for doc in first)
+    assert ("/en/private", None) not in site.requests
+    page_requests = [request for request in site.requests if request[0] != "/robots.txt"]
+    assert page_requests and all(etag is not None for _path, etag in page_requests)  # every page revalidated
+    assert sorted(doc["source"] for doc in second) == sorted(doc["source"] for doc in first)
+
+
+def test_single_page_is_extracted_without_the_process_pool(tmp_path, monkeypatch):
+    # Arrange
+    def no_pool():
+        raise AssertionError("the extraction pool must not be started for one page")
+
+    monkeypatch.setattr(crawler_connector, "_get_pool", no_pool)
+    crawler = CrawlerConnector(max_depth=0, max_pages=1, host_delay=0, cache_dir=str(tmp_path), transport=httpx.MockTransport(FakeSite()))
+
+    # Act
+    documents = crawler.load_data("https://site.example/en/courses")
+
+    # Assert
+    assert [doc["source"] for doc in documents] == ["https://site.example/en/courses"]
+    assert "Courses" in documents[0]["content"]
+
+
+def test_load_multiple_urls_keeps_commas_inside_urls(tmp_path, monkeypatch):
+    # Arrange
+    connector = functools.partial(CrawlerConnector, host_delay=0, cache_dir=str(tmp_path), transport=httpx.MockTransport(FakeSite()))
+    monkeypatch.setattr(loader, "CrawlerConnector", connector)
+
+    # Act
+    documents = loader.load_multiple_urls(["https://site.example/en/faq,refunds", "https://site.example/en/courses"])
+
+    # Assert
+    assert sorted(doc["url"] for doc in documents) == ["https://site.example/en/courses", "https://site.example/en/faq,refunds"]
@@ -0,0 +1,129 @@
+# --- START OF FILE test_decision_batch.py ---
+
+import asyncio
+import json
+
+from app.rules.batch import evaluate_many, stream_evaluations
+from app.rules.decision_cache import CompiledDecisionCache
+
+ROUTING_TABLE = {
+    "nodes": [
+        {"id": "in", "type": "inputNode", "name": "Request"},
+        {
+            "id": "table",
+            "type": "decisionTableNode",
+            "name": "Router",
+            "content": {
+                "hitPolicy": "first",
+                "inputs": [{"id": "urgency", "name": "Urgency", "field": "Urgency"}],
+                "outputs": [{"id": "handler", "name": "Handler", "field": "Handler"}],
+                "rules": [{"_id": "r1", "urgency": '"High"', "handler": '"Level 2 Tech"'}],
+            },
+        },
+        {"id": "out", "type": "outputNode", "name": "Response"},
+    ],
+    "edges": [
+        {"id": "e1", "sourceId": "in", "targetId": "table"},
+        {"id": "e2", "sourceId": "table", "targetId": "out"},
+    ],
+}
+
+
+async def _chunks(payload: bytes, size: int):
+    for start in range(0, len(payload), size):
+        yield payload[start:start + size]
+
+
+def test_batch_keeps_order_and_per_item_errors():
+    # Arrange
+    decision = CompiledDecisionCache().get_or_compile("t1", "u1", ROUTING_TABLE)
+    contexts = [{"Urgency": "High"}, "not an object", {"Urgency": "High"}]
+
+    # Act
+    results = asyncio.run(evaluate_many(decision, contexts, concurrency=2))
+
+    # Assert
+    assert [item["index"] for item in results] == [0, 1, 2]
+    assert results[0]["result"] == {"Handler": "Level 2 Tech"}
+    assert results[1]["error"] == "Context must be a JSON object."
+    assert results[2]["error"] is None
+
+
+def test_ndjson_stream_splits_lines_across_chunks():
+    # Arrange
+    decision = CompiledDecisionCache().get_or_compile("t1", "u1", ROUTING_TABLE)
+    body = b'{"Urgency": "High"}\n{broken\n\n{"Urgency": "High"}'
+
+    async def collect():
+        return [line async for line in stream_evaluations(decision, _chunks(body, 7), concurrency=2)]
+
+    # Act
+    lines = [json.loads(line) for chunk in asyncio.run(collect()) for line in chunk.splitlines()]
+
+    # Assert
+    items, summary = lines[:-1], lines[-1]
+    assert [item["index"] for item in items] == [0, 1, 2]
+    assert items[1]["error"].startswith("Invalid JSON")
+    assert summary["succeeded"] == 2 and summary["failed"] == 1
+
+
+def _stream_app(monkeypatch):
+    from fastapi import FastAPI
+
+    from app.api import rules_routes
+    from app.auth.dependencies import get_current_user
+    from app.auth.schemas import UserPublic
+    from app.db.database import get_database
+
+    cache = CompiledDecisionCache()
+    cache.get_or_compile("t1", "u1", ROUTING_TABLE)
+    monkeypatch.setattr(rules_routes, "decision_cache", cache)
+    app = FastAPI()
+    app.include_router(rules_routes.router)
+    app.dependency_overrides[get_current_user] = lambda: UserPublic(id="u1", email="owner@example.com")
+    app.dependency_overrides[get_database] = lambda: None
+    return app
+
+
+def test_stream_endpoint_evaluates_the_posted_ndjson_body(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    # Arrange
+    app = _stream_app(monkeypatch)
+
+    # Act
+    with TestClient(app) as client:
+        response = client.post("/rules/evaluate_batch/t1/stream", content=b'{"Urgency": "High"}\n{"Urgency": "Low"}\n')
+
+    # Assert
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert response.status_code == 200
+    assert [item["index"] for item in lines[:-1]] == [0, 1]
+    assert lines[0]["result"] == {"Handler": "Level 2 Tech"}
+    assert lines[-1]["summary"] is True and lines[-1]["succeeded"] == 2
+
+
+def test_stream_endpoint_rejects_bodies_over_the_byte_cap(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from app.config import settings
+
+    # Arrange
+    app = _stream_app(monkeypatch)
+    monkeypatch.setattr(settings, "DECISION_STREAM_MAX_BYTES", 64)
+    line = b'{"Urgency": "High"}\n'
+
+    def chunked_body():  # no Content-Length: the cap is enforced while reading
+        for _ in range(10):
+            yield line
+
+    # Act
+    with TestClient(app) as client:
+        declared = client.post("/rules/evaluate_batch/t1/stream", content=line * 10)
+        chunked = client.post("/rules/evaluate_batch/t1/stream", content=chunked_body())
+        small = client.post("/rules/evaluate_batch/t1/stream", content=line * 2)
+
+    # Assert
+    assert declared.status_code == 413
+    assert chunked.status_code == 413
+    assert small.status_code == 200
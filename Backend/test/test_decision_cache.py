@@ -0,0 +1,66 @@
+# --- START OF FILE test_decision_cache.py ---
+
+import asyncio
+
+from app.rules.decision_cache import CompiledDecisionCache, evaluate_decision
+
+
+def _routing_table(handler: str) -> dict:
+    return {
+        "nodes": [
+            {"id": "in", "type": "inputNode", "name": "Request"},
+            {
+                "id": "table",
+                "type": "decisionTableNode",
+                "name": "Router",
+                "content": {
+                    "hitPolicy": "first",
+                    "inputs": [{"id": "urgency", "name": "Urgency", "field": "Urgency"}],
+                    "outputs": [{"id": "handler", "name": "Handler", "field": "Handler"}],
+                    "rules": [{"_id": "r1", "urgency": '"High"', "handler": f'"{handler}"'}],
+                },
+            },
+            {"id": "out", "type": "outputNode", "name": "Response"},
+        ],
+        "edges": [
+            {"id": "e1", "sourceId": "in", "targetId": "table"},
+            {"id": "e2", "sourceId": "table", "targetId": "out"},
+        ],
+    }
+
+
+def test_compiled_decisions_are_reused_until_invalidated():
+    # Arrange
+    cache = CompiledDecisionCache(max_size=2, ttl_seconds=60)
+    definition = _routing_table("Level 2 Tech")
+
+    # Act
+    first = cache.get_or_compile("t1", "u1", definition)
+    second = cache.get_or_compile("t1", "u1", dict(definition))
+    errors, result = asyncio.run(evaluate_decision(first, {"Urgency": "High"}))
+
+    # Assert
+    assert first is second
+    assert cache.get_current("t1", "u1") is first
+    assert cache.get_current("t1", "someone-else") is None
+    assert errors == [] and result == {"Handler": "Level 2 Tech"}
+
+    cache.invalidate("t1")
+    assert cache.get_current("t1", "u1") is None
+    assert len(cache) == 0
+
+
+def test_cache_evicts_least_recently_used_table():
+    # Arrange
+    cache = CompiledDecisionCache(max_size=2, ttl_seconds=60)
+    cache.get_or_compile("t1", "u1", _routing_table("A"))
+    cache.get_or_compile("t2", "u1", _routing_table("B"))
+
+    # Act
+    cache.get_current("t1", "u1")  # t1 is now the most recently used
+    cache.get_or_compile("t3", "u1", _routing_table("C"))
+
+    # Assert
+    assert len(cache) == 2
+    assert cache.get_current("t2", "u1") is None
+    assert cache.get_current("t1", "u1") is not None
@@ -0,0 +1,68 @@
+# --- START OF FILE test_embedding_batcher.py ---
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.rag.embedding_batcher import QueryEmbeddingBatcher
+
+
+class RecordingEmbedder:
+    def __init__(self, fail: bool = False):
+        self.batches = []
+        self.fail = fail
+        self._lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self._lock:
+            self.batches.append(list(texts))
+        if self.fail:
+            raise RuntimeError("rate limited")
+        return [[float(len(text))] for text in texts]
+
+
+def test_concurrent_queries_share_one_embedding_request():
+    # Arrange
+    embedder = RecordingEmbedder()
+    batcher = QueryEmbeddingBatcher(embedder, max_wait_ms=200)
+    queries = ["a", "bb", "ccc", "bb", "dddd"]
+
+    # Act
+    with ThreadPoolExecutor(max_workers=len(queries)) as pool:
+        vectors = list(pool.map(batcher.embed, queries))
+    batcher.stop()
+
+    # Assert
+    assert vectors == [[1.0], [2.0], [3.0], [2.0], [4.0]]
+    assert len(embedder.batches) == 1
+    assert sorted(embedder.batches[0]) == ["a", "bb", "ccc", "dddd"]
+
+
+def test_batches_are_capped_at_max_batch_size():
+    # Arrange
+    embedder = RecordingEmbedder()
+    batcher = QueryEmbeddingBatcher(embedder, max_batch_size=2, max_wait_ms=200)
+
+    # Act
+    futures = [batcher.submit(text) for text in ["a", "b", "c"]]
+    results = [future.result(timeout=5) for future in futures]
+    batcher.stop()
+
+    # Assert
+    assert results == [[1.0], [1.0], [1.0]]
+    assert [len(batch) for batch in embedder.batches] == [2, 1]
+
+
+def test_embedding_errors_reach_every_waiting_caller():
+    # Arrange
+    batcher = QueryEmbeddingBatcher(RecordingEmbedder(fail=True), max_wait_ms=50)
+
+    # Act
+    futures = [batcher.submit(text) for text in ["a", "b"]]
+
+    # Assert
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=5)
+    batcher.stop()
@@ -0,0 +1,63 @@
+# --- START OF FILE test_llm_clients.py ---
+
+import copy
+
+import pytest
+
+from app.config import settings
+from app.llm_clients import LLMClientRegistry
+
+
+@pytest.fixture(autouse=True)
+def openai_key(monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-test")
+
+
+def test_same_model_and_params_share_one_client():
+    # Arrange
+    registry = LLMClientRegistry()
+
+    # Act
+    first = registry.chat_model("openai", "gpt-4o-mini", temperature=0, model_kwargs={"response_format": {"type": "json_object"}})
+    second = registry.chat_model("OpenAI", "gpt-4o-mini", model_kwargs={"response_format": {"type": "json_object"}}, temperature=0)
+    other = registry.chat_model("openai", "gpt-4o-mini", temperature=0.7)
+
+    # Assert
+    assert first is second
+    assert other is not first
+    assert len(registry) == 2
+
+
+def test_clients_share_the_pooled_http_transport():
+    # Arrange
+    registry = LLMClientRegistry()
+
+    # Act
+    a = registry.chat_model("openai", "gpt-4o-mini", temperature=0)
+    b = registry.chat_model("openai", "gpt-4o", temperature=0)
+
+    # Assert
+    assert a.root_client._client is registry.http_client()
+    assert b.root_client._client is registry.http_client()
+    assert a.root_async_client._client is registry.async_http_client()
+
+
+def test_autogen_config_keeps_the_shared_transport_when_copied():
+    # Arrange
+    registry = LLMClientRegistry()
+
+    # Act
+    config = copy.deepcopy(registry.autogen_llm_config("gpt-4o", tools=[]))
+
+    # Assert
+    assert config["tools"] == []
+    assert config["config_list"][0]["http_client"] is registry.http_client()
+
+
+def test_unsupported_provider_is_rejected():
+    # Arrange
+    registry = LLMClientRegistry()
+
+    # Act / Assert
+    with pytest.raises(ValueError):
+        registry.chat_model("acme", "model-1")
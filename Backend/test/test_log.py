@@ -0,0 +1,49 @@
+# --- START OF FILE test_log.py ---
+
+import logging
+
+from app.log import _StructuredFormatter, get_logger
+
+
+class _CapturingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def test_disabled_levels_never_evaluate_lazy_fields():
+    # Arrange
+    stdlib_logger = logging.getLogger("app.test_log.lazy")
+    stdlib_logger.setLevel(logging.INFO)
+    handler = _CapturingHandler()
+    stdlib_logger.addHandler(handler)
+    log = get_logger("app.test_log.lazy")
+    calls = []
+
+    # Act
+    log.debug("Expensive payload", payload=lambda: calls.append("debug"))
+    log.info("Cheap event", payload=lambda: calls.append("info"), sample=0.0)
+    log.info("Kept event", count=3)
+
+    # Assert
+    assert calls == []  # Neither the disabled nor the sampled-out record was built
+    assert [record.getMessage() for record in handler.records] == ["Kept event"]
+    assert handler.records[0].fields == {"count": 3}
+
+
+def test_formatter_renders_json_and_truncates_fields():
+    # Arrange
+    formatter = _StructuredFormatter(fmt_type="json", max_field_chars=10)
+    record = logging.LogRecord("app.x", logging.INFO, __file__, 1, "Answered", None, None)
+    record.fields = {"answer": lambda: "a" * 50, "count": 2}
+
+    # Act
+    line = formatter.format(record)
+
+    # Assert
+    assert '"event": "Answered"' in line
+    assert '"count": 2' in line
+    assert "aaaaaaaaaa... <40 more chars>" in line
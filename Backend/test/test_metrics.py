@@ -0,0 +1,99 @@
+# --- START OF FILE test_metrics.py ---
+
+import uuid
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+from app.metrics import (
+    LLM_COST_USD,
+    LLM_REQUEST_SECONDS,
+    LLM_TOKENS,
+    Counter,
+    Gauge,
+    Histogram,
+    LLMUsageCallback,
+    MetricsRegistry,
+    _Metric,
+    record_llm_usage,
+)
+
+
+def test_render_prometheus_text_format_with_escaped_labels():
+    # Arrange
+    registry = MetricsRegistry()
+    requests = registry.register(Counter("requests_total", "Requests served.", labelnames=("route",)))
+    sessions = registry.register(Gauge("sessions_active", "Open sessions."))
+    latency = registry.register(Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0)))
+    requests.labels(route='/a "quoted"\\path\nnext').inc(2)
+    sessions.set(3)
+    latency.observe(0.5)
+
+    # Act
+    text = registry.render_prometheus()
+
+    # Assert
+    assert text.endswith("\n")
+    assert text.splitlines() == [
+        "# HELP requests_total Requests served.",
+        "# TYPE requests_total counter",
+        'requests_total{route="/a \\"quoted\\"\\\\path\\nnext"} 2',
+        "# HELP sessions_active Open sessions.",
+        "# TYPE sessions_active gauge",
+        "sessions_active 3",
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 0',
+        'latency_seconds_bucket{le="1"} 1',
+        'latency_seconds_bucket{le="+Inf"} 1',
+        "latency_seconds_sum 0.5",
+        "latency_seconds_count 1",
+    ]
+
+
+def test_metric_families_need_a_child_factory():
+    # Act / Assert
+    with pytest.raises(TypeError):
+        _Metric("untyped_total", "No child factory.")
+
+
+def test_llm_cost_uses_the_longest_matching_price_prefix():
+    # Arrange
+    mini, full = f"gpt-4o-mini-{uuid.uuid4().hex}", f"gpt-4o-{uuid.uuid4().hex}"
+
+    # Act
+    record_llm_usage(mini, prompt_tokens=1_000_000, completion_tokens=500_000)
+    record_llm_usage(full, prompt_tokens=1_000, completion_tokens=1_000)
+    record_llm_usage("", prompt_tokens=10, completion_tokens=0)
+
+    # Assert
+    assert LLM_COST_USD.labels(model=mini).get() == pytest.approx(0.15 + 0.30)
+    assert LLM_COST_USD.labels(model=full).get() == pytest.approx((1_000 * 2.50 + 1_000 * 10.00) / 1_000_000)
+    assert LLM_TOKENS.labels(model=mini, kind="completion").get() == 500_000
+    assert LLM_TOKENS.labels(model="unknown", kind="prompt").get() >= 10
+
+
+def test_callback_reads_token_usage_from_llm_output_or_message_metadata():
+    # Arrange
+    callback = LLMUsageCallback()
+    openai_model, gemini_model = f"gpt-4o-{uuid.uuid4().hex}", f"gemini-1.5-flash-{uuid.uuid4().hex}"
+    first, second = uuid.uuid4(), uuid.uuid4()
+    message = AIMessage(content="hi", usage_metadata={"input_tokens": 7, "output_tokens": 3, "total_tokens": 10})
+
+    # Act
+    callback.on_chat_model_start({}, [], run_id=first, invocation_params={"model_name": openai_model})
+    callback.on_llm_end(
+        LLMResult(generations=[[]], llm_output={"token_usage": {"prompt_tokens": 12, "completion_tokens": 4}}),
+        run_id=first,
+    )
+    callback.on_llm_start({}, ["hi"], run_id=second, invocation_params={"model": gemini_model})
+    callback.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]], llm_output=None), run_id=second)
+
+    # Assert
+    assert LLM_TOKENS.labels(model=openai_model, kind="prompt").get() == 12
+    assert LLM_TOKENS.labels(model=openai_model, kind="completion").get() == 4
+    assert LLM_TOKENS.labels(model=gemini_model, kind="prompt").get() == 7
+    assert LLM_TOKENS.labels(model=gemini_model, kind="completion").get() == 3
+    assert LLM_REQUEST_SECONDS.labels(model=gemini_model).cumulative_buckets()[2] == 1
+    assert not callback._started
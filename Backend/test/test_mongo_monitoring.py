@@ -0,0 +1,68 @@
+# --- START OF FILE test_mongo_monitoring.py ---
+
+import asyncio
+from datetime import timedelta
+
+from pymongo.monitoring import CommandFailedEvent, CommandStartedEvent, CommandSucceededEvent
+
+from app.api.metrics_routes import get_mongo_metrics
+from app.db.monitoring import MONGO_COMMAND_SECONDS, CommandLatencyListener
+from app.metrics import Histogram
+
+ADDRESS = ("localhost", 27017)
+
+
+def _command(listener, request_id, command, millis, failed=False):
+    name = next(iter(command))
+    listener.started(CommandStartedEvent(command, "happyplace", request_id, ADDRESS, request_id))
+    if failed:
+        listener.failed(CommandFailedEvent(timedelta(milliseconds=millis), {"ok": 0}, name, request_id, ADDRESS, request_id))
+    else:
+        listener.succeeded(CommandSucceededEvent(timedelta(milliseconds=millis), {"ok": 1}, name, request_id, ADDRESS, request_id))
+
+
+def _series(collection, command, status="ok"):
+    for series in MONGO_COMMAND_SECONDS.snapshot():
+        if series["labels"] == {"collection": collection, "command": command, "status": status}:
+            return series
+    return None
+
+
+def test_histogram_buckets_are_cumulative():
+    # Arrange
+    latency = Histogram("test_latency_seconds", "Test.", buckets=(0.01, 0.1, 1.0))
+
+    # Act
+    for value in (0.005, 0.01, 0.05, 0.5, 3.0):
+        latency.observe(value)
+
+    # Assert
+    buckets, total, count = latency.labels().cumulative_buckets()
+    assert buckets == [(0.01, 2), (0.1, 3), (1.0, 4), (float("inf"), 5)]
+    assert count == 5 and abs(total - 3.565) < 1e-9
+
+
+def test_command_listener_records_latency_per_collection_and_command():
+    # Arrange
+    listener = CommandLatencyListener()
+
+    # Act
+    _command(listener, 1, {"find": "monitoring_users", "filter": {}}, millis=2)
+    _command(listener, 2, {"find": "monitoring_users", "filter": {}}, millis=40)
+    _command(listener, 3, {"getMore": 12345, "collection": "monitoring_users"}, millis=3)
+    _command(listener, 4, {"insert": "monitoring_users", "documents": []}, millis=700, failed=True)
+    _command(listener, 5, {"ping": 1}, millis=1)
+    metrics = asyncio.run(get_mongo_metrics())
+
+    # Assert
+    find = _series("monitoring_users", "find")
+    assert find["count"] == 2
+    assert find["buckets"]["0.0025"] == 1 and find["buckets"]["0.05"] == 2
+    get_more = _series("monitoring_users", "getMore")
+    assert get_more["count"] == 1  # attributed to the cursor's collection, not the cursor id
+    assert _series("monitoring_users", "insert", status="error")["buckets"]["1"] == 1
+    assert _series("-", "ping")["count"] >= 1
+    assert not listener._pending
+    assert find in metrics["commands"]
+    assert set(metrics) == {"commands", "pool_checkout_wait", "pool"}
+    assert set(metrics["pool"]) == {"open_connections", "checked_out"}
@@ -0,0 +1,47 @@
+# --- START OF FILE test_query_log.py ---
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.auth.dependencies import get_admin_user
+from app.auth.schemas import UserPublic
+from app.config import settings
+from app.db import logger
+
+
+def test_log_query_is_batched_and_queryable(tmp_path, monkeypatch):
+    # Arrange
+    monkeypatch.setattr(settings, "LOG_DB_PATH", str(tmp_path / "queries.db"))
+    logger.init_log_db()
+
+    # Act
+    for i in range(25):
+        logger.log_query(f"question {i}", f"answer {i}", "ar" if i % 5 == 0 else "en")
+    logger.close_log_db()  # Flushes the writer queue
+
+    # Assert
+    rows = logger.get_query_logs(lang="ar", limit=10)
+    assert len(rows) == 5
+    assert all(row["lang"] == "ar" for row in rows)
+
+    stats = logger.get_query_stats()
+    assert stats["total"] == 25
+    assert stats["by_lang"] == {"ar": 5, "en": 20}
+
+
+def test_query_logs_are_admin_only(monkeypatch):
+    # Arrange
+    monkeypatch.setattr(settings, "RAG_ADMIN_EMAILS", ["admin@example.com"])
+    admin = UserPublic(id="1", email="Admin@Example.com")
+    tenant = UserPublic(id="2", email="tenant@example.com")
+
+    # Act
+    allowed = asyncio.run(get_admin_user(admin))
+    with pytest.raises(HTTPException) as denied:
+        asyncio.run(get_admin_user(tenant))
+
+    # Assert
+    assert allowed is admin
+    assert denied.value.status_code == 403
@@ -0,0 +1,48 @@
+# --- START OF FILE test_reranker.py ---
+
+from langchain_core.documents import Document
+
+from app.rag.reranker import bm25_scores, rerank
+
+
+def _doc(text: str) -> Document:
+    return Document(page_content=text, metadata={"source": text[:10]})
+
+
+def test_lexical_match_lifts_a_lower_vector_score():
+    # Arrange
+    candidates = [
+        (_doc("General information about our opening hours and parking."), 0.82),
+        (_doc("The refund policy allows a refund within 30 days of purchase."), 0.80),
+        (_doc("Contact the front desk for anything else."), 0.60),
+    ]
+
+    # Act
+    ranked = rerank("what is the refund policy", candidates, top_n=2, lexical_weight=0.5)
+
+    # Assert
+    assert [d.page_content for d in ranked][0].startswith("The refund policy")
+    assert len(ranked) == 2
+
+
+def test_vector_order_is_kept_without_lexical_signal():
+    # Arrange
+    candidates = [(_doc("alpha"), 0.9), (_doc("beta"), 0.7), (_doc("gamma"), 0.5)]
+
+    # Act
+    ranked = rerank("unrelated words", candidates, top_n=3)
+
+    # Assert
+    assert [d.page_content for d in ranked] == ["alpha", "beta", "gamma"]
+
+
+def test_bm25_prefers_rarer_terms():
+    # Arrange
+    texts = ["pool pool spa", "pool gym", "pool sauna"]
+
+    # Act
+    scores = bm25_scores("pool spa", texts)
+
+    # Assert
+    assert scores.argmax() == 0
+    assert rerank("anything", [], top_n=4) == []
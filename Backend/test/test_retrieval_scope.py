@@ -0,0 +1,35 @@
+# --- START OF FILE test_retrieval_scope.py ---
+
+from app.data.chunker import chunk_documents
+from app.rag.scope import knowledge_base_filter, origin_of
+
+
+def test_agent_sources_become_an_in_filter_on_origin():
+    # Arrange
+    files = ["brochure.pdf", "Knowledge_Base/prices.docx", "brochure.pdf"]
+    urls = ["https://example.com/courses/"]
+
+    # Act
+    metadata_filter = knowledge_base_filter(files, urls)
+
+    # Assert
+    assert metadata_filter == {"origin": {"$in": ["brochure.pdf", "https://example.com/courses", "prices.docx"]}}
+
+
+def test_agent_without_sources_searches_everything():
+    # Act / Assert
+    assert knowledge_base_filter([], []) is None
+    assert knowledge_base_filter(["  "]) is None
+
+
+def test_chunks_carry_the_origin_of_their_source():
+    # Arrange
+    origin = origin_of("Knowledge_Base/brochure.pdf")
+    docs = [{"source": "Knowledge_Base/brochure.pdf (page 2)", "content": "Lessons start daily.", "origin": origin}]
+
+    # Act
+    chunks = chunk_documents(docs)
+
+    # Assert
+    assert chunks[0].metadata["origin"] == "brochure.pdf"
+    assert origin_of("api:https://api.example.com/posts") == "https://api.example.com/posts"
@@ -0,0 +1,65 @@
+# --- START OF FILE test_schema_compiler.py ---
+
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from app.agents.schema_compiler import ArgsSchemaCache
+
+BOOKING_SCHEMA = {
+    "type": "object",
+    "required": ["guest", "nights"],
+    "properties": {
+        "guest": {
+            "type": "object",
+            "required": ["name"],
+            "properties": {
+                "name": {"type": "string"},
+                "email": {"type": "string", "description": "Contact address"},
+            },
+        },
+        "nights": {"type": "integer"},
+        "room": {"type": "string", "enum": ["single", "double", "suite"], "default": "double"},
+        "extras": {"type": "array", "items": {"$ref": "#/$defs/extra"}},
+    },
+    "$defs": {
+        "extra": {"type": "object", "required": ["code"], "properties": {"code": {"type": "string"}, "qty": {"type": "integer"}}},
+    },
+}
+
+
+def test_nested_objects_arrays_and_enums_are_validated():
+    # Arrange
+    model = ArgsSchemaCache().compile("book_room", BOOKING_SCHEMA)
+
+    # Act
+    args = model(guest={"name": "Ada"}, nights="3", extras=[{"code": "breakfast", "qty": 2}])
+
+    # Assert
+    assert model.__name__ == "book_roomArgs"
+    assert args.nights == 3
+    assert args.room == "double"
+    assert args.guest.name == "Ada"
+    assert args.extras[0].qty == 2
+    with pytest.raises(ValidationError):
+        model(guest={"name": "Ada"}, nights=1, room="penthouse")
+    with pytest.raises(ValidationError):
+        model(guest={"email": "a@b.c"}, nights=1)
+
+
+def test_models_are_compiled_once_per_canonical_schema():
+    # Arrange
+    cache = ArgsSchemaCache(max_size=8)
+    reordered = json.dumps(dict(reversed(list(BOOKING_SCHEMA.items()))))
+
+    # Act
+    first = cache.compile("book_room", BOOKING_SCHEMA)
+    from_string = cache.compile("book_room", reordered)
+    legacy = cache.compile("get_weather", {"city": {"type": "str"}})
+
+    # Assert
+    assert first is from_string
+    assert len(cache) == 2
+    assert list(legacy.model_fields) == ["city"]
+    assert legacy.model_fields["city"].is_required()
@@ -0,0 +1,58 @@
+# --- START OF FILE test_simple_table.py ---
+
+from app.rules.decision_cache import compile_decision
+from app.rules.simple_table import SimpleDecisionTable, compile_simple_table
+
+TICKET_ROUTER = {
+    "kind": "DecisionTable",
+    "hitPolicy": "first",
+    "inputs": [{"name": "Urgency", "type": "string"}, {"name": "Department", "type": "string"}, {"name": "Amount", "type": "number"}],
+    "outputs": [{"name": "Handler", "type": "string"}, {"name": "SLA", "type": "number"}],
+    "rules": [
+        {"Urgency": "High", "Department": "Technical", "Amount": ">= 100", "Handler": "Level 3 Tech", "SLA": 2},
+        {"Urgency": "High", "Department": "Technical", "Handler": "Level 2 Tech", "SLA": 4},
+        {"Urgency": '"Medium", "Low"', "Department": "Billing", "Amount": "[10..50)", "Handler": "Billing Support", "SLA": 24},
+        {"Urgency": "-", "Department": "", "Handler": "General Support", "SLA": 48},
+    ],
+}
+
+
+def test_simple_table_matches_equality_lists_and_ranges():
+    # Arrange
+    table = compile_simple_table(TICKET_ROUTER)
+
+    # Act / Assert
+    assert table.evaluate({"Urgency": "High", "Department": "Technical", "Amount": 150})["result"]["SLA"] == 2
+    assert table.evaluate({"Urgency": "High", "Department": "Technical", "Amount": 99})["result"]["SLA"] == 4
+    assert table.evaluate({"Urgency": "Low", "Department": "Billing", "Amount": 10})["result"]["SLA"] == 24
+    assert table.evaluate({"Urgency": "Low", "Department": "Billing", "Amount": 50})["result"]["SLA"] == 48
+
+
+def test_vectorized_batch_matches_row_by_row_evaluation():
+    # Arrange
+    table = compile_simple_table(dict(TICKET_ROUTER, hitPolicy="collect"))
+    amounts = [5, 10, 49.5, 50, 100, 250, None, "n/a"]
+    contexts = [
+        {"Urgency": urgency, "Department": department, "Amount": amount}
+        for urgency in ("High", "Medium", "Low", None)
+        for department in ("Technical", "Billing", ["unhashable"])
+        for amount in amounts
+    ]
+
+    # Act
+    batched = table.evaluate_batch(contexts)
+
+    # Assert
+    assert len(contexts) >= 64  # Large enough to take the NumPy path
+    assert batched == [table.evaluate(context)["result"] for context in contexts]
+
+
+def test_complex_definitions_fall_back_to_zen():
+    # Arrange
+    expression_table = dict(TICKET_ROUTER, rules=[{"Urgency": "> 3 and < 5", "Handler": "x"}])
+    zen_graph = {"nodes": [], "edges": []}
+
+    # Act / Assert
+    assert compile_simple_table(expression_table) is None
+    assert isinstance(compile_decision(TICKET_ROUTER, "t1"), SimpleDecisionTable)
+    assert not isinstance(compile_decision(zen_graph, "t2"), SimpleDecisionTable)
@@ -0,0 +1,84 @@
+# --- START OF FILE test_tenant_namespaces.py ---
+
+import threading
+
+from langchain_core.documents import Document
+
+from app.rag import retriever
+from app.rag.scope import SHARED_NAMESPACE, search_namespaces, tenant_namespace
+
+
+class FakeEmbeddings:
+    def embed_documents(self, texts):
+        return [[0.1, 0.2] for _ in texts]
+
+
+class FakeVectorStore:
+    """Returns canned (document, score) pairs per namespace and records which threads queried."""
+
+    def __init__(self, by_namespace):
+        self.embeddings = FakeEmbeddings()
+        self.by_namespace = by_namespace
+        self.calls = []
+        self.threads = set()
+
+    def similarity_search_by_vector_with_score(self, vector, k, filter=None, namespace=None):
+        self.calls.append((namespace, filter))
+        self.threads.add(threading.get_ident())
+        return [(Document(page_content=text), score) for text, score in self.by_namespace.get(namespace, [])][:k]
+
+
+def test_user_queries_search_their_namespace_and_the_shared_one():
+    # Act
+    namespaces = search_namespaces("u1")
+
+    # Assert
+    assert namespaces == [tenant_namespace("u1"), SHARED_NAMESPACE]
+    assert tenant_namespace("u1") != tenant_namespace("u2")
+
+
+def test_fan_out_merges_namespaces_by_score(monkeypatch):
+    # Arrange
+    store = FakeVectorStore({
+        "tenant-a": [("a1", 0.91), ("a2", 0.40)],
+        "tenant-b": [("b1", 0.95), ("b2", 0.70)],
+        None: [("shared", 0.80)],
+    })
+    monkeypatch.setattr(retriever, "_vector_store", store)
+
+    # Act
+    results = retriever.search_scored_documents("q", k=3, namespaces=["tenant-a", "tenant-b", None])
+
+    # Assert
+    assert [doc.page_content for doc, _ in results] == ["b1", "a1", "shared"]
+    assert [doc.metadata["namespace"] for doc, _ in results] == ["tenant-b", "tenant-a", ""]
+    assert sorted(call[0] or "" for call in store.calls) == ["", "tenant-a", "tenant-b"]
+
+
+def test_single_namespace_search_stays_on_the_caller_thread(monkeypatch):
+    # Arrange
+    store = FakeVectorStore({None: [("shared", 0.8)]})
+    monkeypatch.setattr(retriever, "_vector_store", store)
+
+    # Act
+    results = retriever.search_scored_documents("q", k=4, metadata_filter={"origin": {"$in": ["x.pdf"]}})
+
+    # Assert
+    assert len(results) == 1
+    assert store.calls == [(None, {"origin": {"$in": ["x.pdf"]}})]
+    assert store.threads == {threading.get_ident()}
+
+
+def test_list_namespaces_reads_stats_from_the_index_handle(monkeypatch):
+    # Arrange
+    class FakeIndex:
+        def describe_index_stats(self):
+            return type("Stats", (), {"namespaces": {"tenant-b": {}, "": {}, "tenant-a": {}}})()
+
+    monkeypatch.setattr(retriever, "_index", FakeIndex())
+
+    # Act
+    namespaces = retriever.list_namespaces()
+
+    # Assert
+    assert namespaces == ["", "tenant-a", "tenant-b"]
@@ -0,0 +1,82 @@
+# --- START OF FILE test_tool_save.py ---
+
+import asyncio
+
+from bson import ObjectId
+from pymongo import DeleteMany, InsertOne, UpdateOne
+
+from app.auth.schemas import ToolCreate
+from app.db import crud
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self._docs = iter(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class _FakeDb:
+    """Just enough of Motor for the tools save path."""
+
+    def __init__(self, tools):
+        self.tools = tools
+        self.operations = []
+        self.version = 0
+        self._collections = {"tools": self, "tool_versions": self}
+
+    def __getitem__(self, name):
+        return self._collections[name]
+
+    def find(self, query):
+        return _Cursor([dict(doc) for doc in self.tools])
+
+    async def find_one(self, query):
+        return {"_id": query["_id"], "version": self.version} if self.version else None
+
+    async def bulk_write(self, operations, ordered=True):
+        self.operations.extend(operations)
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        self.version += update["$inc"]["version"]
+        return {"_id": query["_id"], "version": self.version}
+
+
+def _tool_doc(user_id, name, endpoint):
+    return {"_id": ObjectId(), "user_id": user_id, "name": name, "description": name,
+            "endpoint": endpoint, "params_schema": {}}
+
+
+def test_save_writes_only_the_changes_and_keeps_ids():
+    # Arrange
+    user_id = ObjectId()
+    weather = _tool_doc(user_id, "weather", "http://w")
+    news = _tool_doc(user_id, "news", "http://n")
+    stale = _tool_doc(user_id, "stale", "http://s")
+    db = _FakeDb([weather, news, stale])
+    payload = [
+        ToolCreate(id=str(weather["_id"]), name="weather", description="weather", endpoint="http://w", params_schema={}),
+        ToolCreate(name="news", description="news", endpoint="http://n/v2", params_schema={}),
+        ToolCreate(name="flights", description="flights", endpoint="http://f", params_schema={}),
+    ]
+
+    # Act
+    saved, version = asyncio.run(crud.update_tools_for_user(db, payload, str(user_id)))
+    written = len(db.operations)
+    identical = [ToolCreate(**{**doc, "id": str(doc["_id"])}) for doc in (weather, news, stale)]
+    _, unchanged_version = asyncio.run(crud.update_tools_for_user(db, identical, str(user_id)))
+
+    # Assert
+    assert [type(op) for op in db.operations[:3]] == [UpdateOne, InsertOne, DeleteMany]
+    assert saved[0].id == weather["_id"] and saved[1].id == news["_id"]
+    assert saved[1].endpoint == "http://n/v2"
+    assert version == 1
+    assert len(db.operations) == written  # an identical save writes nothing
+    assert unchanged_version == 1
@@ -0,0 +1,35 @@
+# --- START OF FILE test_tracing.py ---
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("opentelemetry.sdk")
+
+from app import tracing
+
+
+def test_span_context_follows_work_into_executor_threads():
+    # Arrange
+    tracing.init_tracing("memory")
+    exporter = tracing.get_memory_exporter()
+    exporter.clear()
+
+    def work_in_thread():
+        with tracing.span("child.in_thread"):
+            return "done"
+
+    async def handler():
+        loop = asyncio.get_running_loop()
+        with tracing.span("parent.request"):
+            return await tracing.run_in_executor_with_context(loop, work_in_thread)
+
+    # Act
+    result = asyncio.run(handler())
+
+    # Assert
+    assert result == "done"
+    spans = {s.name: s for s in exporter.get_finished_spans()}
+    parent, child = spans["parent.request"], spans["child.in_thread"]
+    assert child.context.trace_id == parent.context.trace_id
+    assert child.parent.span_id == parent.context.span_id
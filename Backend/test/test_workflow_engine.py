@@ -0,0 +1,123 @@
+# --- START OF FILE test_workflow_engine.py ---
+
+import asyncio
+
+import pytest
+
+from app.workflows import engine
+from app.workflows.engine import WorkflowContext, WorkflowDefinitionError, compile_workflow, execute
+
+
+def _fan_out_definition() -> dict:
+    """chat trigger -> two tools in parallel -> agent (with a model config node)."""
+    return {
+        "nodes": [
+            {"id": "trigger", "type": "chatTriggerNode", "data": {}},
+            {"id": "weather", "type": "toolNode", "data": {"name": "weather", "endpoint": "http://tools/weather"}},
+            {"id": "news", "type": "toolNode", "data": {"name": "news", "endpoint": "http://tools/news"}},
+            {"id": "agent", "type": "aiAgentNode", "data": {}},
+            {"id": "model", "type": "chatModelNode", "data": {}},
+        ],
+        "edges": [
+            {"id": "e1", "source": "trigger", "target": "weather"},
+            {"id": "e2", "source": "trigger", "target": "news"},
+            {"id": "e3", "source": "weather", "target": "agent"},
+            {"id": "e4", "source": "news", "target": "agent"},
+            {"id": "e5", "source": "model", "target": "agent", "targetHandle": "chatModel"},
+        ],
+    }
+
+
+def _run(definition, monkeypatch, executors, completed=None):
+    for node_type, executor in executors.items():
+        monkeypatch.setitem(engine.NODE_EXECUTORS, node_type, executor)
+    ctx = WorkflowContext(db=None, user_id="u1", input_data={"message": "hi"})
+    return asyncio.run(execute(compile_workflow(definition), ctx, completed=completed))
+
+
+def test_compile_builds_topological_order_without_config_nodes():
+    # Act
+    plan = compile_workflow(_fan_out_definition())
+
+    # Assert
+    assert plan.triggers == ["trigger"]
+    assert plan.order == ["trigger", "weather", "news", "agent"]
+    assert "model" not in plan.nodes
+    assert plan.predecessors["agent"] == ["weather", "news"]
+    assert plan.configs["weather"]["endpoint"] == "http://tools/weather"
+
+
+def test_compile_rejects_tool_without_endpoint():
+    # Arrange
+    definition = _fan_out_definition()
+    del definition["nodes"][1]["data"]["endpoint"]
+
+    # Act / Assert
+    with pytest.raises(WorkflowDefinitionError, match="no API endpoint"):
+        compile_workflow(definition)
+
+
+def test_compile_rejects_cycles():
+    # Arrange
+    definition = _fan_out_definition()
+    definition["edges"].append({"id": "e6", "source": "agent", "target": "weather"})
+
+    # Act / Assert
+    with pytest.raises(WorkflowDefinitionError):
+        compile_workflow(definition)
+
+
+def test_independent_branches_run_concurrently(monkeypatch):
+    # Arrange
+    in_flight, peak = 0, 0
+
+    async def slow_tool(config, inputs, ctx):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        return {**engine.merge_inputs(inputs), config["name"]: "ok"}
+
+    async def agent(config, inputs, ctx):
+        merged = engine.merge_inputs(inputs)
+        return {"message": f"{merged['message']} {merged['weather']} {merged['news']}"}
+
+    # Act
+    run = _run(_fan_out_definition(), monkeypatch, {"toolNode": slow_tool, "aiAgentNode": agent})
+
+    # Assert
+    assert peak == 2
+    assert run.status == "completed"
+    assert run.final_node_id == "agent"
+    assert run.outputs["agent"] == {"message": "hi ok ok"}
+    assert set(run.node_timings_ms) == {"trigger", "weather", "news", "agent"}
+
+
+def test_failed_node_skips_downstream_and_resume_reuses_outputs(monkeypatch):
+    # Arrange
+    calls = []
+
+    async def flaky_tool(config, inputs, ctx):
+        calls.append(config["name"])
+        if config["name"] == "news":
+            raise RuntimeError("upstream down")
+        return {"weather": "sunny"}
+
+    async def agent(config, inputs, ctx):
+        return {"message": "done"}
+
+    executors = {"toolNode": flaky_tool, "aiAgentNode": agent}
+
+    # Act
+    failed = _run(_fan_out_definition(), monkeypatch, executors)
+    resumed = _run(_fan_out_definition(), monkeypatch, executors,
+                   completed={"trigger": {"message": "hi"}, "news": {"news": "cached"}, "weather": {"weather": "sunny"}})
+
+    # Assert
+    assert failed.status == "failed"
+    assert failed.errors == {"news": "upstream down"}
+    assert failed.skipped == ["agent"]
+    assert resumed.status == "completed"
+    assert resumed.outputs["agent"] == {"message": "done"}
+    assert calls == ["weather", "news"]
@@ -0,0 +1,42 @@
+# --- START OF FILE test_workflow_plan_cache.py ---
+
+from app.workflows.plan_cache import CompiledPlanCache
+
+
+def _definition(agent_label: str) -> dict:
+    return {
+        "nodes": [
+            {"id": "trigger", "type": "chatTriggerNode", "data": {}},
+            {"id": "agent", "type": "aiAgentNode", "data": {"label": agent_label}},
+        ],
+        "edges": [{"id": "e1", "source": "trigger", "target": "agent"}],
+    }
+
+
+def test_plans_are_reused_per_definition_until_invalidated():
+    # Arrange
+    cache = CompiledPlanCache(max_size=4, ttl_seconds=60)
+
+    # Act
+    first = cache.get_or_compile("wf1", "u1", _definition("Support"))
+    again = cache.get_or_compile("wf1", "u1", _definition("Support"))
+    edited = cache.get_or_compile("wf1", "u1", _definition("Sales"))
+
+    # Assert
+    assert first is again
+    assert edited is not first
+    assert cache.get_current("wf1", "u1") is edited
+    assert cache.get_current("wf1", "someone-else") is None
+
+    cache.invalidate("wf1")
+    assert cache.get_current("wf1", "u1") is None
+    assert len(cache) == 0
+
+
+def test_current_plan_expires_after_ttl():
+    # Arrange
+    cache = CompiledPlanCache(max_size=4, ttl_seconds=-1)
+    cache.get_or_compile("wf1", "u1", _definition("Support"))
+
+    # Act / Assert
+    assert cache.get_current("wf1", "u1") is None
@@ -0,0 +1,367 @@
+# --- START OF FILE test_workflow_runs.py ---
+
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from bson import ObjectId
+
+from app.auth.models import WorkflowRunCheckpoint, WorkflowRunInDB
+from app.workflows import engine, runs
+from app.workflows.engine import compile_workflow
+from app.workflows.runs import WORKFLOW_RUNS, WorkflowRunManager, run_view
+
+
+def _matches(doc, query):
+    for key, expected in query.items():
+        if key == "$or":
+            if not any(_matches(doc, branch) for branch in expected):
+                return False
+        elif isinstance(expected, dict) and "$lt" in expected:
+            if doc.get(key) is None or not doc[key] < expected["$lt"]:
+                return False
+        elif doc.get(key) != expected:
+            return False
+    return True
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    def sort(self, key, direction):
+        self._docs.sort(key=lambda doc: doc[key], reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self._docs = self._docs[:n]
+        return self
+
+    def __aiter__(self):
+        self._iter = iter(self._docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class _FakeRuns:
+    """Just enough of Motor for the workflow_runs collection."""
+
+    def __init__(self, docs=()):
+        self.docs = {doc["_id"]: doc for doc in docs}
+
+    def __getitem__(self, name):
+        assert name == "workflow_runs"
+        return self
+
+    async def create_index(self, *args, **kwargs):
+        pass
+
+    async def insert_one(self, doc):
+        self.docs[doc["_id"]] = dict(doc)
+
+    async def find_one(self, query):
+        return next((dict(doc) for doc in self.docs.values() if _matches(doc, query)), None)
+
+    def find(self, query, projection=None):
+        return _Cursor([dict(doc) for doc in self.docs.values() if _matches(doc, query)])
+
+    def _apply(self, doc, update):
+        doc.update(update.get("$set", {}))
+        for key, amount in update.get("$inc", {}).items():
+            doc[key] = doc.get(key, 0) + amount
+        for key, value in update.get("$push", {}).items():
+            doc.setdefault(key, []).append(value)
+
+    async def find_one_and_update(self, query, update, return_document=None):
+        doc = next((doc for doc in self.docs.values() if _matches(doc, query)), None)
+        if doc is None:
+            return None
+        self._apply(doc, update)
+        return dict(doc)
+
+    async def update_one(self, query, update):
+        doc = next((doc for doc in self.docs.values() if _matches(doc, query)), None)
+        if doc is not None:
+            self._apply(doc, update)
+        return SimpleNamespace(modified_count=int(doc is not None))
+
+    async def update_many(self, query, update):
+        matched = [doc for doc in self.docs.values() if _matches(doc, query)]
+        for doc in matched:
+            self._apply(doc, update)
+        return SimpleNamespace(modified_count=len(matched))
+
+
+def _run_doc(**fields):
+    doc = WorkflowRunInDB(workflow_id=ObjectId(), user_id=ObjectId()).model_dump(by_alias=True)
+    doc.update(fields)
+    return doc
+
+
+def _plan():
+    """trigger -> weather -> agent"""
+    return compile_workflow({
+        "nodes": [
+            {"id": "trigger", "type": "chatTriggerNode", "data": {}},
+            {"id": "weather", "type": "toolNode", "data": {"name": "weather", "endpoint": "http://tools/weather"}},
+            {"id": "agent", "type": "aiAgentNode", "data": {}},
+        ],
+        "edges": [
+            {"id": "e1", "source": "trigger", "target": "weather"},
+            {"id": "e2", "source": "weather", "target": "agent"},
+        ],
+    })
+
+
+def _manager(db, monkeypatch, executors):
+    async def fake_load_plan(db, workflow_id, user_id):
+        return _plan()
+
+    monkeypatch.setattr(runs, "load_plan", fake_load_plan)
+    for node_type, executor in executors.items():
+        monkeypatch.setitem(engine.NODE_EXECUTORS, node_type, executor)
+    manager = WorkflowRunManager(workers=1, queue_size=10, lease_seconds=60)
+    manager._db = db
+    return manager
+
+
+def test_run_view_reports_the_latest_checkpoint_per_node():
+    # Arrange: "news" failed on the first attempt and succeeded after a resume
+    run = WorkflowRunInDB(
+        workflow_id=ObjectId(),
+        user_id=ObjectId(),
+        status="completed",
+        attempts=2,
+        checkpoints=[
+            WorkflowRunCheckpoint(node_id="trigger", output={"message": "hi"}, duration_ms=0.1),
+            WorkflowRunCheckpoint(node_id="news", error="upstream down", duration_ms=30.0),
+            WorkflowRunCheckpoint(node_id="news", output={"news": "ok"}, duration_ms=12.5),
+        ],
+    )
+
+    # Act
+    view = run_view(run)
+
+    # Assert
+    assert view["outputs"] == {"trigger": {"message": "hi"}, "news": {"news": "ok"}}
+    assert view["errors"] == {}
+    assert view["node_timings_ms"] == {"trigger": 0.1, "news": 12.5}
+    assert view["attempts"] == 2
+
+
+def test_enqueue_skips_runs_already_waiting_in_this_process():
+    # Arrange
+    manager = WorkflowRunManager(workers=1, queue_size=2, lease_seconds=60)
+
+    async def scenario():
+        manager._queue = asyncio.Queue(maxsize=manager.queue_size)
+        return [manager._enqueue("a"), manager._enqueue("a"), manager._enqueue("b"), manager._enqueue("c")]
+
+    # Act
+    accepted = asyncio.run(scenario())
+
+    # Assert
+    assert accepted == [True, False, True, False]
+    assert manager.queue_depth() == 2
+
+
+def test_lost_lease_is_not_recorded_as_a_finished_run(monkeypatch):
+    # Arrange: another worker takes the run over while "weather" executes
+    run = _run_doc(status="queued")
+    db = _FakeRuns([run])
+
+    async def trigger(config, inputs, ctx):
+        return {"message": "hi"}
+
+    async def weather(config, inputs, ctx):
+        db.docs[run["_id"]]["owner"] = "someone-else"
+        return {"weather": "sunny"}
+
+    manager = _manager(db, monkeypatch, {"chatTriggerNode": trigger, "toolNode": weather})
+    failed_before = WORKFLOW_RUNS.labels(status="failed").get()
+
+    async def scenario():
+        try:
+            await manager._execute_run(str(run["_id"]))
+        except RuntimeError:
+            return await manager._finish(str(run["_id"]), "failed", {"errors": {"workflow": "lease lost"}})
+
+    # Act
+    finished = asyncio.run(scenario())
+
+    # Assert
+    assert finished is False
+    assert db.docs[run["_id"]]["status"] == "running"  # left to its new owner
+    assert WORKFLOW_RUNS.labels(status="failed").get() == failed_before
+
+
+def test_lost_lease_cancels_the_node_still_running(monkeypatch):
+    # Arrange: another worker takes the run over while the agent node is still busy
+    run = _run_doc(status="queued")
+    db = _FakeRuns([run])
+    cancelled = []
+
+    async def trigger(config, inputs, ctx):
+        return {"message": "hi"}
+
+    async def weather(config, inputs, ctx):
+        return {"weather": "sunny"}
+
+    async def slow_agent(config, inputs, ctx):
+        db.docs[run["_id"]]["owner"] = "someone-else"
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append("agent")
+            raise
+        return {"message": "too late"}
+
+    manager = _manager(db, monkeypatch, {"chatTriggerNode": trigger, "toolNode": weather, "aiAgentNode": slow_agent})
+    manager.lease_seconds = 0.03
+
+    # Act
+    asyncio.run(asyncio.wait_for(manager._execute_run(str(run["_id"])), 2))
+
+    # Assert
+    assert cancelled == ["agent"]
+    assert db.docs[run["_id"]]["status"] == "running"  # left to its new owner
+    assert [c["node_id"] for c in db.docs[run["_id"]]["checkpoints"]] == ["trigger", "weather"]
+
+
+def test_heartbeat_survives_a_transient_database_error(monkeypatch):
+    # Arrange: the first renewal fails, later ones succeed
+    run = _run_doc(status="queued")
+    db = _FakeRuns([run])
+    beats = []
+
+    async def flaky_heartbeat(db, run_id, owner):
+        beats.append(run_id)
+        if len(beats) == 1:
+            raise ConnectionError("primary stepped down")
+        return True
+
+    async def trigger(config, inputs, ctx):
+        return {"message": "hi"}
+
+    async def slow_tool(config, inputs, ctx):
+        await asyncio.sleep(0.1)
+        return {"weather": "sunny"}
+
+    async def agent(config, inputs, ctx):
+        return {"message": "done"}
+
+    monkeypatch.setattr(runs.crud, "heartbeat_workflow_run", flaky_heartbeat)
+    manager = _manager(db, monkeypatch, {"chatTriggerNode": trigger, "toolNode": slow_tool, "aiAgentNode": agent})
+    manager.lease_seconds = 0.03
+
+    # Act
+    asyncio.run(manager._execute_run(str(run["_id"])))
+
+    # Assert
+    assert len(beats) >= 2  # kept beating after the error
+    assert db.docs[run["_id"]]["status"] == "completed"
+
+
+def test_stale_run_is_claimed_and_resumes_after_its_checkpoints(monkeypatch):
+    # Arrange: a previous owner finished "trigger" and "weather", then stopped heartbeating
+    stale = _run_doc(
+        status="running",
+        owner="crashed-worker",
+        heartbeat_at=datetime.utcnow() - timedelta(minutes=5),
+        attempts=1,
+        checkpoints=[
+            {"node_id": "trigger", "output": {"message": "hi"}, "error": None, "duration_ms": 0.1},
+            {"node_id": "weather", "output": {"weather": "sunny"}, "error": None, "duration_ms": 9.0},
+        ],
+    )
+    live = _run_doc(status="running", owner="busy-worker", heartbeat_at=datetime.utcnow(), attempts=1)
+    db = _FakeRuns([stale, live])
+    executed = []
+
+    def recording(node_type):
+        async def run(config, inputs, ctx):
+            executed.append(node_type)
+            return {"message": f"answer from {inputs}"}
+        return run
+
+    manager = _manager(db, monkeypatch, {node_type: recording(node_type) for node_type in ("chatTriggerNode", "toolNode", "aiAgentNode")})
+
+    async def scenario():
+        await manager._execute_run(str(stale["_id"]))
+        await manager._execute_run(str(live["_id"]))
+
+    # Act
+    asyncio.run(scenario())
+
+    # Assert
+    resumed = db.docs[stale["_id"]]
+    assert executed == ["aiAgentNode"]  # checkpointed nodes are not executed again
+    assert resumed["status"] == "completed" and resumed["owner"] == manager.owner
+    assert resumed["attempts"] == 2
+    assert [c["node_id"] for c in resumed["checkpoints"]] == ["trigger", "weather", "agent"]
+    assert "weather" in resumed["result"]
+    assert db.docs[live["_id"]]["owner"] == "busy-worker"  # a live lease is left alone
+
+
+def test_stop_hands_unfinished_runs_back_to_the_queue():
+    # Arrange
+    manager = WorkflowRunManager(workers=1, queue_size=10, lease_seconds=60)
+    mine = _run_doc(status="running", owner=manager.owner, heartbeat_at=datetime.utcnow())
+    theirs = _run_doc(status="running", owner="other-process", heartbeat_at=datetime.utcnow())
+    db = _FakeRuns([mine, theirs])
+
+    async def scenario():
+        await manager.start(db)
+        await asyncio.sleep(0)
+        await manager.stop()
+
+    # Act
+    asyncio.run(scenario())
+
+    # Assert
+    assert db.docs[mine["_id"]]["status"] == "queued" and db.docs[mine["_id"]]["owner"] is None
+    assert db.docs[theirs["_id"]]["owner"] == "other-process"
+
+
+def test_run_events_stream_nodes_then_the_finished_run(monkeypatch):
+    # Arrange
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.api import workflow_routes
+    from app.auth.dependencies import get_current_user
+    from app.auth.schemas import UserPublic
+    from app.db.database import get_database
+
+    user_id = ObjectId()
+    run = _run_doc(
+        user_id=user_id,
+        status="running",
+        checkpoints=[{"node_id": "trigger", "output": {"message": "hi"}, "error": None, "duration_ms": 0.1}],
+    )
+    db = _FakeRuns([run])
+
+    async def finish_meanwhile(run_id, timeout):
+        doc = db.docs[run["_id"]]
+        doc["checkpoints"].append({"node_id": "agent", "output": {"message": "done"}, "error": None, "duration_ms": 5.0})
+        doc.update(status="completed", result="done", final_node_type="aiAgentNode")
+
+    monkeypatch.setattr(workflow_routes.workflow_runs, "wait_for_change", finish_meanwhile)
+    app = FastAPI()
+    app.include_router(workflow_routes.router)
+    app.dependency_overrides[get_current_user] = lambda: UserPublic(id=str(user_id), email="owner@example.com")
+    app.dependency_overrides[get_database] = lambda: db
+
+    # Act
+    with TestClient(app) as client:
+        response = client.get(f"/workflows/runs/{run['_id']}/events")
+
+    # Assert
+    events = [block.split("\n")[0] for block in response.text.strip().split("\n\n")]
+    assert events == ["event: node", "event: status", "event: node", "event: run"]
+    assert '"result": "done"' in response.text
@@ -0,0 +1,85 @@
+# --- START OF FILE test_workflow_triggers.py ---
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from app.workflows import triggers
+from app.workflows.triggers import TriggerDispatcher, TriggerKeyCache, TriggerQueueFull
+
+
+def test_dispatch_stores_the_run_before_acknowledging_and_deduplicates(monkeypatch):
+    # Arrange
+    stored = {}  # (workflow_id, idempotency_key) -> run_id, like the unique index
+
+    async def fake_submit(workflow_id, user_id, input_data, reject_when_full=True, run_id=None, trigger=None, idempotency_key=None):
+        assert reject_when_full is False
+        if idempotency_key and (workflow_id, idempotency_key) in stored:
+            raise DuplicateKeyError("duplicate idempotency key")
+        stored[(workflow_id, idempotency_key or run_id)] = run_id
+
+    async def fake_lookup(db, workflow_id, idempotency_key):
+        return SimpleNamespace(id=stored[(workflow_id, idempotency_key)])
+
+    monkeypatch.setattr(triggers.workflow_runs, "submit", fake_submit)
+    monkeypatch.setattr(triggers.crud, "get_workflow_run_by_idempotency_key", fake_lookup)
+    dispatcher = TriggerDispatcher(max_in_flight=10)
+    other_process = TriggerDispatcher(max_in_flight=10)
+
+    async def scenario():
+        first = await dispatcher.dispatch(None, "wf1", "u1", "chat_message", {"message": "hi"}, idempotency_key="evt-1")
+        retry = await dispatcher.dispatch(None, "wf1", "u1", "chat_message", {"message": "hi"}, idempotency_key="evt-1")
+        elsewhere = await other_process.dispatch(None, "wf1", "u1", "chat_message", {"message": "hi"}, idempotency_key="evt-1")
+        other = await dispatcher.dispatch(None, "wf1", "u1", "chat_message", {"message": "yo"})
+        return first, retry, elsewhere, other
+
+    # Act
+    (first_id, first_dup), (retry_id, retry_dup), (elsewhere_id, elsewhere_dup), (other_id, _) = asyncio.run(scenario())
+
+    # Assert
+    assert stored[("wf1", "evt-1")] == first_id  # written before dispatch returned
+    assert not first_dup and retry_dup and elsewhere_dup
+    assert retry_id == elsewhere_id == first_id
+    assert other_id != first_id and len(stored) == 2
+    assert dispatcher.in_flight() == 0
+
+
+def test_dispatch_rejects_when_too_many_events_are_in_flight():
+    # Arrange
+    dispatcher = TriggerDispatcher(max_in_flight=0)
+
+    # Act / Assert
+    with pytest.raises(TriggerQueueFull):
+        asyncio.run(dispatcher.dispatch(None, "wf1", "u1", "chat_message", {"message": "late"}))
+
+
+def test_key_lookups_are_cached_until_invalidated(monkeypatch):
+    # Arrange
+    lookups = []
+
+    async def fake_lookup(db, workflow_id, api_key):
+        lookups.append(api_key)
+        return SimpleNamespace(user_id="owner-1") if api_key == "good" else None
+
+    monkeypatch.setattr(triggers.crud, "get_workflow_by_api_key", fake_lookup)
+    cache = TriggerKeyCache(ttl_seconds=60, negative_ttl_seconds=60)
+
+    async def scenario():
+        results = [
+            await cache.owner_of(None, "wf1", "good"),
+            await cache.owner_of(None, "wf1", "good"),
+            await cache.owner_of(None, "wf1", "bad"),
+            await cache.owner_of(None, "wf1", "bad"),
+        ]
+        cache.invalidate("wf1")
+        results.append(await cache.owner_of(None, "wf1", "good"))
+        return results
+
+    # Act
+    results = asyncio.run(scenario())
+
+    # Assert
+    assert results == ["owner-1", "owner-1", None, None, "owner-1"]
+    assert lookups == ["good", "bad", "good"]